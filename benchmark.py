@@ -0,0 +1,203 @@
+import argparse
+import logging
+import os
+import sys
+from datetime import datetime
+
+from src.benchmarks import (BenchmarkSuite, DEFAULT_SIZES, compare_csv_loaders, compare_engines, compare_results,
+                            compare_similarity_indexes, benchmark_external_memory, benchmark_sharding, load_results,
+                            save_results)
+from src.manifest import compare_manifests, load_manifest
+from src.synthetic import write_synthetic_csv
+
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+
+def run(args):
+    suite = BenchmarkSuite(
+        sizes=args.sizes,
+        data_dir=args.data_dir,
+        n_estimators=args.n_estimators,
+        max_depth=args.max_depth,
+        single_predict_calls=args.single_calls,
+        batch_size=args.batch_size,
+    )
+    results = suite.run()
+    output = args.output or f"reports/benchmarks/benchmark_{datetime.now():%Y%m%d_%H%M%S}.json"
+    save_results(results, output)
+
+
+def compare(args):
+    regressions = compare_results(load_results(args.baseline), load_results(args.candidate),
+                                  time_threshold=args.threshold, memory_threshold=args.memory_threshold)
+
+    if not regressions:
+        print("Brak regresji.")
+        return
+
+    print(f"Wykryto regresje ({len(regressions)}):")
+    for r in regressions:
+        print(f"  [{r['size']:>10}] {r['stage']:<20} {r['metric']:<12} "
+              f"{r['baseline']:.4g} -> {r['candidate']:.4g} ({r['change']:+.1%})")
+    sys.exit(1)
+
+
+def engine(args):
+    results = compare_engines(
+        model_file=f"spotify-xgb-model_{args.version}.joblib",
+        preprocessor_file=f"spotify-preprocessor_{args.version}.joblib",
+        engine_path=args.engine or os.path.join(args.models_dir, f"spotify-xgb-model_{args.version}.npz"),
+        base_dir=args.models_dir,
+        n_rows=args.rows,
+        batch_size=args.batch_size,
+    )
+    output = args.output or f"reports/benchmarks/engine_{datetime.now():%Y%m%d_%H%M%S}.json"
+    save_results(results, output)
+    print(f"Maksymalna różnica predykcji: {results['max_abs_diff']:.2e}")
+
+
+def ingest(args):
+    csv_path = args.csv or os.path.join(args.data_dir, f'synthetic_{args.rows}.csv')
+    if not os.path.exists(csv_path):
+        write_synthetic_csv(csv_path, args.rows)
+
+    results = compare_csv_loaders(csv_path, repeats=args.repeats)
+    output = args.output or f"reports/benchmarks/ingest_{datetime.now():%Y%m%d_%H%M%S}.json"
+    save_results(results, output)
+    for name, stats in results['loaders'].items():
+        print(f"{name:<8} {stats['mb_per_s']:>8.1f} MB/s  {stats['rows_per_s']:>12,.0f} wierszy/s  "
+              f"szczyt RSS {stats['peak_rss_mb']:.0f} MB")
+    print(f"Przyspieszenie: {results['speedup']:.1f}x")
+
+
+def similarity(args):
+    results = compare_similarity_indexes(n_rows=args.rows, n_queries=args.queries, k=args.k, n_probes=args.n_probe)
+    output = args.output or f"reports/benchmarks/similarity_{datetime.now():%Y%m%d_%H%M%S}.json"
+    save_results(results, output)
+    print(f"Pełne przeszukanie: {results['brute_force_seconds'] * 1000:.1f} ms / {results['n_queries']} zapytań")
+    for name, stats in results['indexes'].items():
+        print(f"{name:<12} budowa {stats['build_seconds']:>6.2f}s  p50 {stats['p50_ms']:>8.1f} ms  "
+              f"p99 {stats['p99_ms']:>8.1f} ms  recall@{results['k']} {stats['recall']:.3f}")
+
+
+def shards(args):
+    results = benchmark_sharding(n_rows=args.rows, n_genres=args.genres, shard_by=args.shard_by,
+                                 min_rows=args.min_rows)
+    output = args.output or f"reports/benchmarks/sharding_{datetime.now():%Y%m%d_%H%M%S}.json"
+    save_results(results, output)
+    for name, stats in results['models'].items():
+        rare = f"  RMSE rzadkich {stats['rare_rmse']:.3f}" if 'rare_rmse' in stats else ''
+        print(f"{name:<12} trening {stats['fit_seconds']:>8.1f}s  p50 {stats['predict_latency']['p50_ms']:>8.2f} ms  "
+              f"RMSE {stats['rmse']:.3f}  R2 {stats['r2']:.3f}{rare}")
+
+
+def external(args):
+    results = benchmark_external_memory(args.parquet, n_rows=args.rows, batch_rows=args.batch_rows,
+                                        in_memory=not args.skip_in_memory)
+    output = args.output or f"reports/benchmarks/external_memory_{datetime.now():%Y%m%d_%H%M%S}.json"
+    save_results(results, output)
+    print(f"{results['rows']:,} wierszy ({results['source']})")
+    for name, stats in results['models'].items():
+        print(f"{name:<16} trening {stats['fit_seconds']:>8.1f}s  {stats['rows_per_s']:>10,.0f} wierszy/s  "
+              f"szczyt RSS +{stats['peak_rss_delta_mb']:>7.0f} MB  RMSE {stats['rmse']:.3f}")
+
+
+def runs(args):
+    result = compare_manifests(load_manifest(args.baseline), load_manifest(args.candidate))
+    threads = result['threads']
+    print(f"Wątki: {threads['baseline'].get('model_n_jobs')} / {threads['baseline'].get('cpu_count')} rdzeni -> "
+          f"{threads['candidate'].get('model_n_jobs')} / {threads['candidate'].get('cpu_count')} rdzeni")
+    print(f"Te same dane: {'tak' if result['same_dataset'] else 'NIE'}, "
+          f"zmienione parametry: {', '.join(result['changed_params']) or 'brak'}, "
+          f"identyczne predykcje: {'tak' if result['same_predictions'] else 'NIE'}")
+    for metric, delta in result['metric_deltas'].items():
+        print(f"  {metric:<6} {delta:+.6f}")
+    print(f"Przyspieszenie całkowite: {result['total_speedup']:.2f}x")
+    for stage, speedup in result['stage_speedups'].items():
+        print(f"  {stage:<20} {speedup:.2f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Spotify Popularity Pipeline Benchmarks")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    run_parser = subparsers.add_parser('run', help='Uruchom benchmark i zapisz wyniki do JSON')
+    run_parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES, help='Liczby wierszy')
+    run_parser.add_argument('--data-dir', type=str, default='data/benchmarks', help='Katalog na dane syntetyczne')
+    run_parser.add_argument('--n-estimators', type=int, default=100, help='Liczba drzew modelu benchmarkowego')
+    run_parser.add_argument('--max-depth', type=int, default=8, help='Głębokość drzew modelu benchmarkowego')
+    run_parser.add_argument('--single-calls', type=int, default=200, help='Liczba wywołań predict() dla pomiaru latencji')
+    run_parser.add_argument('--batch-size', type=int, default=1000, help='Rozmiar partii dla predict_batch()')
+    run_parser.add_argument('--output', type=str, default=None, help='Ścieżka pliku JSON z wynikami')
+    run_parser.set_defaults(func=run)
+
+    compare_parser = subparsers.add_parser('compare', help='Porównaj dwa przebiegi i wskaż regresje')
+    compare_parser.add_argument('baseline', type=str, help='Plik JSON z przebiegu bazowego')
+    compare_parser.add_argument('candidate', type=str, help='Plik JSON z nowego przebiegu')
+    compare_parser.add_argument('--threshold', type=float, default=0.10, help='Dopuszczalny wzrost czasu (0.10 = 10%%)')
+    compare_parser.add_argument('--memory-threshold', type=float, default=0.20, help='Dopuszczalny wzrost pamięci')
+    compare_parser.set_defaults(func=compare)
+
+    engine_parser = subparsers.add_parser('engine', help='Porównaj runtime XGBoost z wyeksportowanym silnikiem NumPy')
+    engine_parser.add_argument('--version', type=str, default='v1', help='Wersja artefaktów modelu')
+    engine_parser.add_argument('--models-dir', type=str, default='models', help='Katalog z artefaktami')
+    engine_parser.add_argument('--engine', type=str, default=None,
+                               help='Plik .npz silnika (domyślnie eksportowany obok modelu)')
+    engine_parser.add_argument('--rows', type=int, default=100_000, help='Liczba syntetycznych utworów')
+    engine_parser.add_argument('--batch-size', type=int, default=10_000, help='Rozmiar partii predykcji')
+    engine_parser.add_argument('--output', type=str, default=None, help='Ścieżka pliku JSON z wynikami')
+    engine_parser.set_defaults(func=engine)
+
+    ingest_parser = subparsers.add_parser('ingest', help='Porównaj przepustowość wczytywania CSV (pandas vs pyarrow)')
+    ingest_parser.add_argument('--csv', type=str, default=None,
+                               help='Plik CSV (domyślnie syntetyczny o rozmiarze --rows)')
+    ingest_parser.add_argument('--rows', type=int, default=1_000_000, help='Liczba wierszy pliku syntetycznego')
+    ingest_parser.add_argument('--data-dir', type=str, default='data/benchmarks', help='Katalog na dane syntetyczne')
+    ingest_parser.add_argument('--repeats', type=int, default=3, help='Liczba powtórzeń pomiaru')
+    ingest_parser.add_argument('--output', type=str, default=None, help='Ścieżka pliku JSON z wynikami')
+    ingest_parser.set_defaults(func=ingest)
+
+    similarity_parser = subparsers.add_parser('similarity', help='Porównaj indeksy podobnych utworów (czas budowy, '
+                                                                 'latencja top-k, recall)')
+    similarity_parser.add_argument('--rows', type=int, default=100_000, help='Liczba syntetycznych utworów')
+    similarity_parser.add_argument('--queries', type=int, default=1000, help='Liczba zapytań w partii')
+    similarity_parser.add_argument('--k', type=int, default=10, help='Liczba sąsiadów')
+    similarity_parser.add_argument('--n-probe', type=int, nargs='+', default=[4, 8, 16, 32],
+                                   help='Liczby przeszukiwanych list IVF')
+    similarity_parser.add_argument('--output', type=str, default=None, help='Ścieżka pliku JSON z wynikami')
+    similarity_parser.set_defaults(func=similarity)
+
+    shards_parser = subparsers.add_parser('shards', help='Porównaj zespół modeli per gatunek z modelem monolitycznym')
+    shards_parser.add_argument('--rows', type=int, default=200_000, help='Liczba syntetycznych utworów')
+    shards_parser.add_argument('--genres', type=int, default=114, help='Liczba gatunków')
+    shards_parser.add_argument('--shard-by', choices=['genre', 'cluster'], default='cluster',
+                               help='Model na gatunek lub na klaster gatunków')
+    shards_parser.add_argument('--min-rows', type=int, default=1000,
+                               help='Minimalna liczba wierszy gatunku dla osobnego modelu')
+    shards_parser.add_argument('--output', type=str, default=None, help='Ścieżka pliku JSON z wynikami')
+    shards_parser.set_defaults(func=shards)
+
+    external_parser = subparsers.add_parser('external', help='Porównaj trening out-of-core (Parquet kawałkami) '
+                                                             'z treningiem w pamięci')
+    external_parser.add_argument('--parquet', type=str, default='data/synthetic/clean_tracks.parquet',
+                                 help='Czyszczony plik/katalog Parquet (plik tworzony syntetycznie, jeśli nie istnieje)')
+    external_parser.add_argument('--rows', type=int, default=1_000_000, help='Liczba syntetycznych utworów')
+    external_parser.add_argument('--batch-rows', type=int, default=65_536, help='Liczba wierszy kawałka')
+    external_parser.add_argument('--skip-in-memory', action='store_true',
+                                 help='Pomiń trening w pamięci (np. gdy dane nie mieszczą się w RAM)')
+    external_parser.add_argument('--output', type=str, default=None, help='Ścieżka pliku JSON z wynikami')
+    external_parser.set_defaults(func=external)
+
+    runs_parser = subparsers.add_parser('runs', help='Porównaj manifesty dwóch przebiegów treningu/tuningu')
+    runs_parser.add_argument('baseline', type=str, help='Manifest przebiegu bazowego (reports/runs/*.json)')
+    runs_parser.add_argument('candidate', type=str, help='Manifest nowego przebiegu')
+    runs_parser.set_defaults(func=runs)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+import argparse
+import logging
+import os
+import pandas as pd
+from src.loaders import DATA_SOURCE, DataLoaderFactory
+from src.cleaners import SpotifyDataCleaner
+from src.preprocessors import SpotifyPipelinePreprocessor
+from src.comparison import ModelComparison, ModelSpec, default_specs, save_leaderboard
+from src.pipeline import PipelineRunner
+from src.trainers import build_model
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+
+def build_specs(threads: int, names=None):
+    # Model produkcyjny (jak w main.py) jako punkt odniesienia dla pozostałych
+    specs = [ModelSpec('xgb_production', lambda n: build_model().set_params(n_jobs=n), threads)]
+    specs += default_specs(threads)
+    if names:
+        unknown = set(names) - {spec.name for spec in specs}
+        if unknown:
+            raise ValueError(f"Unknown models: {sorted(unknown)}")
+        specs = [spec for spec in specs if spec.name in names]
+    return specs
+
+
+def run_comparison(version: str = 'v1', cpu_budget=None, threads: int = 4, names=None,
+                   output_dir: str = 'reports/leaderboard', force: bool = False):
+    # Korzysta z parquet zapisanego przez main.py, jeśli jest aktualny
+    clean_path = f'data/clean_data_{version}.parquet'
+    restore_clean = (lambda: pd.read_parquet(clean_path)) if os.path.exists(clean_path) else None
+
+    pipeline = PipelineRunner(f'comparison_{version}', force=force)
+    pipeline.add_stage('load', lambda: DataLoaderFactory.get_loader(DATA_SOURCE).load())
+    pipeline.add_stage('clean', lambda df: SpotifyDataCleaner().clean(df), deps=['load'],
+                       outputs=[clean_path] if restore_clean else [], restore=restore_clean)
+
+    preprocessor = SpotifyPipelinePreprocessor(target_col='popularity', test_size=0.2)
+    pipeline.add_stage('preprocess', preprocessor.process, deps=['clean'])
+
+    comparison = ModelComparison(build_specs(threads, names), cpu_budget=cpu_budget)
+    pipeline.add_stage('compare', lambda data: comparison.run(data[0], data[2], data[1], data[3]), deps=['preprocess'])
+    pipeline.add_stage('save_leaderboard', lambda leaderboard: save_leaderboard(leaderboard, output_dir),
+                       deps=['compare'])
+
+    leaderboard = pipeline.run()['compare']
+
+    print(f"{'#':>2} {'Model':<16} {'RMSE':>8} {'MAE':>8} {'R2':>7} {'Fit [s]':>9} {'p50 [ms]':>9} {'Rozmiar [MB]':>13}")
+    for e in leaderboard:
+        if e['status'] != 'done':
+            print(f"{e['rank']:>2} {e['name']:<16} BŁĄD: {e['error']}")
+            continue
+        print(f"{e['rank']:>2} {e['name']:<16} {e['rmse']:>8.3f} {e['mae']:>8.3f} {e['r2']:>7.3f} "
+              f"{e['fit_seconds']:>9.1f} {e['predict_latency']['p50_ms']:>9.2f} {e['size_bytes'] / 1024 ** 2:>13.2f}")
+    return leaderboard
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Spotify Popularity Model Comparison")
+    parser.add_argument('--version', type=str, default='v1', help='Wersja danych (domyślnie: v1)')
+    parser.add_argument('--cpu-budget', type=int, default=None, help='Łączna liczba rdzeni (domyślnie: wszystkie)')
+    parser.add_argument('--threads', type=int, default=4, help='Wątki na jeden model drzewiasty')
+    parser.add_argument('--models', type=str, nargs='+', default=None, help='Podzbiór modeli (nazwy z rankingu)')
+    parser.add_argument('--output-dir', type=str, default='reports/leaderboard', help='Katalog na ranking')
+    parser.add_argument('--force', action='store_true', help='Uruchom wszystkie etapy, nawet jeśli są aktualne')
+    args = parser.parse_args()
+
+    run_comparison(version=args.version, cpu_budget=args.cpu_budget, threads=args.threads, names=args.models,
+                   output_dir=args.output_dir, force=args.force)
@@ -1,7 +1,13 @@
 import argparse
 import logging
+import os
 import sys
+import threading
+from contextlib import nullcontext
 from src.predictors import SpotifyPredictor
+from src.profiling import StageProfiler, PROFILE_MODES
+from src.serving import serve_predictions
+from src.streaming import STREAM_FORMATS, StreamScorer
 
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -44,6 +50,49 @@ def str2bool(v):
         raise argparse.ArgumentTypeError('Oczekiwano wartości boolean (True/False).')
 
 
+def run_stream(args):
+    """Tryb strumieniowy: na stdout trafiają wyłącznie wyniki, logi idą na stderr."""
+    variant = '.fast' if args.fast else '.sharded' if args.sharded else ''
+    try:
+        predictor = SpotifyPredictor(f"spotify-xgb-model_{args.version}{variant}.joblib",
+                                     f"spotify-preprocessor_{args.version}.joblib", watch_interval=args.watch)
+    except FileNotFoundError:
+        logger.error(f"Nie znaleziono plików modelu dla wersji '{args.version}'.")
+        sys.exit(1)
+
+    scorer = StreamScorer(predictor, batch_size=args.batch_size, max_wait=args.max_wait_ms / 1000,
+                          id_column=args.id_column)
+    try:
+        written = scorer.score(sys.stdin.buffer, sys.stdout.buffer, fmt=args.stream)
+    except BrokenPipeError:
+        # Odbiorca zamknął potok (np. `| head`) - kończymy bez błędu przy zamykaniu stdout
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        sys.exit(0)
+    finally:
+        predictor.stop_watching()
+    logger.info(f"Przetworzono {written} rekordów ({args.stream})")
+
+
+def run_server(args):
+    """Endpoint HTTP predykcji (POST /predict) działający do przerwania (Ctrl+C)."""
+    variant = '.fast' if args.fast else '.sharded' if args.sharded else ''
+    try:
+        predictor = SpotifyPredictor(f"spotify-xgb-model_{args.version}{variant}.joblib",
+                                     f"spotify-preprocessor_{args.version}.joblib", watch_interval=args.watch)
+    except FileNotFoundError:
+        logger.error(f"Nie znaleziono plików modelu dla wersji '{args.version}'.")
+        sys.exit(1)
+
+    server = serve_predictions(predictor, port=args.serve, host=args.host)
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.shutdown()
+        predictor.stop_watching()
+
+
 def main():
     # Konfiguracja parsera argumentów
     parser = argparse.ArgumentParser(description="Spotify Popularity Inference CLI")
@@ -51,6 +100,26 @@ def main():
     # Argumenty
     parser.add_argument('--version', type=str, default='v1', help='Wersja modelu (domyślnie: v1)')
     parser.add_argument('--genre', type=str, default='pop', help='Gatunek utworu (domyślnie: pop)')
+    parser.add_argument('--fast', action='store_true',
+                        help='Użyj lekkiego wariantu modelu (spotify-xgb-model_<wersja>.fast.joblib)')
+    parser.add_argument('--sharded', action='store_true',
+                        help='Użyj zespołu modeli per gatunek (spotify-xgb-model_<wersja>.sharded.joblib)')
+    parser.add_argument('--stream', choices=STREAM_FORMATS, default=None,
+                        help='Tryb strumieniowy: utwory ze stdin (JSON Lines lub Arrow IPC), wyniki na stdout')
+    parser.add_argument('--batch-size', type=int, default=1000, help='Maksymalny rozmiar partii w trybie strumieniowym')
+    parser.add_argument('--max-wait-ms', type=float, default=50.0,
+                        help='Maksymalny czas dopełniania partii w trybie strumieniowym (ms)')
+    parser.add_argument('--id-column', type=str, default=None,
+                        help='Zwracaj tylko tę kolumnę i predykcję zamiast całego rekordu (np. track_id)')
+    parser.add_argument('--watch', type=float, default=None,
+                        help='Co ile sekund sprawdzać nowe wersje modelu (strumień lub endpoint HTTP, hot-swap)')
+    parser.add_argument('--serve', type=int, default=None, metavar='PORT',
+                        help='Uruchom endpoint HTTP predykcji (POST /predict) na podanym porcie')
+    parser.add_argument('--host', type=str, default='127.0.0.1', help='Adres endpointu HTTP (domyślnie: 127.0.0.1)')
+    parser.add_argument('--profile', choices=PROFILE_MODES, default=None,
+                        help='Profilowanie wczytania modelu i predykcji (z --stream: całego strumienia): '
+                             'cprofile lub sampling')
+    parser.add_argument('--profile-dir', type=str, default='reports/profile', help='Katalog na wyniki profilowania')
 
     # Automatyczne generowanie argumentów na podstawie słownika SAMPLE_SONG
     ignored_keys = ['track_id', 'artists', 'album_name', 'track_name', 'track_genre']
@@ -66,6 +135,27 @@ def main():
             parser.add_argument(f'--{key}', type=val_type, default=val, help=f'({val_type.__name__}) Domyślnie: {val}')
 
     args = parser.parse_args()
+    if args.profile and args.serve is not None:
+        # Profiler obejmuje tylko bieżący wątek, a żądania HTTP obsługują wątki serwera
+        parser.error("--profile nie działa z --serve (żądania obsługują wątki serwera); "
+                     "profiluj ścieżkę predykcji przez --stream lub loadtest.py")
+
+    profiler = StageProfiler(args.profile_dir, mode=args.profile) if args.profile else None
+
+    def profiled(stage: str):
+        return profiler.profile(stage) if profiler is not None else nullcontext()
+
+    if args.stream:
+        try:
+            with profiled('stream'):
+                run_stream(args)
+        finally:
+            if profiler is not None:
+                profiler.write_summary()
+        return
+    if args.serve is not None:
+        run_server(args)
+        return
 
     try:
         # Aktualizacja parametrów utworu
@@ -80,15 +170,21 @@ def main():
         logger.info(f"Przyjęte parametry utworu: {current_song}")
 
         # Inicjalizacja predyktora
-        model_file = f"spotify-xgb-model_{args.version}.joblib"
+        variant = '.fast' if args.fast else '.sharded' if args.sharded else ''
+        model_file = f"spotify-xgb-model_{args.version}{variant}.joblib"
         preprocessor_file = f"spotify-preprocessor_{args.version}.joblib"
 
-        predictor = SpotifyPredictor(model_file, preprocessor_file)
+        with profiled('load_predictor'):
+            predictor = SpotifyPredictor(model_file, preprocessor_file)
 
         logger.info(f"Testowanie utworu. Gatunek: '{args.genre}'. Wersja modelu: {args.version}")
 
         # Wykonanie predykcji
-        score = predictor.predict(current_song)
+        with profiled('predict'):
+            score = predictor.predict(current_song)
+
+        if profiler is not None:
+            profiler.write_summary()
 
         # Wyświetlenie wyniku
         print(f"WYNIK PREDYKCJI POPULARNOŚCI")
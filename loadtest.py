@@ -0,0 +1,110 @@
+import argparse
+import logging
+import sys
+from datetime import datetime
+
+from src.benchmarks import save_results
+from src.loadtest import (DEFAULT_SLO, HttpTarget, InProcessTarget, LoadTester, check_slo, find_capacity,
+                          parse_batch_mix)
+from src.predictors import SpotifyPredictor
+from src.serving import serve_predictions
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+
+def build_target(args):
+    """Cel obciążenia: zdalny endpoint (--url), lokalny endpoint HTTP (--http) lub predyktor w procesie."""
+    if args.url:
+        return HttpTarget(args.url), None
+    variant = '.fast' if args.fast else '.sharded' if args.sharded else ''
+    predictor = SpotifyPredictor(f"spotify-xgb-model_{args.version}{variant}.joblib",
+                                 f"spotify-preprocessor_{args.version}.joblib")
+    if not args.http:
+        return InProcessTarget(predictor), None
+    server = serve_predictions(predictor, port=0)
+    return HttpTarget(f'http://127.0.0.1:{server.server_port}/predict'), server
+
+
+def print_report(report):
+    latency = report.get('latency', {})
+    rate = f", {report['rate']:g} req/s" if report['rate'] else ''
+    print(f"{report['target']} ({report['mode']}, {report['concurrency']} wątków{rate})")
+    print(f"  żądania {report['requests']:>8}  błędy {report['errors']}  "
+          f"{report['throughput']['requests_per_s']:>9,.1f} req/s  "
+          f"{report['throughput']['predictions_per_s']:>10,.1f} predykcji/s")
+    if latency:
+        print(f"  latencja p50 {latency['p50_ms']:.2f} ms  p95 {latency['p95_ms']:.2f} ms  "
+              f"p99 {latency['p99_ms']:.2f} ms  max {latency['max_ms']:.2f} ms")
+    for size, stats in report.get('latency_by_batch', {}).items():
+        print(f"    partia {size:>5}: p50 {stats['p50_ms']:.2f} ms  p99 {stats['p99_ms']:.2f} ms")
+    resources = report['resources']
+    print(f"  CPU śr. {resources['cpu_mean_pct']:.0f}% (maks. {resources['cpu_max_pct']:.0f}%)  "
+          f"RSS maks. {resources['rss_max_mb']:.0f} MB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Test obciążenia ścieżki predykcji z raportem SLO")
+    parser.add_argument('--version', type=str, default='v1', help='Wersja modelu (domyślnie: v1)')
+    parser.add_argument('--fast', action='store_true', help='Użyj lekkiego wariantu modelu')
+    parser.add_argument('--sharded', action='store_true', help='Użyj zespołu modeli per gatunek')
+    parser.add_argument('--http', action='store_true',
+                        help='Obciążaj lokalny endpoint HTTP (uruchamiany w tym procesie) zamiast wywołań w procesie')
+    parser.add_argument('--url', type=str, default=None,
+                        help='Adres działającego endpointu, np. http://127.0.0.1:8000/predict (inference.py --serve)')
+    parser.add_argument('--concurrency', type=int, default=4, help='Liczba równoległych wątków wysyłających')
+    parser.add_argument('--rate', type=float, default=None,
+                        help='Żądania na sekundę (przybycia Poissona); bez tej opcji - maksymalna przepustowość')
+    parser.add_argument('--rates', type=float, nargs='+', default=None,
+                        help='Szukanie przepustowości: kolejne poziomy req/s do pierwszego niespełnionego SLO')
+    parser.add_argument('--duration', type=float, default=10.0, help='Czas pomiaru na poziom (sekundy)')
+    parser.add_argument('--warmup', type=float, default=1.0, help='Czas rozgrzewki pomijany w wynikach (sekundy)')
+    parser.add_argument('--batch-mix', type=parse_batch_mix, default={1: 1.0},
+                        help="Rozkład rozmiarów partii, np. '1:0.7,10:0.2,100:0.1' (domyślnie: 1)")
+    parser.add_argument('--slo', type=str, action='append', default=None,
+                        help="Cel latencji, np. 'p99<20ms' (można podać wiele; domyślnie: p99<20ms)")
+    parser.add_argument('--min-throughput', type=float, default=None, help='Minimalna liczba predykcji na sekundę')
+    parser.add_argument('--max-error-rate', type=float, default=0.0, help='Maksymalny odsetek błędnych żądań')
+    parser.add_argument('--output', type=str, default=None, help='Ścieżka pliku JSON z raportem')
+    args = parser.parse_args()
+    objectives = args.slo or list(DEFAULT_SLO)
+
+    try:
+        target, server = build_target(args)
+    except FileNotFoundError:
+        logger.error(f"Nie znaleziono plików modelu dla wersji '{args.version}'.")
+        sys.exit(1)
+
+    tester = LoadTester(target, concurrency=args.concurrency, rate=args.rate, duration=args.duration,
+                        batch_mix=args.batch_mix, warmup=args.warmup)
+    try:
+        if args.rates:
+            result = find_capacity(tester, args.rates, objectives, max_error_rate=args.max_error_rate)
+            for step in result['steps']:
+                print_report(step)
+            capacity = result['capacity']
+            passed = capacity is not None
+            print(f"Przepustowość przy {', '.join(objectives)}: " + (
+                f"{capacity['predictions_per_s']:,.1f} predykcji/s ({capacity['rate']:g} req/s)"
+                if passed else "żaden poziom nie spełnia SLO"))
+        else:
+            result = tester.run()
+            result['slo'] = check_slo(result, objectives, min_predictions_per_s=args.min_throughput,
+                                      max_error_rate=args.max_error_rate)
+            print_report(result)
+            for check in result['slo']['checks']:
+                print(f"  {'PASS' if check['passed'] else 'FAIL'}  {check['name']:<24} {check['value']:.3f}")
+            passed = result['slo']['passed']
+    finally:
+        if server is not None:
+            server.shutdown()
+
+    output = args.output or f"reports/loadtest/loadtest_{args.version}_{datetime.now():%Y%m%d_%H%M%S}.json"
+    save_results(result, output)
+    print(f"SLO: {'PASS' if passed else 'FAIL'}")
+    # Kod wyjścia pozwala użyć testu jako bramki regresji wydajności
+    sys.exit(0 if passed else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,74 +1,259 @@
+import argparse
 import logging
 import os
-import xgboost as xgb
-from src.loaders import DataLoaderFactory
+from typing import Optional
+import pandas as pd
+from src.loaders import DATA_SOURCE, DataLoaderFactory
 from src.cleaners import SpotifyDataCleaner
 from src.preprocessors import SpotifyPipelinePreprocessor
-from src.trainers import ModelTrainer
+from src.trainers import ModelTrainer, build_model
 from src.evaluation import ModelEvaluator
+from src.feature_store import FeatureStore
+from src.compression import ModelCompressor, save_compression_report
+from src.tree_engine import NumpyTreeEngine
+from src.similarity import SimilarTracksIndex, training_metadata
+from src.sharding import GenreShardedRegressor
+from src.planner import TrainingPlan, TrainingPlanner
+from src.external_memory import ExternalMemoryTrainer
+from src.benchmarks import compare_sharding, save_results
 from src.serializers import ModelSerializer
+from src.pipeline import PipelineRunner
+from src.manifest import RunManifest
+from src.metrics import metrics
+from src.profiling import StageProfiler, PROFILE_MODES
 
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
-def run_training_pipeline(version: str = 'v1'):
+def run_training_pipeline(version: str = 'v1', force: bool = False, profiler: Optional[StageProfiler] = None,
+                          feature_store: Optional[str] = None, manifest: Optional[RunManifest] = None,
+                          sharded: Optional[str] = None, plan: bool = False, plan_file: Optional[str] = None):
     logger.info("ROZPOCZYNANIE PROCESU TRENINGOWEGO")
+    manifest = manifest or RunManifest(f'training_{version}')
 
     # Przygotowanie folderu na dane
     os.makedirs('data', exist_ok=True)
+    raw_path = f'data/raw_data_{version}.parquet'
+    clean_path = f'data/clean_data_{version}.parquet'
+
+    serializer = ModelSerializer()
+    model_file = f'spotify-xgb-model_{version}.joblib'
+    fast_model_file = f'spotify-xgb-model_{version}.fast.joblib'
+    sharded_model_file = f'spotify-xgb-model_{version}.sharded.joblib'
+    preprocessor_file = f'spotify-preprocessor_{version}.joblib'
+    similarity_file = f'spotify-similar-tracks_{version}.joblib'
+
+    # Definicja etapów. Zapisy na dysk, ewaluacja i serializacja preprocessora
+    # nie blokują kolejnych etapów i wykonują się równolegle.
+    pipeline = PipelineRunner(f'training_{version}', force=force, profiler=profiler)
 
     # Ładowanie danych
-    data_source = "hf://datasets/maharshipandya/spotify-tracks-dataset/dataset.csv"
-    loader = DataLoaderFactory.get_loader(data_source)
-    raw_df = loader.load()
-    raw_df.to_parquet(f'data/raw_data_{version}.parquet')
+    pipeline.add_stage('load', lambda: DataLoaderFactory.get_loader(DATA_SOURCE).load(),
+                       outputs=[raw_path], restore=lambda: pd.read_parquet(raw_path))
+    pipeline.add_stage('save_raw', lambda df: df.to_parquet(raw_path), deps=['load'], outputs=[raw_path])
 
     # Czyszczenie danych
     cleaner = SpotifyDataCleaner()
-    df_clean = cleaner.clean(raw_df)
-    df_clean.to_parquet(f'data/clean_data_{version}.parquet')
+    pipeline.add_stage('clean', lambda df: cleaner.clean(df), deps=['load'],
+                       outputs=[clean_path], restore=lambda: pd.read_parquet(clean_path))
+    pipeline.add_stage('save_clean', lambda df: df.to_parquet(clean_path), deps=['clean'], outputs=[clean_path])
 
     # Preprocessing-przygotowanie zbiorów danych do trenowania modelu
-    preprocessor = SpotifyPipelinePreprocessor(target_col='popularity', test_size=0.2)
-    X_train, X_test, y_train, y_test = preprocessor.process(df_clean)
-
-    # Konfiguracja modelu
-    logger.info("Inicjalizacja modelu XGBoost...")
-    model = xgb.XGBRegressor(
-        n_estimators=1500,
-        learning_rate=0.03,
-        max_depth=12,
-        subsample=0.8,
-        colsample_bytree=0.7,
-        objective='reg:squarederror',
-        n_jobs=-1,
-        random_state=42,
-        min_child_weight=1,
-    )
+    preprocessor = SpotifyPipelinePreprocessor(target_col='popularity', test_size=0.2, random_state=manifest.seed)
+    pipeline.add_stage('preprocess', preprocessor.process, deps=['clean'])
+
+    # Odcisk danych, na których trenowany jest model (manifest przebiegu)
+    pipeline.add_stage('fingerprint', lambda df: manifest.record_dataset(df, source=DATA_SOURCE),
+                       deps=['clean'])
+    pipeline.add_stage('save_preprocessor', lambda _: serializer.save(preprocessor, preprocessor_file),
+                       deps=['preprocess'])
+
+    # Plan budżetu treningu: część danych i liczba rund z krzywej uczenia (nowy lub zapisany wcześniej)
+    if plan:
+        planner = TrainingPlanner(lambda n: build_model(n, manifest.seed), n_jobs=manifest.n_jobs, seed=manifest.seed)
+        plan_path = plan_file or f'reports/plans/training_plan_{version}.json'
+
+        def make_plan(data):
+            training_plan = planner.plan(data[0], data[2])
+            training_plan.save(plan_path)
+            return training_plan
+
+        pipeline.add_stage('plan', make_plan, deps=['preprocess'])
+    elif plan_file:
+        pipeline.add_stage('plan', lambda: TrainingPlan.load(plan_file))
 
     # Trening
     trainer = ModelTrainer()
-    trainer.train(model, X_train, y_train)
+
+    def train(data, training_plan: Optional[TrainingPlan] = None):
+        model = build_model(manifest.n_jobs, manifest.seed)
+        X, y = data[0], data[2]
+        if training_plan is not None:
+            X, y = training_plan.subsample(X, y, seed=manifest.seed)
+            model.set_params(n_estimators=training_plan.n_estimators)
+            manifest.record('plan', {k: v for k, v in training_plan.to_dict().items() if k != 'grid'})
+        return trainer.train(model, X, y)
+
+    pipeline.add_stage('train', train, deps=['preprocess', 'plan'] if 'plan' in pipeline.stages else ['preprocess'])
 
     # Ewaluacja
-    evaluator = ModelEvaluator()
-    y_pred = model.predict(X_test)
-    metrics = evaluator.evaluate(y_test, y_pred, model_name="Production XGBoost")
+    # Wykresy renderowane są w tle do plików, a raport metryk trafia obok artefaktów modelu
+    evaluator = ModelEvaluator(plot_mode='background')
 
+    def evaluate(model, data):
+        predictions = model.predict(data[1])
+        results = evaluator.evaluate(
+            data[3], predictions, model_name="Production XGBoost", groups=preprocessor.get_categories(data[1]),
+            report_path=os.path.join(serializer.base_dir, f'spotify-xgb-model_{version}.metrics.json'))
+        manifest.record_metrics(results, predictions)
+        return results
 
-    # Serializacja
-    serializer = ModelSerializer()
+    pipeline.add_stage('evaluate', evaluate, deps=['train', 'preprocess'])
 
     # Serializacja modelu
-    serializer.save(model, f'spotify-xgb-model_{version}.joblib')
+    pipeline.add_stage('save_model', lambda model: serializer.save(model, model_file), deps=['train'])
+
+    # Eksport do samodzielnego silnika NumPy (predykcja bez xgboost i scikit-learn)
+    pipeline.add_stage('export_engine',
+                       lambda model, _: NumpyTreeEngine.from_model(model, preprocessor).save(
+                           os.path.join(serializer.base_dir, f'spotify-xgb-model_{version}.npz')),
+                       deps=['train', 'preprocess'])
+
+    # Kompresja: lekki wariant "fast" (mniej drzew lub płytszy uczeń) i raport dokładność vs latencja
+    compressor = ModelCompressor(n_jobs=manifest.n_jobs, seed=manifest.seed)
+    pipeline.add_stage('compress', lambda model, data: compressor.compress(model, data[0], data[1], data[3]),
+                       deps=['train', 'preprocess'])
+    pipeline.add_stage('save_fast_model',
+                       lambda compressed: (serializer.save(compressed[0], fast_model_file),
+                                           save_compression_report(compressed[1], os.path.join(
+                                               serializer.base_dir, f'spotify-xgb-model_{version}.compression.json'))),
+                       deps=['compress'])
+
+    # Indeks podobnych utworów (sąsiedzi w przestrzeni cech zbioru treningowego, ze znaną popularnością)
+    pipeline.add_stage('similarity_index',
+                       lambda raw, clean, data: serializer.save(
+                           SimilarTracksIndex().build(preprocessor, data[0], data[2],
+                                                      training_metadata(raw, clean, preprocessor)),
+                           similarity_file),
+                       deps=['load', 'clean', 'preprocess'])
 
-    # Serializacja preprocessora
-    serializer.save(preprocessor, f'spotify-preprocessor_{version}.joblib')
+    # Zespół mniejszych modeli per gatunek/klaster gatunków (trenowanych równolegle) i porównanie z modelem głównym.
+    # Trening zespołu startuje po treningu głównym, żeby czasy obu były porównywalne.
+    if sharded:
+        pipeline.add_stage('train_sharded',
+                           lambda _, data: trainer.train(GenreShardedRegressor.from_preprocessor(
+                               preprocessor, shard_by=sharded, n_jobs=manifest.n_jobs, random_state=manifest.seed),
+                               data[0], data[2]),
+                           deps=['train', 'preprocess'])
+        pipeline.add_stage('compare_sharded',
+                           lambda model, sharded_model, data: compare_sharding(
+                               {'monolithic': model, 'sharded': sharded_model}, data[1], data[3],
+                               preprocessor.get_categories(data[1])),
+                           deps=['train', 'train_sharded', 'preprocess'])
+        pipeline.add_stage('save_sharded_model', lambda model: serializer.save(model, sharded_model_file),
+                           deps=['train_sharded'])
+
+    # Magazyn cech: dopisuje tylko nowe utwory (wiersze czyszczone i wektory cech tej wersji preprocessora)
+    if feature_store:
+        store = FeatureStore(feature_store)
+        pipeline.add_stage('feature_store_ingest', store.ingest, deps=['load'])
+        pipeline.add_stage('feature_store_encode', lambda *_: store.encode(preprocessor, version),
+                           deps=['feature_store_ingest', 'preprocess'])
+
+    results = pipeline.run()
+    evaluator.wait()
+
+    if sharded:
+        comparison = results['compare_sharded']
+        for name, stage in (('monolithic', 'train'), ('sharded', 'train_sharded')):
+            comparison['models'][name]['fit_seconds'] = pipeline.report['stages'][stage]['seconds']
+        save_results(comparison, os.path.join(serializer.base_dir, f'spotify-xgb-model_{version}.sharding.json'))
+
+    manifest.record_cleaner(cleaner)
+    manifest.record_preprocessor(preprocessor)
+    manifest.record_model(results['train'])
+    manifest.record_pipeline(pipeline.report)
+    manifest.save()
 
     logger.info("KONIEC PROCESU TRENINGOWEGO")
+    return results.get('evaluate')
+
+
+def run_external_memory_training(source: str, version: str = 'v1', batch_rows: int = 65_536,
+                                 manifest: Optional[RunManifest] = None):
+    """
+    Trening na czyszczonych danych Parquet większych niż pamięć RAM (plik lub katalog, np. `cleaned/`
+    magazynu cech): preprocessor dopasowywany jest na próbce, a model czyta dane kawałkami.
+    """
+    logger.info(f"ROZPOCZYNANIE TRENINGU OUT-OF-CORE ({source})")
+    manifest = manifest or RunManifest(f'training_{version}')
+    serializer = ModelSerializer()
+    preprocessor = SpotifyPipelinePreprocessor(target_col='popularity', test_size=0.2, random_state=manifest.seed)
+    trainer = ExternalMemoryTrainer(batch_rows=batch_rows, seed=manifest.seed)
+
+    pipeline = PipelineRunner(f'training_{version}_external', force=True)
+    pipeline.add_stage('fit_preprocessor', lambda: trainer.fit_preprocessor(source, preprocessor))
+    pipeline.add_stage('save_preprocessor', lambda p: serializer.save(p, f'spotify-preprocessor_{version}.joblib'),
+                       deps=['fit_preprocessor'])
+    pipeline.add_stage('train', lambda p: trainer.train(build_model(manifest.n_jobs, manifest.seed), source, p),
+                       deps=['fit_preprocessor'])
+    pipeline.add_stage('save_model', lambda model: serializer.save(model, f'spotify-xgb-model_{version}.joblib'),
+                       deps=['train'])
+    results = pipeline.run()
+
+    save_results(trainer.report, os.path.join(serializer.base_dir, f'spotify-xgb-model_{version}.external.json'))
+    manifest.record('external_memory', trainer.report)
+    manifest.record_preprocessor(preprocessor)
+    manifest.record_model(results['train'])
+    manifest.record_pipeline(pipeline.report)
+    manifest.save()
+
+    logger.info("KONIEC TRENINGU OUT-OF-CORE")
+    return trainer.report
 
 
 if __name__ == "__main__":
-    run_training_pipeline()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Spotify Popularity Training Pipeline")
+    parser.add_argument('--version', type=str, default='v1', help='Wersja artefaktów (domyślnie: v1)')
+    parser.add_argument('--force', action='store_true', help='Uruchom wszystkie etapy, nawet jeśli są aktualne')
+    parser.add_argument('--profile', choices=PROFILE_MODES, default=None,
+                        help='Profilowanie etapów: cprofile lub sampling (+ migawki tracemalloc)')
+    parser.add_argument('--profile-dir', type=str, default='reports/profile', help='Katalog na wyniki profilowania')
+    parser.add_argument('--feature-store', type=str, default=None,
+                        help='Katalog magazynu cech, do którego dopisywane są nowe utwory (np. data/feature_store)')
+    parser.add_argument('--sharded', choices=GenreShardedRegressor.SHARD_BY, default=None,
+                        help='Dodatkowo trenuj zespół modeli per gatunek (genre) lub klaster gatunków (cluster)')
+    parser.add_argument('--plan', action='store_true',
+                        help='Wyznacz plan treningu (część danych i liczba rund z krzywej uczenia) i trenuj według niego')
+    parser.add_argument('--plan-file', type=str, default=None,
+                        help='Plik planu treningu (z --plan: gdzie zapisać, bez --plan: użyj zapisanego planu)')
+    parser.add_argument('--deterministic', action='store_true',
+                        help='Tryb deterministyczny: stałe ziarna i liczba wątków (wyniki niezależne od liczby rdzeni)')
+    parser.add_argument('--threads', type=int, default=None,
+                        help='Liczba wątków w trybie deterministycznym (domyślnie 4)')
+    parser.add_argument('--external-memory', type=str, default=None, metavar='PARQUET',
+                        help='Trenuj out-of-core na czyszczonych danych Parquet (plik lub katalog) większych niż RAM')
+    parser.add_argument('--batch-rows', type=int, default=65_536,
+                        help='Liczba wierszy kawałka w trybie --external-memory (domyślnie 65536)')
+    parser.add_argument('--metrics-dir', type=str, default='reports', help='Katalog na metryki (JSON log i plik Prometheus)')
+    args = parser.parse_args()
+
+    metrics.enable_json_log(os.path.join(args.metrics_dir, f'metrics_training_{args.version}.jsonl'))
+
+    profiler = StageProfiler(args.profile_dir, mode=args.profile) if args.profile else None
+    manifest = RunManifest(f'training_{args.version}', deterministic=args.deterministic, threads=args.threads)
+    try:
+        if args.external_memory:
+            run_external_memory_training(args.external_memory, version=args.version, batch_rows=args.batch_rows,
+                                         manifest=manifest)
+        else:
+            run_training_pipeline(version=args.version, force=args.force, profiler=profiler,
+                                  feature_store=args.feature_store, manifest=manifest, sharded=args.sharded,
+                                  plan=args.plan, plan_file=args.plan_file)
+        if profiler is not None:
+            profiler.write_summary()
+    finally:
+        # Metryki zapisywane także po błędzie - ułatwiają diagnozę nieudanego uruchomienia
+        metrics.write_prometheus(os.path.join(args.metrics_dir, f'metrics_training_{args.version}.prom'))
@@ -0,0 +1,480 @@
+import gc
+import json
+import logging
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+import sklearn
+import xgboost as xgb
+
+from src.cleaners import SpotifyDataCleaner
+from src.evaluation import ModelEvaluator
+from src.external_memory import ExternalMemoryTrainer, ParquetChunkIter, open_dataset
+from src.loaders import LocalCSVDataLoader
+from src.monitoring import DriftMonitor
+from src.predictors import SpotifyPredictor
+from src.preprocessors import SpotifyPipelinePreprocessor
+from src.resources import PeakMemorySampler, Stopwatch, batch_latency, current_rss_mb, latency_percentiles
+from src.serializers import ModelSerializer
+from src.sharding import GenreShardedRegressor
+from src.similarity import SimilarTracksIndex, brute_force_neighbours
+from src.synthetic import make_synthetic_tracks, sample_songs, write_synthetic_csv, write_synthetic_parquet
+from src.tree_engine import NumpyTreeEngine
+from src.trainers import ModelTrainer
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SIZES = [10_000, 100_000, 1_000_000, 10_000_000]
+
+# Konfiguracja modelu produkcyjnego (main.py) jako punkt odniesienia dla zespołu per gatunek
+MONOLITHIC_PARAMS = {'n_estimators': 1500, 'learning_rate': 0.03, 'max_depth': 12, 'subsample': 0.8,
+                     'colsample_bytree': 0.7, 'objective': 'reg:squarederror'}
+
+# Metryki porównywane między przebiegami (wyższa wartość = gorzej)
+TIME_METRICS = ['seconds', 'p50_ms', 'p95_ms', 'p99_ms']
+MEMORY_METRICS = ['peak_rss_mb']
+
+
+class BenchmarkSuite:
+    """
+    Mierzy przepustowość wszystkich etapów pipeline'u (ładowanie, czyszczenie, preprocessing,
+    trening, serializacja, predykcja, wyjaśnienia) na syntetycznych danych o rosnącym rozmiarze.
+    """
+
+    def __init__(self, sizes: Sequence[int] = DEFAULT_SIZES, data_dir: str = 'data/benchmarks',
+                 n_estimators: int = 100, max_depth: int = 8, single_predict_calls: int = 200,
+                 batch_size: int = 1000, batch_repeats: int = 20, explain_rows: int = 10_000, seed: int = 42):
+        self.sizes = list(sizes)
+        self.data_dir = data_dir
+        self.n_estimators = n_estimators
+        self.max_depth = max_depth
+        self.single_predict_calls = single_predict_calls
+        self.batch_size = batch_size
+        self.batch_repeats = batch_repeats
+        self.explain_rows = explain_rows
+        self.seed = seed
+
+    def run(self) -> Dict[str, Any]:
+        """Uruchamia benchmark dla wszystkich rozmiarów i zwraca wyniki gotowe do zapisu jako JSON."""
+        results = {
+            'meta': self._environment(),
+            'config': {
+                'n_estimators': self.n_estimators,
+                'max_depth': self.max_depth,
+                'single_predict_calls': self.single_predict_calls,
+                'batch_size': self.batch_size,
+                'batch_repeats': self.batch_repeats,
+            },
+            'results': {},
+        }
+
+        with PeakMemorySampler() as sampler:
+            for n_rows in self.sizes:
+                logger.info(f"Benchmarking pipeline on {n_rows} rows...")
+                results['results'][str(n_rows)] = self._run_size(n_rows, sampler)
+                gc.collect()
+
+        return results
+
+    def _run_size(self, n_rows: int, sampler: PeakMemorySampler) -> Dict[str, Any]:
+        csv_path = os.path.join(self.data_dir, f'synthetic_{n_rows}.csv')
+        if not os.path.exists(csv_path):
+            write_synthetic_csv(csv_path, n_rows, seed=self.seed)
+
+        stages: Dict[str, Any] = {}
+
+        def measure(name: str, func: Callable[[], Any], rows: int) -> Any:
+            sampler.open(name)
+            with Stopwatch() as sw:
+                result = func()
+            stages[name] = {
+                'seconds': sw.elapsed,
+                'rows': rows,
+                'rows_per_s': rows / sw.elapsed if sw.elapsed > 0 else float('inf'),
+                'peak_rss_mb': sampler.close(name),
+            }
+            logger.info(f"  {name:<20} {sw.elapsed:>9.3f}s  ({stages[name]['rows_per_s']:,.0f} rows/s)")
+            return result
+
+        raw = measure('load', LocalCSVDataLoader(csv_path).load, n_rows)
+        measure('load_parallel', LocalCSVDataLoader(csv_path, engine='pyarrow').load, n_rows)
+        csv_mb = os.path.getsize(csv_path) / 1024 ** 2
+        for name in ('load', 'load_parallel'):
+            stages[name]['mb_per_s'] = csv_mb / stages[name]['seconds']
+        clean = measure('clean', lambda: SpotifyDataCleaner().clean(raw), len(raw))
+        del raw
+
+        preprocessor = SpotifyPipelinePreprocessor(target_col='popularity', test_size=0.2, random_state=self.seed)
+        X_train, X_test, y_train, _ = measure('process', lambda: preprocessor.process(clean), len(clean))
+
+        features = clean.drop(columns=['popularity'])
+        measure('transform_new_data', lambda: preprocessor.transform_new_data(features), len(features))
+
+        model = xgb.XGBRegressor(n_estimators=self.n_estimators, max_depth=self.max_depth, learning_rate=0.1,
+                                 objective='reg:squarederror', n_jobs=-1, random_state=self.seed)
+        measure('train', lambda: ModelTrainer().train(model, X_train, y_train), len(X_train))
+        measure('model_predict', lambda: model.predict(X_test), len(X_test))
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            serializer = ModelSerializer(base_dir=tmp_dir)
+
+            def save_artifacts():
+                serializer.save(model, 'model.joblib')
+                serializer.save(preprocessor, 'preprocessor.joblib')
+
+            measure('serialize', save_artifacts, 2)
+            predictor = measure('predictor_load',
+                                lambda: SpotifyPredictor('model.joblib', 'preprocessor.joblib', base_dir=tmp_dir), 2)
+
+        stages['predict_single'] = self._single_latency(predictor, features)
+        stages['predict_batch'] = self._batch_latency(predictor, features)
+
+        # Koszt monitora dryfu na partię tej samej wielkości co predict_batch
+        batch = features.iloc[:min(self.batch_size, len(features))]
+        monitor = DriftMonitor(preprocessor.reference_profile)
+        measure('drift_monitor', lambda: monitor.observe(batch), len(batch))
+
+        explain_rows = min(self.explain_rows, len(features))
+        measure('explain', lambda: predictor.explain(features.iloc[:explain_rows]), explain_rows)
+        return stages
+
+    def _single_latency(self, predictor: SpotifyPredictor, features: pd.DataFrame) -> Dict[str, float]:
+        songs = features.sample(n=min(self.single_predict_calls, len(features)), replace=False,
+                                random_state=self.seed).to_dict(orient='records')
+        predictor.predict(songs[0])  # rozgrzewka
+
+        latencies = []
+        for song in songs:
+            with Stopwatch() as sw:
+                predictor.predict(song)
+            latencies.append(sw.elapsed)
+
+        stats = latency_percentiles(latencies)
+        stats['rows_per_s'] = len(latencies) / sum(latencies)
+        logger.info(f"  predict_single       p50={stats['p50_ms']:.2f}ms p99={stats['p99_ms']:.2f}ms")
+        return stats
+
+    def _batch_latency(self, predictor: SpotifyPredictor, features: pd.DataFrame) -> Dict[str, float]:
+        batch_size = min(self.batch_size, len(features))
+        rng = np.random.default_rng(self.seed)
+        predictor.predict_batch(features.iloc[:batch_size])  # rozgrzewka
+
+        latencies = []
+        for _ in range(self.batch_repeats):
+            start = int(rng.integers(0, len(features) - batch_size + 1))
+            batch = features.iloc[start:start + batch_size]
+            with Stopwatch() as sw:
+                predictor.predict_batch(batch)
+            latencies.append(sw.elapsed)
+
+        stats = latency_percentiles(latencies)
+        stats['batch_size'] = batch_size
+        stats['rows_per_s'] = batch_size * len(latencies) / sum(latencies)
+        logger.info(f"  predict_batch        p50={stats['p50_ms']:.2f}ms ({stats['rows_per_s']:,.0f} rows/s)")
+        return stats
+
+    @staticmethod
+    def _environment() -> Dict[str, Any]:
+        return {
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'pandas': pd.__version__,
+            'numpy': np.__version__,
+            'sklearn': sklearn.__version__,
+            'xgboost': xgb.__version__,
+        }
+
+
+# Skrypty uruchamiane w świeżym interpreterze: koszt importu i wczytania artefaktów bez wpływu bieżącego procesu
+_RUNTIME_LOADERS = {
+    'xgboost': "from src.predictors import SpotifyPredictor\n"
+               "SpotifyPredictor({model!r}, {preprocessor!r}, base_dir={base_dir!r})",
+    'numpy_engine': "from src.tree_engine import NumpyTreeEngine\n"
+                    "NumpyTreeEngine.load({engine!r})",
+}
+
+_RUNTIME_PROBE = """
+import json, sys, time
+start = time.perf_counter()
+{loader}
+elapsed = time.perf_counter() - start
+from src.resources import current_rss_mb, peak_rss_mb
+print(json.dumps({{'load_seconds': elapsed, 'rss_mb': current_rss_mb(), 'peak_rss_mb': peak_rss_mb(),
+                  'imports_xgboost': 'xgboost' in sys.modules, 'imports_sklearn': 'sklearn' in sys.modules}}))
+"""
+
+
+def compare_engines(model_file: str, preprocessor_file: str, engine_path: str, base_dir: str = 'models',
+                    n_rows: int = 100_000, batch_size: int = 10_000, seed: int = 42) -> Dict[str, Any]:
+    """
+    Porównuje runtime XGBoost (SpotifyPredictor) z wyeksportowanym silnikiem NumPy: czas importu
+    i wczytania artefaktów oraz pamięć (w osobnych procesach), przepustowość predykcji wsadowej
+    i maksymalną różnicę predykcji.
+    """
+    predictor = SpotifyPredictor(model_file, preprocessor_file, base_dir=base_dir)
+    if not os.path.exists(engine_path):
+        NumpyTreeEngine.from_model(predictor.model, predictor.preprocessor).save(engine_path)
+    engine = NumpyTreeEngine.load(engine_path)
+
+    features = pd.DataFrame(sample_songs(n_rows, seed=seed))
+    runtimes = {
+        'xgboost': predictor.predict_batch,
+        'numpy_engine': engine.predict,
+    }
+
+    results: Dict[str, Any] = {'meta': BenchmarkSuite._environment(), 'n_rows': n_rows, 'runtimes': {}}
+    predictions = {}
+    for name, predict in runtimes.items():
+        loader = _RUNTIME_LOADERS[name].format(model=model_file, preprocessor=preprocessor_file,
+                                               base_dir=base_dir, engine=engine_path)
+        probe = subprocess.run([sys.executable, '-c', _RUNTIME_PROBE.format(loader=loader)], check=True,
+                               capture_output=True, text=True, cwd=os.path.dirname(os.path.dirname(__file__)) or '.')
+        stats = json.loads(probe.stdout.strip().splitlines()[-1])
+
+        parts, latencies = [], []
+        for start in range(0, n_rows, batch_size):
+            with Stopwatch() as sw:
+                parts.append(predict(features.iloc[start:start + batch_size]))
+            latencies.append(sw.elapsed)
+        predictions[name] = np.concatenate(parts)
+
+        stats.update(latency_percentiles(latencies))
+        stats['batch_size'] = batch_size
+        stats['rows_per_s'] = n_rows / sum(latencies)
+        results['runtimes'][name] = stats
+        logger.info(f"  {name:<14} load {stats['load_seconds']:.3f}s, RSS {stats['rss_mb']:.0f} MB, "
+                    f"{stats['rows_per_s']:,.0f} rows/s")
+
+    results['max_abs_diff'] = float(np.abs(predictions['xgboost'] - predictions['numpy_engine']).max())
+    return results
+
+
+def compare_csv_loaders(csv_path: str, repeats: int = 3) -> Dict[str, Any]:
+    """
+    Porównuje przepustowość (MB/s i wiersze/s) oraz szczyt pamięci wczytywania pliku CSV
+    obecnym parserem pandas i równoległym czytnikiem pyarrow. Raportowany jest najlepszy z `repeats` czasów.
+    """
+    file_mb = os.path.getsize(csv_path) / 1024 ** 2
+    results: Dict[str, Any] = {'meta': BenchmarkSuite._environment(), 'file': csv_path, 'file_mb': file_mb,
+                               'loaders': {}}
+
+    with PeakMemorySampler() as sampler:
+        for engine in LocalCSVDataLoader.ENGINES:
+            loader = LocalCSVDataLoader(csv_path, engine=engine)
+            timings = []
+            for _ in range(repeats):
+                gc.collect()
+                sampler.open(engine)
+                with Stopwatch() as sw:
+                    n_rows = len(loader.load())
+                timings.append(sw.elapsed)
+                peak = sampler.close(engine)
+
+            best = min(timings)
+            results['loaders'][engine] = {
+                'seconds': best,
+                'rows': n_rows,
+                'mb_per_s': file_mb / best,
+                'rows_per_s': n_rows / best,
+                'peak_rss_mb': peak,
+            }
+            logger.info(f"  {engine:<8} {best:>8.3f}s  {file_mb / best:>8.1f} MB/s  ({n_rows / best:,.0f} rows/s)")
+
+    results['speedup'] = results['loaders']['pandas']['seconds'] / results['loaders']['pyarrow']['seconds']
+    return results
+
+
+def compare_similarity_indexes(n_rows: int = 100_000, n_queries: int = 1000, k: int = 10,
+                               n_probes: Sequence[int] = (4, 8, 16, 32), repeats: int = 5,
+                               seed: int = 42) -> Dict[str, Any]:
+    """
+    Porównuje indeksy podobnych utworów na syntetycznym katalogu: czas budowy, latencję zapytań
+    top-k dla partii `n_queries` utworów oraz trafność (recall@k) względem pełnego przeszukania.
+    """
+    clean = SpotifyDataCleaner().clean(make_synthetic_tracks(n_rows, seed=seed))
+    preprocessor = SpotifyPipelinePreprocessor(target_col='popularity', test_size=0.2, random_state=seed)
+    X_train, X_test, y_train, _ = preprocessor.process(clean)
+    queries = X_test[:n_queries]
+
+    variants = {'kdtree': SimilarTracksIndex(method='kdtree')}
+    variants.update({f'ivf_probe{n_probe}': SimilarTracksIndex(method='ivf', n_probe=n_probe, seed=seed)
+                     for n_probe in n_probes})
+
+    results: Dict[str, Any] = {'meta': BenchmarkSuite._environment(), 'n_index': len(X_train),
+                               'n_queries': len(queries), 'k': k, 'indexes': {}}
+    reference = None
+    for name, index in variants.items():
+        with Stopwatch() as sw:
+            index.build(preprocessor, X_train, y_train)
+        if reference is None:
+            with Stopwatch() as brute:
+                reference = brute_force_neighbours(index, X_train, queries, k)
+            results['brute_force_seconds'] = brute.elapsed
+
+        stats = batch_latency(lambda batch: index.query(batch, k), queries, repeats=repeats)
+        found = index.query(queries, k)[1]
+        stats['build_seconds'] = sw.elapsed
+        stats['recall'] = float(np.mean([len(set(a) & set(b)) / len(b) for a, b in zip(found, reference)]))
+        results['indexes'][name] = stats
+        logger.info(f"  {name:<12} build {sw.elapsed:.2f}s, p50 {stats['p50_ms']:.1f} ms / {len(queries)} queries, "
+                    f"recall@{k} {stats['recall']:.3f}")
+    return results
+
+
+def compare_sharding(models: Dict[str, Any], X_test: np.ndarray, y_test: np.ndarray, groups: Sequence,
+                     batch_size: int = 1000, repeats: int = 20) -> Dict[str, Any]:
+    """
+    Porównuje wytrenowane modele (np. monolityczny i GenreShardedRegressor) na zbiorze testowym:
+    RMSE/MAE/R2 ogółem, RMSE dla gatunków rzadkich (obsługiwanych przez model globalny zespołu)
+    i latencja predykcji partii.
+    """
+    evaluator = ModelEvaluator(plot_mode='none')
+    y_test = np.asarray(y_test, dtype=np.float64)
+    groups = np.asarray(groups, dtype=object)
+    sharded = next((m for m in models.values() if isinstance(m, GenreShardedRegressor)), None)
+    rare = np.zeros(len(y_test), dtype=bool)
+    if sharded is not None:
+        rare = sharded.route(X_test) == sharded.global_shard
+
+    results: Dict[str, Any] = {'meta': BenchmarkSuite._environment(), 'n_test': len(y_test),
+                               'rare_rows': int(rare.sum()), 'models': {}}
+    batch = X_test[:min(batch_size, len(X_test))]
+    for name, model in models.items():
+        predictions = np.asarray(model.predict(X_test), dtype=np.float64)
+        stats = evaluator._calculate_metrics(y_test, predictions)
+        if rare.any():
+            stats['rare_rmse'] = float(np.sqrt(np.mean((y_test[rare] - predictions[rare]) ** 2)))
+        stats['predict_latency'] = batch_latency(model.predict, batch, repeats=repeats)
+        if isinstance(model, GenreShardedRegressor):
+            stats['shards'] = model.shards
+        results['models'][name] = stats
+        logger.info(f"  {name:<12} RMSE {stats['rmse']:.3f}, R2 {stats['r2']:.3f}, "
+                    f"p50 {stats['predict_latency']['p50_ms']:.2f} ms / {len(batch)} rows")
+    return results
+
+
+def benchmark_sharding(n_rows: int = 200_000, n_genres: int = 114, monolithic_params: Optional[Dict[str, Any]] = None,
+                       shard_by: str = 'cluster', min_rows: int = 1000, seed: int = 42) -> Dict[str, Any]:
+    """
+    Trenuje model monolityczny i zespół per gatunek na syntetycznych danych i porównuje
+    czas treningu, latencję i dokładność (compare_sharding).
+    """
+    clean = SpotifyDataCleaner().clean(make_synthetic_tracks(n_rows, seed=seed, n_genres=n_genres))
+    preprocessor = SpotifyPipelinePreprocessor(target_col='popularity', test_size=0.2, random_state=seed)
+    X_train, X_test, y_train, y_test = preprocessor.process(clean)
+
+    models = {
+        'monolithic': xgb.XGBRegressor(**(monolithic_params or MONOLITHIC_PARAMS), n_jobs=-1, random_state=seed),
+        'sharded': GenreShardedRegressor.from_preprocessor(preprocessor, shard_by=shard_by, min_rows=min_rows,
+                                                           random_state=seed),
+    }
+    fit_seconds = {}
+    for name, model in models.items():
+        with Stopwatch() as sw:
+            ModelTrainer().train(model, X_train, y_train)
+        fit_seconds[name] = sw.elapsed
+
+    results = compare_sharding(models, X_test, y_test, preprocessor.get_categories(X_test))
+    for name, seconds in fit_seconds.items():
+        results['models'][name]['fit_seconds'] = seconds
+    results['n_rows'] = n_rows
+    return results
+
+
+def benchmark_external_memory(parquet_path: str, n_rows: int = 1_000_000, batch_rows: int = 65_536,
+                              model_params: Optional[Dict[str, Any]] = None, in_memory: bool = True,
+                              seed: int = 42) -> Dict[str, Any]:
+    """
+    Porównuje trening out-of-core (ExternalMemoryTrainer) z treningiem w pamięci na tym samym
+    czyszczonym pliku Parquet (tworzonym, jeśli nie istnieje): przepustowość i przyrost szczytu RSS.
+    Trening out-of-core wykonywany jest pierwszy, żeby pamięć zajęta przez wariant w pamięci
+    nie zawyżała jego wyniku.
+    """
+    if not os.path.exists(parquet_path):
+        write_synthetic_parquet(parquet_path, n_rows, seed=seed, chunk_size=min(n_rows, 500_000))
+    params = {**(model_params or MONOLITHIC_PARAMS), 'tree_method': 'hist', 'n_jobs': -1, 'random_state': seed}
+    results: Dict[str, Any] = {'source': parquet_path, 'rows': open_dataset(parquet_path).count_rows(), 'models': {}}
+
+    baseline = current_rss_mb()
+    trainer = ExternalMemoryTrainer(batch_rows=batch_rows, seed=seed)
+    preprocessor = trainer.fit_preprocessor(parquet_path, SpotifyPipelinePreprocessor(target_col='popularity'))
+    trainer.train(xgb.XGBRegressor(**params), parquet_path, preprocessor)
+    report = trainer.report
+    results['models']['external_memory'] = {
+        'fit_seconds': report['build_seconds'] + report['fit_seconds'],
+        'rows_per_s': report['rows_per_s'],
+        'peak_rss_delta_mb': report['peak_rss_mb'] - baseline,
+        'cache_mb': report['cache_mb'],
+        **{k: v for k, v in report['holdout'].items() if k != 'rows'},
+    }
+
+    if in_memory:
+        gc.collect()
+        baseline = current_rss_mb()
+        with PeakMemorySampler() as sampler:
+            sampler.open('train')
+            with Stopwatch() as sw:
+                # Te same wiersze treningowe (bez wydzielonych) co w treningu out-of-core, ale w całości w RAM
+                chunks = ParquetChunkIter(open_dataset(parquet_path), preprocessor, cache_prefix='',
+                                          batch_rows=batch_rows, holdout=trainer.holdout, seed=seed)
+                X, y = (np.concatenate(parts) for parts in zip(*chunks.chunks_with_labels()))
+                model = ModelTrainer().train(xgb.XGBRegressor(**params), X, y)
+            peak = sampler.close('train')
+        holdout = trainer.evaluate(model, parquet_path, preprocessor)
+        results['models']['in_memory'] = {
+            'fit_seconds': sw.elapsed,
+            'rows_per_s': len(y) / sw.elapsed,
+            'peak_rss_delta_mb': peak - baseline,
+            **{k: v for k, v in holdout.items() if k != 'rows'},
+        }
+    return results
+
+
+def save_results(results: Dict[str, Any], path: str) -> str:
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump(results, f, indent=2)
+    logger.info(f"Benchmark results saved to {path}")
+    return path
+
+
+def load_results(path: str) -> Dict[str, Any]:
+    with open(path) as f:
+        return json.load(f)
+
+
+def compare_results(baseline: Dict[str, Any], candidate: Dict[str, Any], time_threshold: float = 0.10,
+                    memory_threshold: float = 0.20) -> List[Dict[str, Any]]:
+    """
+    Porównuje dwa przebiegi benchmarku i zwraca listę regresji, czyli metryk, które
+    pogorszyły się o więcej niż zadany próg (względnie, np. 0.10 = 10%).
+    """
+    regressions = []
+    for size, stages in candidate.get('results', {}).items():
+        base_stages = baseline.get('results', {}).get(size)
+        if base_stages is None:
+            continue
+
+        for stage, metrics in stages.items():
+            base_metrics = base_stages.get(stage, {})
+            for metric, threshold in [(m, time_threshold) for m in TIME_METRICS] + \
+                                     [(m, memory_threshold) for m in MEMORY_METRICS]:
+                old, new = base_metrics.get(metric), metrics.get(metric)
+                if not old or new is None:
+                    continue
+                change = new / old - 1
+                if change > threshold:
+                    regressions.append({
+                        'size': size, 'stage': stage, 'metric': metric,
+                        'baseline': old, 'candidate': new, 'change': change,
+                    })
+    return regressions
@@ -3,6 +3,8 @@ from abc import ABC, abstractmethod
 
 import pandas as pd
 
+from src.metrics import metrics
+
 
 logger = logging.getLogger(__name__)
 
@@ -15,6 +17,16 @@ class DataCleaner(ABC):
 
 
 class SpotifyDataCleaner(DataCleaner):
+    """
+    Czyści surowe dane Spotify: duplikaty, kolumny techniczne i identyfikatory, braki, typy danych.
+
+    Args:
+        keep_track_id: Po deduplikacji przenosi track_id do indeksu zamiast go usuwać
+            (np. dla magazynu cech, który identyfikuje wiersze po kluczu utworu).
+    """
+
+    def __init__(self, keep_track_id: bool = False):
+        self.keep_track_id = keep_track_id
 
     def clean(self, df: pd.DataFrame) -> pd.DataFrame:
 
@@ -23,14 +35,20 @@ class SpotifyDataCleaner(DataCleaner):
         initial_shape = df.shape
         logger.info(f"Initial shape: {initial_shape}")
 
-        df = self._drop_unnecessary_columns(df)
-        df = self._remove_duplicates(df)
-        df = self._drop_high_cardinality_columns(df)
-        df = self._handle_missing_values(df)
-        df = self._convert_data_types(df)
+        steps = [
+            self._drop_unnecessary_columns,
+            self._remove_duplicates,
+            self._drop_high_cardinality_columns,
+            self._handle_missing_values,
+            self._convert_data_types,
+        ]
+        for step in steps:
+            with metrics.timer('spotify_clean_step_seconds', step=step.__name__.lstrip('_')):
+                df = step(df)
 
         logger.info(f"Data cleaning completed. Final shape: {df.shape}")
         logger.info(f"(Removed {initial_shape[0] - df.shape[0]} rows)")
+        metrics.inc('spotify_clean_rows_removed_total', initial_shape[0] - df.shape[0])
         logger.info(f"Shape after cleaning: {df.shape}")
 
         return df
@@ -67,7 +85,10 @@ class SpotifyDataCleaner(DataCleaner):
                 df = df.drop_duplicates(subset=['track_id'], keep='first')
 
                 # Po usunięciu duplikatów, track_id nie jest już potrzebne jako cecha
-                df = df.drop(columns=['track_id'])
+                if not self.keep_track_id:
+                    df = df.drop(columns=['track_id'])
+            if self.keep_track_id:
+                df = df.set_index('track_id')
         else:
             # Fallback dla standardowych duplikatów
             duplicates = df.duplicated().sum()
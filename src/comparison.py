@@ -0,0 +1,164 @@
+import json
+import logging
+import os
+import pickle
+import threading
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+import xgboost as xgb
+from sklearn.dummy import DummyRegressor
+from sklearn.ensemble import HistGradientBoostingRegressor
+from sklearn.linear_model import Ridge
+from threadpoolctl import threadpool_limits
+
+from src.evaluation import ModelEvaluator
+from src.resources import Stopwatch, batch_latency
+from src.trainers import ModelTrainer
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class ModelSpec:
+    """
+    Opis modelu do porównania.
+
+    Args:
+        name: Nazwa w rankingu.
+        build: Funkcja tworząca nowy (niewytrenowany) model; dostaje liczbę przydzielonych wątków.
+        threads: Liczba rdzeni rezerwowana z budżetu CPU na czas treningu.
+    """
+    name: str
+    build: Callable[[int], Any]
+    threads: int = 1
+
+
+def default_specs(threads: int = 4) -> List[ModelSpec]:
+    """Zestaw bazowy: dwa warianty XGBoost, HistGradientBoosting sklearn oraz modele liniowy i stały."""
+    return [
+        ModelSpec('xgb_depth6', lambda n: xgb.XGBRegressor(
+            n_estimators=500, learning_rate=0.05, max_depth=6, subsample=0.8, colsample_bytree=0.7,
+            objective='reg:squarederror', n_jobs=n, random_state=42), threads),
+        ModelSpec('xgb_depth10', lambda n: xgb.XGBRegressor(
+            n_estimators=800, learning_rate=0.03, max_depth=10, subsample=0.8, colsample_bytree=0.7,
+            objective='reg:squarederror', n_jobs=n, random_state=42), threads),
+        # HistGradientBoosting nie ma n_jobs - liczbę wątków OpenMP ogranicza ModelComparison._fit
+        ModelSpec('hist_gbm', lambda n: HistGradientBoostingRegressor(
+            max_iter=500, learning_rate=0.05, max_leaf_nodes=63, random_state=42), threads),
+        ModelSpec('ridge', lambda n: Ridge(alpha=1.0), 1),
+        ModelSpec('mean_baseline', lambda n: DummyRegressor(strategy='mean'), 1),
+    ]
+
+
+class _CpuBudget:
+    """Licznik wolnych rdzeni: zadanie czeka, aż będzie mogło zarezerwować swoją liczbę wątków."""
+
+    def __init__(self, total: int):
+        self.total = total
+        self._free = total
+        self._cond = threading.Condition()
+
+    @contextmanager
+    def reserve(self, threads: int) -> Iterator[int]:
+        threads = max(1, min(threads, self.total))
+        with self._cond:
+            self._cond.wait_for(lambda: self._free >= threads)
+            self._free -= threads
+        try:
+            yield threads
+        finally:
+            with self._cond:
+                self._free += threads
+                self._cond.notify_all()
+
+
+class ModelComparison:
+    """
+    Trenuje wiele modeli równolegle na wspólnych (niekopiowanych) macierzach, w ramach budżetu CPU,
+    i buduje ranking: RMSE/MAE/R2, czas treningu, latencja predykcji i rozmiar modelu.
+
+    Treningi biegną współbieżnie (XGBoost i sklearn zwalniają GIL), a pomiary latencji
+    wykonywane są po kolei, po zakończeniu wszystkich treningów, żeby nie zakłócały się nawzajem.
+
+    Args:
+        specs: Lista modeli do porównania.
+        cpu_budget: Łączna liczba rdzeni dla jednocześnie trenowanych modeli (domyślnie wszystkie).
+        latency_batch_size: Rozmiar partii do pomiaru latencji predykcji.
+        latency_repeats: Liczba powtórzeń pomiaru latencji.
+    """
+
+    def __init__(self, specs: Sequence[ModelSpec], cpu_budget: Optional[int] = None,
+                 latency_batch_size: int = 1000, latency_repeats: int = 20):
+        names = [spec.name for spec in specs]
+        if len(set(names)) != len(names):
+            raise ValueError(f"Model names must be unique, got {names}.")
+        self.specs = list(specs)
+        self.cpu_budget = cpu_budget or os.cpu_count() or 1
+        self.latency_batch_size = latency_batch_size
+        self.latency_repeats = latency_repeats
+        self.models: Dict[str, Any] = {}
+
+    def run(self, X_train: np.ndarray, y_train: np.ndarray, X_test: np.ndarray,
+            y_test: np.ndarray) -> List[Dict[str, Any]]:
+        """Trenuje i ocenia wszystkie modele. Zwraca ranking posortowany po RMSE (błędy na końcu)."""
+        budget = _CpuBudget(self.cpu_budget)
+        logger.info(f"Training {len(self.specs)} models concurrently (CPU budget: {budget.total})")
+
+        with ThreadPoolExecutor(max_workers=len(self.specs), thread_name_prefix='model-comparison') as executor:
+            futures = {spec.name: executor.submit(self._fit, spec, budget, X_train, y_train) for spec in self.specs}
+            fits = {name: future.result() for name, future in futures.items()}
+
+        evaluator = ModelEvaluator(plot_mode='none')
+        leaderboard = []
+        for spec in self.specs:
+            entry = fits[spec.name]
+            if entry['status'] == 'done':
+                model = self.models[spec.name]
+                entry.update(evaluator._calculate_metrics(y_test, model.predict(X_test)))
+                entry['predict_latency'] = self._latency(model, X_test)
+                entry['size_bytes'] = len(pickle.dumps(model))
+            leaderboard.append(entry)
+
+        leaderboard.sort(key=lambda e: (e['status'] != 'done', e.get('rmse', float('inf'))))
+        for rank, entry in enumerate(leaderboard, start=1):
+            entry['rank'] = rank
+        return leaderboard
+
+    def _fit(self, spec: ModelSpec, budget: _CpuBudget, X_train, y_train) -> Dict[str, Any]:
+        entry: Dict[str, Any] = {'name': spec.name, 'threads': None, 'status': 'done'}
+        try:
+            with budget.reserve(spec.threads) as threads:
+                entry['threads'] = threads
+                model = spec.build(threads)
+                entry['estimator'] = model.__class__.__name__
+                # Limit OpenMP dotyczy tylko bieżącego wątku, więc nie wpływa na modele trenowane obok
+                with Stopwatch() as sw, threadpool_limits(limits=threads, user_api='openmp'):
+                    self.models[spec.name] = ModelTrainer().train(model, X_train, y_train)
+                entry['fit_seconds'] = sw.elapsed
+        except Exception as e:
+            logger.error(f"Model '{spec.name}' failed: {e}")
+            entry['status'] = 'failed'
+            entry['error'] = ''.join(traceback.format_exception_only(type(e), e)).strip()
+        return entry
+
+    def _latency(self, model: Any, X: np.ndarray) -> Dict[str, float]:
+        return batch_latency(model.predict, X[:self.latency_batch_size], repeats=self.latency_repeats)
+
+
+def save_leaderboard(leaderboard: List[Dict[str, Any]], output_dir: str = 'reports/leaderboard') -> List[str]:
+    """Zapisuje ranking jako JSON (pełne dane) i CSV (płaska tabela) z datą w nazwie."""
+    os.makedirs(output_dir, exist_ok=True)
+    stem = os.path.join(output_dir, f"leaderboard_{datetime.now():%Y%m%d_%H%M%S}")
+
+    with open(f'{stem}.json', 'w') as f:
+        json.dump(leaderboard, f, indent=2)
+    pd.json_normalize(leaderboard, sep='_').to_csv(f'{stem}.csv', index=False)
+    logger.info(f"Leaderboard saved to {stem}.json / {stem}.csv")
+    return [f'{stem}.json', f'{stem}.csv']
@@ -0,0 +1,147 @@
+import json
+import logging
+import os
+import pickle
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import xgboost as xgb
+
+from src.evaluation import ModelEvaluator
+from src.resources import batch_latency
+from src.trainers import ModelTrainer
+
+logger = logging.getLogger(__name__)
+
+
+class ModelCompressor:
+    """
+    Etap kompresji modelu XGBoost po treningu. Tworzy lekki wariant "fast" do serwowania:
+        - przycięcie liczby drzew: najmniejsza liczba rund, której RMSE na zbiorze walidacyjnym
+          mieści się w tolerancji względem najlepszego punktu krzywej,
+        - destylacja (opcjonalnie): płytszy model-uczeń trenowany na predykcjach pełnego modelu.
+
+    Zbiór hold-out dzielony jest na część do wyboru wariantu i część do raportu,
+    więc raport dokładności nie jest zawyżony przez sam wybór.
+
+    Args:
+        tolerance: Dopuszczalny względny wzrost RMSE wariantu "fast" (0.01 = 1%).
+        n_checkpoints: Liczba punktów krzywej walidacyjnej (liczby drzew) do sprawdzenia.
+        student_params: Parametry ucznia (XGBRegressor) nadpisujące DEFAULT_STUDENT.
+        distill: False wyłącza destylację.
+        selection_fraction: Część hold-outu używana do wyboru wariantu.
+        latency_batch_size: Rozmiar partii do pomiaru latencji.
+        latency_repeats: Liczba powtórzeń pomiaru latencji.
+        n_jobs: Liczba wątków treningu ucznia (w trybie deterministycznym stała, z manifestu).
+        seed: Ziarno podziału hold-outu i treningu ucznia.
+    """
+
+    DEFAULT_STUDENT = {'n_estimators': 300, 'max_depth': 6, 'learning_rate': 0.1, 'subsample': 0.8,
+                       'colsample_bytree': 0.8, 'objective': 'reg:squarederror'}
+
+    def __init__(self, tolerance: float = 0.01, n_checkpoints: int = 20,
+                 student_params: Optional[Dict[str, Any]] = None, distill: bool = True,
+                 selection_fraction: float = 0.5, latency_batch_size: int = 1000, latency_repeats: int = 10,
+                 n_jobs: int = -1, seed: int = 42):
+        self.tolerance = tolerance
+        self.n_checkpoints = n_checkpoints
+        self.student_params: Optional[Dict[str, Any]] = None
+        if distill:
+            self.student_params = {**self.DEFAULT_STUDENT, 'n_jobs': n_jobs, 'random_state': seed,
+                                   **(student_params or {})}
+        self.selection_fraction = selection_fraction
+        self.latency_batch_size = latency_batch_size
+        self.latency_repeats = latency_repeats
+        self.seed = seed
+        self._evaluator = ModelEvaluator(plot_mode='none')
+
+    def compress(self, model: xgb.XGBRegressor, X_train: np.ndarray, X_holdout: np.ndarray,
+                 y_holdout: np.ndarray) -> Tuple[xgb.XGBRegressor, Dict[str, Any]]:
+        """
+        Zwraca wybrany wariant "fast" oraz raport (krzywa walidacyjna, dokładność i latencja każdego wariantu).
+        """
+        rng = np.random.default_rng(self.seed)
+        idx = rng.permutation(len(y_holdout))
+        n_select = int(len(idx) * self.selection_fraction)
+        select_idx, report_idx = idx[:n_select], idx[n_select:]
+        X_select, y_select = X_holdout[select_idx], np.asarray(y_holdout)[select_idx]
+        X_report, y_report = X_holdout[report_idx], np.asarray(y_holdout)[report_idx]
+
+        curve = self.validation_curve(model, X_select, y_select)
+        n_trees = self._pick_tree_count(curve)
+        logger.info(f"Truncating model to {n_trees} of {curve[-1]['n_trees']} trees")
+
+        candidates = {'full': model, 'truncated': self.truncate(model, n_trees)}
+        if self.student_params is not None:
+            candidates['distilled'] = self.distill(model, X_train)
+
+        variants = {name: self._describe(candidate, X_select, y_select, X_report, y_report)
+                    for name, candidate in candidates.items()}
+
+        # Wariant "fast": najszybszy spośród mieszczących się w tolerancji na części do wyboru
+        limit = variants['full']['selection_rmse'] * (1 + self.tolerance)
+        eligible = [name for name in candidates if name != 'full' and variants[name]['selection_rmse'] <= limit]
+        fast_name = min(eligible or ['truncated'], key=lambda name: variants[name]['latency']['p50_ms'])
+        logger.info(f"Selected '{fast_name}' as fast variant")
+
+        report = {
+            'tolerance': self.tolerance,
+            'selected': fast_name,
+            'validation_curve': curve,
+            'variants': variants,
+        }
+        return candidates[fast_name], report
+
+    def validation_curve(self, model: xgb.XGBRegressor, X: np.ndarray, y: np.ndarray) -> List[Dict[str, float]]:
+        """RMSE na zbiorze walidacyjnym dla rosnącej liczby drzew (iteration_range, bez ponownego treningu)."""
+        total = model.get_booster().num_boosted_rounds()
+        checkpoints = np.unique(np.linspace(1, total, num=min(self.n_checkpoints, total)).astype(int))
+
+        curve = []
+        for n_trees in checkpoints:
+            pred = model.predict(X, iteration_range=(0, int(n_trees)))
+            curve.append({'n_trees': int(n_trees), 'rmse': self._evaluator._calculate_metrics(y, pred)['rmse']})
+        return curve
+
+    def _pick_tree_count(self, curve: List[Dict[str, float]]) -> int:
+        best = min(point['rmse'] for point in curve)
+        return next(point['n_trees'] for point in curve if point['rmse'] <= best * (1 + self.tolerance))
+
+    @staticmethod
+    def truncate(model: xgb.XGBRegressor, n_trees: int) -> xgb.XGBRegressor:
+        """Kopia modelu zawierająca tylko pierwsze `n_trees` rund boostingu."""
+        raw = model.get_booster()[:n_trees].save_raw(raw_format='ubj')
+        truncated = xgb.XGBRegressor(**model.get_params())
+        truncated.load_model(raw)
+        truncated.set_params(n_estimators=n_trees)
+        return truncated
+
+    def distill(self, teacher: xgb.XGBRegressor, X_train: np.ndarray) -> xgb.XGBRegressor:
+        """Trenuje płytszego ucznia na predykcjach nauczyciela (miękkie etykiety)."""
+        soft_labels = teacher.predict(X_train)
+        student = xgb.XGBRegressor(**self.student_params)
+        return ModelTrainer().train(student, X_train, soft_labels)
+
+    def _describe(self, model: xgb.XGBRegressor, X_select, y_select, X_report, y_report) -> Dict[str, Any]:
+        config = json.loads(model.get_booster().save_config())
+        report_metrics = self._evaluator._calculate_metrics(y_report, model.predict(X_report))
+        return {
+            'n_trees': model.get_booster().num_boosted_rounds(),
+            'max_depth': int(config['learner']['gradient_booster']['tree_train_param']['max_depth']),
+            'selection_rmse': self._evaluator._calculate_metrics(y_select, model.predict(X_select))['rmse'],
+            **report_metrics,
+            'latency': self._latency(model, X_report),
+            'size_bytes': len(pickle.dumps(model)),
+        }
+
+    def _latency(self, model: Any, X: np.ndarray) -> Dict[str, float]:
+        return batch_latency(model.predict, X[:self.latency_batch_size], repeats=self.latency_repeats)
+
+
+def save_compression_report(report: Dict[str, Any], path: str) -> str:
+    """Zapisuje raport kompromisu dokładność/latencja do pliku JSON."""
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump(report, f, indent=2)
+    logger.info(f"Compression report saved to {path}")
+    return path
@@ -0,0 +1,299 @@
+import hashlib
+import logging
+import os
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Sequence
+
+import joblib
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Domyślny cache względem katalogu repozytorium, a nie bieżącego katalogu (np. notebooks/)
+DEFAULT_CACHE_DIR = str(Path(__file__).resolve().parent.parent / 'data' / 'eda_cache')
+
+
+class StreamingHistogram:
+    """
+    Histogram o stałej liczbie przedziałów, aktualizowany porcjami danych.
+    Gdy nowe wartości wychodzą poza zakres, szerokość przedziałów jest podwajana (sąsiednie
+    przedziały są scalane), więc pamięć jest stała niezależnie od liczby wierszy.
+    Pozwala odczytać przybliżone kwantyle oraz dokładne count/mean/std/min/max.
+    """
+
+    def __init__(self, n_bins: int = 1024):
+        if n_bins % 2:
+            raise ValueError("n_bins must be even.")
+        self.n_bins = n_bins
+        self.counts = np.zeros(n_bins, dtype=np.int64)
+        self.lo: Optional[float] = None
+        self.width = 0.0
+
+        self.count = 0
+        self.sum = 0.0
+        self.sumsq = 0.0
+        self.min = np.inf
+        self.max = -np.inf
+
+    def update(self, values: np.ndarray):
+        values = np.asarray(values, dtype=np.float64)
+        values = values[~np.isnan(values)]
+        if values.size == 0:
+            return
+
+        vmin, vmax = float(values.min()), float(values.max())
+        if self.lo is None:
+            self.lo = vmin
+            self.width = (vmax - vmin) / self.n_bins if vmax > vmin else max(abs(vmin) * 1e-6, 1e-9)
+        self._expand(vmin, vmax)
+
+        idx = ((values - self.lo) / self.width).astype(np.int64)
+        np.clip(idx, 0, self.n_bins - 1, out=idx)
+        self.counts += np.bincount(idx, minlength=self.n_bins)
+
+        self.count += values.size
+        self.sum += float(values.sum())
+        self.sumsq += float(np.dot(values, values))
+        self.min = min(self.min, vmin)
+        self.max = max(self.max, vmax)
+
+    def _expand(self, vmin: float, vmax: float):
+        half = self.n_bins // 2
+        while vmin < self.lo or vmax > self.lo + self.width * self.n_bins:
+            merged = self.counts.reshape(half, 2).sum(axis=1)
+            zeros = np.zeros(half, dtype=np.int64)
+            if vmin < self.lo:
+                # Rozszerzamy zakres w dół - stare dane lądują w górnej połowie
+                self.lo -= self.width * self.n_bins
+                self.counts = np.concatenate([zeros, merged])
+            else:
+                self.counts = np.concatenate([merged, zeros])
+            self.width *= 2
+
+    @property
+    def mean(self) -> float:
+        return self.sum / self.count if self.count else np.nan
+
+    @property
+    def std(self) -> float:
+        if self.count < 2:
+            return np.nan
+        var = (self.sumsq - self.count * self.mean ** 2) / (self.count - 1)
+        return float(np.sqrt(max(var, 0.0)))
+
+    def quantile(self, q: float | Sequence[float]) -> np.ndarray:
+        """Przybliżone kwantyle (interpolacja liniowa wewnątrz przedziału)."""
+        q = np.atleast_1d(np.asarray(q, dtype=np.float64))
+        if self.count == 0:
+            return np.full(q.shape, np.nan)
+
+        cum = np.cumsum(self.counts)
+        targets = q * self.count
+        bins = np.searchsorted(cum, targets, side='left').clip(0, self.n_bins - 1)
+        prev = np.where(bins > 0, cum[bins - 1], 0)
+        inside = self.counts[bins]
+        frac = np.where(inside > 0, (targets - prev) / np.maximum(inside, 1), 0.0)
+        result = self.lo + (bins + frac.clip(0, 1)) * self.width
+        return result.clip(self.min, self.max)
+
+    def histogram(self, bins: int = 50):
+        """Zwraca (counts, edges) z około `bins` przedziałami obejmującymi [min, max] - do rysowania."""
+        if self.count == 0:
+            return np.zeros(0), np.zeros(1)
+        first = int((self.min - self.lo) / self.width)
+        last = min(int((self.max - self.lo) / self.width), self.n_bins - 1)
+        used = self.counts[first:last + 1]
+        factor = max(1, int(np.ceil(len(used) / bins)))
+        pad = (-len(used)) % factor
+        counts = np.concatenate([used, np.zeros(pad, dtype=np.int64)]).reshape(-1, factor).sum(axis=1)
+        edges = self.lo + (first + np.arange(len(counts) + 1) * factor) * self.width
+        return counts, edges
+
+    def describe(self) -> Dict[str, float]:
+        """Odpowiednik pd.Series.describe() liczony z agregatów."""
+        q25, q50, q75 = self.quantile([0.25, 0.5, 0.75])
+        return {'count': self.count, 'mean': self.mean, 'std': self.std, 'min': self.min,
+                '25%': q25, '50%': q50, '75%': q75, 'max': self.max}
+
+    def box_stats(self, label: str = '') -> Dict[str, Any]:
+        """Statystyki w formacie akceptowanym przez matplotlib Axes.bxp()."""
+        q1, med, q3 = self.quantile([0.25, 0.5, 0.75])
+        iqr = q3 - q1
+        return {'label': label, 'med': med, 'q1': q1, 'q3': q3, 'mean': self.mean,
+                'whislo': max(self.min, q1 - 1.5 * iqr), 'whishi': min(self.max, q3 + 1.5 * iqr), 'fliers': []}
+
+
+class _RankCorrelation:
+    """
+    Przybliżona macierz korelacji Spearmana liczona strumieniowo z próbki rezerwuarowej.
+
+    Każdy wiersz dostaje losowy klucz, a rezerwuar trzyma `size` wierszy o najmniejszych kluczach spośród
+    wszystkich dotychczasowych porcji. Próbka jest więc jednostajna z całego zbioru niezależnie od kolejności
+    porcji (np. pliku posortowanego po jednej z kolumn), a dla zbiorów mniejszych niż `size` wynik jest dokładny.
+    """
+
+    def __init__(self, columns: List[str], size: int = 200_000, seed: int = 42):
+        self.columns = columns
+        self.size = size
+        self._rng = np.random.default_rng(seed)
+        self.values = np.empty((0, len(columns)))
+        self.keys = np.empty(0)
+
+    def update(self, chunk: pd.DataFrame):
+        values = chunk[self.columns].to_numpy(dtype=np.float64)
+        values = values[~np.isnan(values).any(axis=1)]
+        if len(values) == 0:
+            return
+
+        keys = np.concatenate([self.keys, self._rng.random(len(values))])
+        values = np.concatenate([self.values, values])
+        if len(keys) > self.size:
+            keep = np.argpartition(keys, self.size)[:self.size]
+            keys, values = keys[keep], values[keep]
+        self.keys, self.values = keys, values
+
+    def result(self) -> pd.DataFrame:
+        return pd.DataFrame(self.values, columns=self.columns).corr(method='spearman')
+
+
+class EDAStats:
+    """Zagregowane statystyki zbioru potrzebne do wszystkich wykresów SpotifyVisualizer."""
+
+    def __init__(self, fingerprint: str, n_rows: int, numeric: Dict[str, StreamingHistogram],
+                 grouped: Dict[str, Dict[str, StreamingHistogram]], spearman: pd.DataFrame, sample: pd.DataFrame,
+                 target_col: str):
+        self.fingerprint = fingerprint
+        self.n_rows = n_rows
+        self.numeric = numeric
+        self.grouped = grouped
+        self.spearman = spearman
+        self.sample = sample
+        self.target_col = target_col
+
+    def group_means(self, group_col: str) -> pd.Series:
+        hists = self.grouped.get(group_col, {})
+        return pd.Series({g: h.mean for g, h in hists.items()}, dtype=float)
+
+
+class EDAStatsEngine:
+    """
+    Liczy statystyki EDA (histogramy, kwantyle, korelacje rang, próbka) w jednym przebiegu po danych,
+    porcjami o rozmiarze `chunk_size`, z ograniczoną pamięcią. Wyniki są cache'owane w pamięci
+    i na dysku pod odciskiem (fingerprint) zbioru danych.
+
+    Źródłem może być DataFrame albo ścieżka do pliku .parquet / .csv (czytanego porcjami).
+    """
+
+    def __init__(self, cache_dir: Optional[str] = DEFAULT_CACHE_DIR, chunk_size: int = 1_000_000,
+                 n_bins: int = 1024, rank_sample_size: int = 200_000, sample_size: int = 10_000,
+                 target_col: str = 'popularity', group_cols: Sequence[str] = ('track_genre', 'explicit'),
+                 seed: int = 42):
+        self.cache_dir = cache_dir
+        self.chunk_size = chunk_size
+        self.n_bins = n_bins
+        self.rank_sample_size = rank_sample_size
+        self.sample_size = sample_size
+        self.target_col = target_col
+        self.group_cols = list(group_cols)
+        self.seed = seed
+        self._memory_cache: Dict[str, EDAStats] = {}
+
+    def compute(self, source: pd.DataFrame | str | Path) -> EDAStats:
+        fingerprint = self.fingerprint(source)
+
+        if fingerprint in self._memory_cache:
+            return self._memory_cache[fingerprint]
+
+        cache_path = os.path.join(self.cache_dir, f'eda_{fingerprint}.joblib') if self.cache_dir else None
+        if cache_path and os.path.exists(cache_path):
+            logger.info(f"Loading cached EDA statistics from {cache_path}")
+            stats = joblib.load(cache_path)
+        else:
+            stats = self._compute(source, fingerprint)
+            if cache_path:
+                os.makedirs(self.cache_dir, exist_ok=True)
+                joblib.dump(stats, cache_path)
+
+        self._memory_cache[fingerprint] = stats
+        return stats
+
+    def fingerprint(self, source: pd.DataFrame | str | Path) -> str:
+        """Odcisk zbioru: dla plików - ścieżka, rozmiar i czas modyfikacji, dla DataFrame - hash zawartości."""
+        h = hashlib.sha1()
+        settings = (self.n_bins, self.rank_sample_size, self.sample_size, self.target_col, self.group_cols)
+        h.update(repr(settings).encode())
+        if isinstance(source, pd.DataFrame):
+            h.update(repr(list(zip(source.columns, map(str, source.dtypes)))).encode())
+            h.update(pd.util.hash_pandas_object(source, index=False).to_numpy().tobytes())
+        else:
+            path = Path(source).resolve()
+            stat = path.stat()
+            h.update(f'{path}:{stat.st_size}:{stat.st_mtime_ns}'.encode())
+        return h.hexdigest()[:16]
+
+    def _chunks(self, source: pd.DataFrame | str | Path) -> Iterator[pd.DataFrame]:
+        if isinstance(source, pd.DataFrame):
+            for start in range(0, len(source), self.chunk_size):
+                yield source.iloc[start:start + self.chunk_size]
+            return
+
+        path = Path(source)
+        if path.suffix == '.parquet':
+            import pyarrow.parquet as pq
+            for batch in pq.ParquetFile(path).iter_batches(batch_size=self.chunk_size):
+                yield batch.to_pandas()
+        elif path.suffix == '.csv':
+            yield from pd.read_csv(path, chunksize=self.chunk_size)
+        else:
+            raise ValueError(f"Unsupported file type: {path}")
+
+    def _compute(self, source: pd.DataFrame | str | Path, fingerprint: str) -> EDAStats:
+        logger.info(f"Computing EDA statistics (fingerprint {fingerprint})...")
+        rng = np.random.default_rng(self.seed)
+
+        numeric: Dict[str, StreamingHistogram] = {}
+        grouped: Dict[str, Dict[str, StreamingHistogram]] = {g: {} for g in self.group_cols}
+        ranks: Optional[_RankCorrelation] = None
+        sample: Optional[pd.DataFrame] = None
+        sample_keys = np.empty(0)
+        n_rows = 0
+
+        for chunk in self._chunks(source):
+            n_rows += len(chunk)
+            numeric_cols = chunk.select_dtypes(include=[np.number]).columns.tolist()
+
+            for col in numeric_cols:
+                numeric.setdefault(col, StreamingHistogram(self.n_bins)).update(chunk[col].to_numpy())
+
+            if ranks is None:
+                ranks = _RankCorrelation(numeric_cols, self.rank_sample_size, self.seed)
+            ranks.update(chunk)
+
+            if self.target_col in chunk.columns:
+                target = chunk[self.target_col].to_numpy(dtype=np.float64)
+                for group_col in self.group_cols:
+                    if group_col in chunk.columns:
+                        self._update_groups(grouped[group_col], chunk[group_col], target)
+
+            # Próbka jednostajna: zachowujemy wiersze z `sample_size` najmniejszymi losowymi kluczami
+            keys = rng.random(len(chunk))
+            keep = np.argsort(keys)[:self.sample_size]
+            candidates = chunk.iloc[keep]
+            all_keys = np.concatenate([sample_keys, keys[keep]])
+            sample = candidates if sample is None else pd.concat([sample, candidates])
+            best = np.argsort(all_keys)[:self.sample_size]
+            sample, sample_keys = sample.iloc[best], all_keys[best]
+
+        spearman = ranks.result() if ranks is not None else pd.DataFrame()
+        logger.info(f"EDA statistics computed for {n_rows} rows.")
+        return EDAStats(fingerprint, n_rows, numeric, {g: v for g, v in grouped.items() if v}, spearman,
+                        sample if sample is not None else pd.DataFrame(), self.target_col)
+
+    def _update_groups(self, hists: Dict[str, StreamingHistogram], groups: pd.Series, target: np.ndarray):
+        codes, uniques = pd.factorize(groups, sort=False)
+        order = np.argsort(codes, kind='stable')
+        bounds = np.searchsorted(codes[order], np.arange(len(uniques) + 1))
+        for i, value in enumerate(uniques):
+            rows = order[bounds[i]:bounds[i + 1]]
+            hists.setdefault(value, StreamingHistogram(256)).update(target[rows])
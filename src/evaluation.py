@@ -1,64 +1,202 @@
+import base64
+import html
+import json
 import logging
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Sequence
+
 import numpy as np
 import matplotlib.pyplot as plt
-import seaborn as sns
-from sklearn.metrics import mean_squared_error, mean_absolute_error, r2_score
-from typing import Dict, Any
+from matplotlib.figure import Figure
 
 logger = logging.getLogger(__name__)
 
+PLOT_MODES = ('inline', 'background', 'none')
+ERROR_QUANTILES = (0.5, 0.9, 0.95, 0.99)
+
 
 class ModelEvaluator:
     """
     Klasa odpowiedzialna za ocenę wyników modelu.
+
+    Args:
+        plot_mode: 'inline' - wykresy wyświetlane przez plt.show() (notatniki),
+            'background' - wykresy renderowane w wątku tła do PNG/HTML w `plot_dir` (nie blokuje treningu),
+            'none' - tylko metryki.
+        plot_dir: Katalog na wykresy w trybie 'background'.
+        max_scatter_points: Powyżej tej liczby punktów wykres rozrzutu zastępowany jest wykresem hexbin.
     """
 
-    def evaluate(self, y_true: np.ndarray, y_pred: np.ndarray, model_name: str = "Model") -> Dict[str, Any]:
+    def __init__(self, plot_mode: str = 'inline', plot_dir: str = 'reports/evaluation',
+                 max_scatter_points: int = 20_000):
+        if plot_mode not in PLOT_MODES:
+            raise ValueError(f"Unknown plot mode '{plot_mode}'. Expected one of {PLOT_MODES}.")
+        self.plot_mode = plot_mode
+        self.plot_dir = plot_dir
+        self.max_scatter_points = max_scatter_points
+
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._pending: List[Future] = []
+        self._lock = threading.Lock()
+
+    def evaluate(self, y_true: np.ndarray, y_pred: np.ndarray, model_name: str = "Model",
+                 groups: Optional[Sequence] = None, report_path: Optional[str] = None) -> Dict[str, Any]:
         """
         Oblicza metryki i generuje raport wizualny na podstawie predykcji.
+
+        Args:
+            groups: Opcjonalne etykiety grup (np. gatunek) dla metryk per grupa.
+            report_path: Jeśli podana, metryki zapisywane są do tego pliku JSON.
         """
         logger.info(f"Evaluating: {model_name}")
+        y_true = np.asarray(y_true, dtype=np.float64)
+        y_pred = np.asarray(y_pred, dtype=np.float64)
+        residuals = y_true - y_pred
 
         # Metryki
-        metrics = self._calculate_metrics(y_true, y_pred)
+        metrics: Dict[str, Any] = self._calculate_metrics(y_true, y_pred, residuals)
+        metrics['bias'] = float(residuals.mean())
+        metrics['abs_error_quantiles'] = self._error_quantiles(residuals)
+        if groups is not None:
+            metrics['per_group'] = self._group_metrics(residuals, groups)
 
         logger.info(
             f"{model_name} results: RMSE = {metrics['rmse']:.4f}, MAE = {metrics['mae']:.4f}, R2 = {metrics['r2']:.4f}")
 
+        metrics['name'] = model_name
+        if report_path is not None:
+            self._save_report(metrics, report_path)
+
         # 2. Wizualizacja
-        self._plot_diagnostics(y_true, y_pred, model_name)
+        if self.plot_mode == 'inline':
+            self._plot_diagnostics(y_true, y_pred, model_name)
+        elif self.plot_mode == 'background':
+            self._submit_plot(y_true, y_pred, residuals, model_name, metrics)
 
-        metrics['name'] = model_name
         return metrics
 
-    def _calculate_metrics(self, y_true, y_pred) -> Dict[str, float]:
+    def wait(self) -> List[str]:
+        """Czeka na zakończenie renderowania wykresów w tle i zwraca ścieżki zapisanych plików."""
+        with self._lock:
+            pending, self._pending = self._pending, []
+        paths = []
+        for future in pending:
+            try:
+                paths.extend(future.result())
+            except Exception as e:
+                logger.error(f"Rendering diagnostics failed: {e}")
+        return paths
+
+    def _calculate_metrics(self, y_true, y_pred, residuals: Optional[np.ndarray] = None) -> Dict[str, float]:
+        # Jeden przebieg po residuach zamiast trzech osobnych funkcji sklearn
+        y_true = np.asarray(y_true, dtype=np.float64)
+        if residuals is None:
+            residuals = y_true - np.asarray(y_pred, dtype=np.float64)
+
+        sse = float(np.dot(residuals, residuals))
+        centered = y_true - y_true.mean()
+        sst = float(np.dot(centered, centered))
+        n = len(residuals)
+
+        if sst > 0:
+            r2 = 1.0 - sse / sst
+        else:
+            # Zgodnie z sklearn.metrics.r2_score dla stałego y_true
+            r2 = 1.0 if sse == 0 else 0.0
+
         return {
-            'rmse': np.sqrt(mean_squared_error(y_true, y_pred)),
-            'mae': mean_absolute_error(y_true, y_pred),
-            'r2': r2_score(y_true, y_pred)
+            'rmse': float(np.sqrt(sse / n)),
+            'mae': float(np.abs(residuals).mean()),
+            'r2': r2,
         }
 
-    def _plot_diagnostics(self, y_true, y_pred, name: str):
-        plt.figure(figsize=(12, 5))
+    @staticmethod
+    def _error_quantiles(residuals: np.ndarray) -> Dict[str, float]:
+        values = np.quantile(np.abs(residuals), ERROR_QUANTILES)
+        return {f'p{int(q * 100)}': float(v) for q, v in zip(ERROR_QUANTILES, values)}
 
-        # Scatter plot
-        plt.subplot(1, 2, 1)
-        sns.scatterplot(x=y_true, y=y_pred, alpha=0.1, color='teal', edgecolor=None)
+    @staticmethod
+    def _group_metrics(residuals: np.ndarray, groups: Sequence) -> Dict[str, Dict[str, float]]:
+        """RMSE i MAE dla każdej grupy, liczone wektorowo przez np.bincount."""
+        groups = np.asarray(groups, dtype=object)
+        if len(groups) != len(residuals):
+            raise ValueError(f"groups has {len(groups)} elements, expected {len(residuals)}.")
+
+        labels, codes = np.unique(groups.astype(str), return_inverse=True)
+        counts = np.bincount(codes, minlength=len(labels))
+        sse = np.bincount(codes, weights=residuals * residuals, minlength=len(labels))
+        sae = np.bincount(codes, weights=np.abs(residuals), minlength=len(labels))
+
+        return {
+            str(label): {'n': int(n), 'rmse': float(np.sqrt(s / n)), 'mae': float(a / n)}
+            for label, n, s, a in zip(labels, counts, sse, sae)
+        }
+
+    @staticmethod
+    def _save_report(metrics: Dict[str, Any], report_path: str):
+        os.makedirs(os.path.dirname(report_path) or '.', exist_ok=True)
+        with open(report_path, 'w') as f:
+            json.dump(metrics, f, indent=2, ensure_ascii=False)
+        logger.info(f"Metrics report saved to {report_path}")
+
+    def _submit_plot(self, y_true, y_pred, residuals, name: str, metrics: Dict[str, Any]):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='evaluation-plots')
+            self._pending.append(self._executor.submit(self._render_files, y_true, y_pred, residuals, name, metrics))
+
+    def _render_files(self, y_true, y_pred, residuals, name: str, metrics: Dict[str, Any]) -> List[str]:
+        # Obiektowe API matplotlib (bez pyplot) jest bezpieczne poza głównym wątkiem
+        fig = Figure(figsize=(12, 5))
+        self._draw(fig, y_true, y_pred, residuals, name)
+
+        os.makedirs(self.plot_dir, exist_ok=True)
+        slug = ''.join(c if c.isalnum() else '_' for c in name).strip('_').lower() or 'model'
+        png_path = os.path.join(self.plot_dir, f'{slug}_diagnostics.png')
+        fig.savefig(png_path, dpi=100)
+
+        html_path = os.path.join(self.plot_dir, f'{slug}_report.html')
+        with open(png_path, 'rb') as f:
+            image = base64.b64encode(f.read()).decode('ascii')
+        rows = ''.join(f'<tr><td>{html.escape(k)}</td><td>{v:.4f}</td></tr>'
+                       for k, v in metrics.items() if isinstance(v, float))
+        title = html.escape(name)
+        with open(html_path, 'w') as f:
+            f.write(f'<html><head><meta charset="utf-8"><title>{title}</title></head><body>'
+                    f'<h1>{title}</h1><table>{rows}</table>'
+                    f'<img src="data:image/png;base64,{image}"/></body></html>')
+
+        logger.info(f"Diagnostics for {name} saved to {png_path}")
+        return [png_path, html_path]
+
+    def _draw(self, fig: Figure, y_true, y_pred, residuals, name: str):
+        # Scatter plot (dla dużych zbiorów - hexbin, który agreguje punkty zamiast rysować każdy osobno)
+        ax = fig.add_subplot(1, 2, 1)
+        if len(y_true) > self.max_scatter_points:
+            ax.hexbin(y_true, y_pred, gridsize=60, bins='log', cmap='viridis', mincnt=1)
+        else:
+            ax.scatter(y_true, y_pred, s=8, alpha=0.1, color='teal', edgecolors='none')
         max_val = max(y_true.max(), y_pred.max())
         # Dodajemy linię "Ideal Fit"
-        plt.plot([0, max_val], [0, max_val], '--r', linewidth=2, label='Ideal Fit')
-        plt.xlabel('Prawdziwa Popularność')
-        plt.ylabel('Przewidziana Popularność')
-        plt.title(f'{name}: Actual vs Predicted')
-        plt.legend()
+        ax.plot([0, max_val], [0, max_val], '--r', linewidth=2, label='Ideal Fit')
+        ax.set_xlabel('Prawdziwa Popularność')
+        ax.set_ylabel('Przewidziana Popularność')
+        ax.set_title(f'{name}: Actual vs Predicted')
+        ax.legend()
 
-        # Histogram błędów
-        residuals = y_true - y_pred
-        plt.subplot(1, 2, 2)
-        sns.histplot(residuals, bins=50, kde=True, color='purple', linewidth=0)
-        plt.axvline(x=0, color='red', linestyle='--')
-        plt.title(f'{name}: Rozkład Błędów (Residuals)')
-        plt.xlabel('Błąd')
+        # Histogram błędów (z gotowych przedziałów np.histogram zamiast KDE po wszystkich punktach)
+        ax = fig.add_subplot(1, 2, 2)
+        counts, edges = np.histogram(residuals, bins=50)
+        ax.stairs(counts, edges, fill=True, color='purple')
+        ax.axvline(x=0, color='red', linestyle='--')
+        ax.set_title(f'{name}: Rozkład Błędów (Residuals)')
+        ax.set_xlabel('Błąd')
+
+        fig.tight_layout()
 
-        plt.tight_layout()
+    def _plot_diagnostics(self, y_true, y_pred, name: str):
+        fig = plt.figure(figsize=(12, 5))
+        self._draw(fig, y_true, y_pred, y_true - y_pred, name)
         plt.show()
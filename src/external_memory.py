@@ -0,0 +1,224 @@
+import logging
+import os
+import tempfile
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.dataset as ds
+import xgboost as xgb
+
+from src.evaluation import ModelEvaluator
+from src.feature_store import DATE_COLUMN, KEY_COLUMN, FeatureStore
+from src.metrics import metrics
+from src.preprocessors import SpotifyPipelinePreprocessor
+from src.resources import PeakMemorySampler, Stopwatch
+
+logger = logging.getLogger(__name__)
+
+
+def open_dataset(source: str) -> ds.Dataset:
+    """Plik lub katalog Parquet (również z partycjami w stylu Hive, np. `cleaned/` magazynu cech)."""
+    return ds.dataset(source, format='parquet', partitioning='hive', exclude_invalid_files=True,
+                      ignore_prefixes=['_', '.'])
+
+
+def feature_columns(source: str, dataset: ds.Dataset) -> List[str]:
+    """
+    Kolumny czyszczonych danych (cechy i cel) bez klucza i partycji daty magazynu cech - inaczej
+    track_id i ingest_date trafiłyby do OneHotEncodera jako cechy kategoryczne.
+    Dla katalogu magazynu cech lista pochodzi z jego `_meta.json`.
+    """
+    meta = FeatureStore._read_meta(source) if os.path.isdir(source) else {}
+    columns = meta.get('columns') or [c for c in dataset.schema.names if c not in (KEY_COLUMN, DATE_COLUMN)]
+    return [c for c in columns if c in dataset.schema.names]
+
+
+def holdout_mask(chunk_index: int, n_rows: int, fraction: float, seed: int = 42) -> np.ndarray:
+    """Deterministyczny wybór wierszy walidacyjnych w kawałku - ten sam przy każdym przejściu po danych."""
+    if fraction <= 0:
+        return np.zeros(n_rows, dtype=bool)
+    return np.random.default_rng([seed, chunk_index]).random(n_rows) < fraction
+
+
+class ParquetChunkIter(xgb.DataIter):
+    """
+    Iterator XGBoost po kawałkach czyszczonego Parquet: każdy kawałek jest wczytywany, przetwarzany
+    wytrenowanym preprocessorem i przekazywany do XGBoost, a potem zwalniany. W pamięci jest naraz
+    tylko jeden kawałek; XGBoost zapisuje skwantyzowane strony danych w `cache_prefix` na dysku.
+
+    Args:
+        dataset: Zbiór Parquet z kolumnami SpotifyDataCleaner (z kolumną celu).
+        preprocessor: Wytrenowany SpotifyPipelinePreprocessor.
+        cache_prefix: Prefiks plików cache XGBoost.
+        batch_rows: Liczba wierszy kawałka.
+        holdout: Część wierszy każdego kawałka pomijana w treningu (zbiór walidacyjny).
+        use_holdout: True - iterator zwraca tylko wiersze walidacyjne (np. do ewaluacji).
+    """
+
+    def __init__(self, dataset: ds.Dataset, preprocessor: SpotifyPipelinePreprocessor, cache_prefix: str,
+                 batch_rows: int = 65_536, holdout: float = 0.0, use_holdout: bool = False, seed: int = 42):
+        self.dataset = dataset
+        self.preprocessor = preprocessor
+        self.batch_rows = batch_rows
+        self.holdout = holdout
+        self.use_holdout = use_holdout
+        self.seed = seed
+        self.columns = list(preprocessor.pipeline.feature_names_in_)
+
+        self.rows = 0
+        self.chunks = 0
+        self.passes = 0
+        self._batches = None
+        self._index = 0
+        super().__init__(cache_prefix=cache_prefix)
+
+    def chunks_with_labels(self):
+        """Kolejne (X, y) bez XGBoost - np. do strumieniowej ewaluacji."""
+        self.reset()
+        while True:
+            item = self._next_chunk()
+            if item is None:
+                return
+            yield item
+
+    def next(self, input_data) -> bool:
+        item = self._next_chunk()
+        if item is None:
+            return False
+        input_data(data=item[0], label=item[1])
+        return True
+
+    def reset(self):
+        self._batches = None
+        self._index = 0
+
+    def _next_chunk(self) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        if self._batches is None:
+            target = self.preprocessor.target_col
+            self._batches = iter(self.dataset.to_batches(columns=self.columns + [target], batch_size=self.batch_rows))
+            self.passes += 1
+
+        for batch in self._batches:
+            index = self._index
+            self._index += 1
+            if batch.num_rows == 0:
+                continue
+            mask = holdout_mask(index, batch.num_rows, self.holdout, self.seed)
+            keep = mask if self.use_holdout else ~mask
+            if not keep.any():
+                continue
+            df = batch.filter(pa.array(keep)).to_pandas()
+            y = df.pop(self.preprocessor.target_col).to_numpy(dtype=np.float32)
+            X = self.preprocessor.transform_new_data(df[self.columns])
+            if self.passes == 1:
+                self.rows += len(y)
+                self.chunks += 1
+            return X, y
+        return None
+
+
+class ExternalMemoryTrainer:
+    """
+    Trening XGBoost na danych większych niż pamięć RAM (tryb external memory XGBoost).
+
+    Preprocessor dopasowywany jest na losowej próbce wierszy zebranej jednym przejściem po danych,
+    a trening czyta Parquet kawałkami przez ParquetChunkIter do `xgb.ExtMemQuantileDMatrix`.
+    Szczyt pamięci zależy od rozmiaru kawałka i cache stron XGBoost, a nie od liczby wierszy.
+
+    Args:
+        batch_rows: Liczba wierszy wczytywanego kawałka.
+        holdout: Część wierszy odkładana do walidacji (deterministycznie w każdym kawałku).
+        sample_rows: Liczba wierszy próbki do dopasowania preprocessora.
+        cache_dir: Katalog na strony cache XGBoost (domyślnie katalog tymczasowy systemu).
+        max_bin: Liczba kubełków histogramu.
+    """
+
+    def __init__(self, batch_rows: int = 65_536, holdout: float = 0.1, sample_rows: int = 200_000,
+                 cache_dir: Optional[str] = None, max_bin: int = 256, seed: int = 42):
+        self.batch_rows = batch_rows
+        self.holdout = holdout
+        self.sample_rows = sample_rows
+        self.cache_dir = cache_dir
+        self.max_bin = max_bin
+        self.seed = seed
+        self.report: Dict[str, Any] = {}
+
+    def fit_preprocessor(self, source: str, preprocessor: SpotifyPipelinePreprocessor) -> SpotifyPipelinePreprocessor:
+        """Dopasowuje preprocessor na losowej próbce ~sample_rows wierszy (pamięć ograniczona rozmiarem próbki)."""
+        dataset = open_dataset(source)
+        fraction = min(1.0, self.sample_rows / max(dataset.count_rows(), 1))
+        rng = np.random.default_rng(self.seed)
+
+        parts: List[pa.RecordBatch] = []
+        for batch in dataset.to_batches(columns=feature_columns(source, dataset), batch_size=self.batch_rows):
+            parts.append(batch.filter(pa.array(rng.random(batch.num_rows) < fraction)))
+        sample = pa.Table.from_batches(parts).to_pandas()
+        logger.info(f"Fitting preprocessor on a sample of {len(sample)} rows ({fraction:.2%} of {source})")
+        preprocessor.process(sample)
+        return preprocessor
+
+    def train(self, model: xgb.XGBRegressor, source: str,
+              preprocessor: SpotifyPipelinePreprocessor) -> xgb.XGBRegressor:
+        """
+        Trenuje `model` (jego hiperparametry i n_estimators) na całym zbiorze `source` kawałkami.
+        Raport (wiersze, czas, przepustowość, szczyt pamięci, metryki walidacyjne) trafia do `self.report`.
+        """
+        dataset = open_dataset(source)
+        params = {**model.get_xgb_params(), 'tree_method': 'hist', 'max_bin': self.max_bin}
+        n_rounds = model.get_params()['n_estimators']
+
+        with tempfile.TemporaryDirectory(prefix='xgb-extmem-', dir=self.cache_dir) as cache, \
+                PeakMemorySampler() as sampler:
+            iterator = ParquetChunkIter(dataset, preprocessor, os.path.join(cache, 'cache'),
+                                        batch_rows=self.batch_rows, holdout=self.holdout, seed=self.seed)
+            sampler.open('train')
+            with metrics.timer('spotify_train_seconds', model='external_memory'):
+                with Stopwatch() as build:
+                    dtrain = xgb.ExtMemQuantileDMatrix(iterator, max_bin=self.max_bin,
+                                                       nthread=params.get('n_jobs') or -1)
+                logger.info(f"External-memory matrix built: {iterator.rows} rows in {iterator.chunks} chunks "
+                            f"({build.elapsed:.1f}s)")
+                with Stopwatch() as fit:
+                    booster = xgb.train(params, dtrain, num_boost_round=n_rounds)
+            cache_mb = sum(os.path.getsize(os.path.join(cache, name)) for name in os.listdir(cache)) / 1024 ** 2
+            # Macierz trzyma otwarte pliki cache - zwalniamy ją przed usunięciem katalogu
+            del dtrain
+            peak = sampler.close('train')
+
+        model.load_model(bytearray(booster.save_raw(raw_format='ubj')))
+        metrics.inc('spotify_train_rows_total', iterator.rows, model='external_memory')
+
+        seconds = build.elapsed + fit.elapsed
+        self.report = {
+            'source': source,
+            'rows': iterator.rows,
+            'chunks': iterator.chunks,
+            'batch_rows': self.batch_rows,
+            'n_rounds': n_rounds,
+            'build_seconds': build.elapsed,
+            'fit_seconds': fit.elapsed,
+            'rows_per_s': iterator.rows / seconds if seconds > 0 else float('inf'),
+            'peak_rss_mb': peak,
+            'cache_mb': cache_mb,
+        }
+        if self.holdout > 0:
+            self.report['holdout'] = self.evaluate(model, source, preprocessor)
+        logger.info(f"External-memory training: {iterator.rows} rows, {seconds:.1f}s "
+                    f"({self.report['rows_per_s']:,.0f} rows/s), peak RSS {peak:.0f} MB, cache {cache_mb:.0f} MB")
+        return model
+
+    def evaluate(self, model: xgb.XGBRegressor, source: str,
+                 preprocessor: SpotifyPipelinePreprocessor) -> Dict[str, float]:
+        """Metryki na wierszach walidacyjnych, liczone kawałkami."""
+        iterator = ParquetChunkIter(open_dataset(source), preprocessor, cache_prefix='', batch_rows=self.batch_rows,
+                                    holdout=self.holdout, use_holdout=True, seed=self.seed)
+        y_true, y_pred = [], []
+        for X, y in iterator.chunks_with_labels():
+            y_true.append(y)
+            y_pred.append(model.predict(X))
+        if not y_true:
+            return {}
+        result = ModelEvaluator(plot_mode='none')._calculate_metrics(np.concatenate(y_true), np.concatenate(y_pred))
+        result['rows'] = iterator.rows
+        return result
@@ -0,0 +1,204 @@
+import json
+import logging
+import os
+import uuid
+from datetime import date
+from typing import Any, Dict, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+
+from src.cleaners import SpotifyDataCleaner
+from src.metrics import metrics
+from src.preprocessors import SpotifyPipelinePreprocessor
+
+logger = logging.getLogger(__name__)
+
+KEY_COLUMN = 'track_id'
+GENRE_COLUMN = 'track_genre'
+DATE_COLUMN = 'ingest_date'
+
+# Partycje w stylu Hive: <katalog>/track_genre=<gatunek>/ingest_date=<RRRR-MM-DD>/part-*.parquet
+_PARTITIONING = ds.partitioning(pa.schema([(GENRE_COLUMN, pa.string()), (DATE_COLUMN, pa.string())]),
+                                flavor='hive')
+
+
+class FeatureStore:
+    """
+    Lokalny magazyn cech w Parquet, tylko do dopisywania, partycjonowany po gatunku i dacie ingestu,
+    z kluczem track_id.
+
+    Przechowuje dwa zbiory:
+        - `cleaned/` - wiersze po SpotifyDataCleaner (z kluczem track_id),
+        - `features/<wersja>/` - wektory cech zakodowane preprocessorem danej wersji (+ kolumna celu).
+
+    Każdy ingest dopisuje nowe pliki i przetwarza tylko utwory, których jeszcze nie ma w magazynie;
+    istniejące pliki nie są nigdy nadpisywane. Odczyty filtrują partycje (gatunek, zakres dat) i wczytują
+    tylko potrzebne kolumny.
+
+    Args:
+        root: Katalog magazynu.
+    """
+
+    def __init__(self, root: str = 'data/feature_store'):
+        self.root = root
+
+    @property
+    def cleaned_dir(self) -> str:
+        return os.path.join(self.root, 'cleaned')
+
+    def features_dir(self, version: str) -> str:
+        return os.path.join(self.root, 'features', version)
+
+    def ingest(self, raw: pd.DataFrame, ingest_date: Optional[str] = None) -> int:
+        """
+        Czyści i zapisuje utwory z surowej ramki, których track_id nie ma jeszcze w magazynie.
+        Zwraca liczbę dopisanych wierszy.
+        """
+        ingest_date = ingest_date or date.today().isoformat()
+        with metrics.timer('spotify_feature_store_seconds', op='ingest'):
+            known = self._keys(self.cleaned_dir)
+            new = raw[~raw[KEY_COLUMN].isin(known)]
+            metrics.inc('spotify_feature_store_rows_total', len(raw) - len(new), dataset='cleaned', status='skipped')
+            if new.empty:
+                logger.info(f"No new tracks to ingest ({len(raw)} already in store)")
+                return 0
+
+            clean = SpotifyDataCleaner(keep_track_id=True).clean(new).reset_index()
+            self._write_meta(self.cleaned_dir, {'columns': [c for c in clean.columns if c != KEY_COLUMN]})
+            self._append(clean, self.cleaned_dir, ingest_date)
+
+        logger.info(f"Ingested {len(clean)} new tracks ({len(raw) - len(new)} already in store)")
+        metrics.inc('spotify_feature_store_rows_total', len(clean), dataset='cleaned', status='written')
+        return len(clean)
+
+    def encode(self, preprocessor: SpotifyPipelinePreprocessor, version: str) -> int:
+        """
+        Koduje wytrenowanym preprocessorem wiersze z `cleaned/`, które nie mają jeszcze wektora cech
+        w wersji `version`. Zwraca liczbę dopisanych wektorów.
+        """
+        feature_names = list(preprocessor.get_feature_names())
+        target = preprocessor.target_col
+        out_dir = self.features_dir(version)
+
+        meta = self._read_meta(out_dir)
+        if meta and meta['feature_names'] != feature_names:
+            raise ValueError(f"Feature store version '{version}' was written by a different preprocessor "
+                             f"({len(meta['feature_names'])} vs {len(feature_names)} features).")
+
+        with metrics.timer('spotify_feature_store_seconds', op='encode'):
+            keys = self._keys(self.cleaned_dir)
+            missing = pc.filter(keys, pc.invert(pc.is_in(keys, value_set=self._keys(out_dir))))
+            if len(missing) == 0:
+                logger.info(f"All cleaned tracks already encoded for version '{version}'")
+                return 0
+
+            # Partycje i daty ingestu przenoszone są z wierszy źródłowych
+            clean = self._dataset(self.cleaned_dir).to_table(filter=ds.field(KEY_COLUMN).isin(missing)).to_pandas()
+            X = preprocessor.transform_new_data(clean.drop(columns=[target]))
+
+            vectors = pd.DataFrame(np.asarray(X), columns=feature_names, index=clean.index)
+            vectors.insert(0, KEY_COLUMN, clean[KEY_COLUMN])
+            vectors[target] = clean[target]
+            vectors[GENRE_COLUMN] = clean[GENRE_COLUMN]
+            self._write_meta(out_dir, {'feature_names': feature_names, 'target': target})
+            self._append(vectors, out_dir, clean[DATE_COLUMN].to_numpy())
+
+        logger.info(f"Encoded {len(vectors)} tracks for preprocessor version '{version}'")
+        metrics.inc('spotify_feature_store_rows_total', len(vectors), dataset='features', status='written')
+        return len(vectors)
+
+    def read_cleaned(self, genres: Optional[Sequence[str]] = None, since: Optional[str] = None,
+                     until: Optional[str] = None, columns: Optional[Sequence[str]] = None) -> pd.DataFrame:
+        """
+        Czyszczone wiersze w układzie kolumn SpotifyDataCleaner (track_id w indeksie).
+        Filtry gatunku i dat działają na poziomie partycji, `columns` ogranicza wczytywane kolumny.
+        """
+        order = self._read_meta(self.cleaned_dir).get('columns', [])
+        wanted = [c for c in (columns or order) if c in order]
+        with metrics.timer('spotify_feature_store_seconds', op='read_cleaned'):
+            table = self._dataset(self.cleaned_dir).to_table(columns=[KEY_COLUMN] + wanted,
+                                                             filter=self._partition_filter(genres, since, until))
+        df = table.to_pandas(split_blocks=True, self_destruct=True).set_index(KEY_COLUMN)
+        if GENRE_COLUMN in df.columns:
+            df[GENRE_COLUMN] = df[GENRE_COLUMN].astype('category')
+        return df
+
+    def read_features(self, version: str, genres: Optional[Sequence[str]] = None, since: Optional[str] = None,
+                      until: Optional[str] = None, features: Optional[Sequence[str]] = None,
+                      with_target: bool = True) -> Tuple[np.ndarray, Optional[np.ndarray], np.ndarray]:
+        """
+        Wektory cech wersji `version` gotowe dla modelu: (X, y, track_ids).
+
+        Args:
+            features: Podzbiór cech (domyślnie wszystkie, w kolejności preprocessora).
+            with_target: False pomija kolumnę celu (np. przy predykcji), wtedy y = None.
+        """
+        meta = self._read_meta(self.features_dir(version))
+        if not meta:
+            raise FileNotFoundError(f"No feature vectors stored for version '{version}' in {self.root}")
+        names = list(features) if features is not None else meta['feature_names']
+        columns = [KEY_COLUMN] + names + ([meta['target']] if with_target else [])
+
+        with metrics.timer('spotify_feature_store_seconds', op='read_features'):
+            table = self._dataset(self.features_dir(version)).to_table(
+                columns=columns, filter=self._partition_filter(genres, since, until))
+
+        X = np.column_stack([table.column(name).to_numpy() for name in names]) if len(table) else \
+            np.empty((0, len(names)))
+        y = table.column(meta['target']).to_numpy() if with_target else None
+        metrics.inc('spotify_feature_store_rows_total', len(table), dataset='features', status='read')
+        return X, y, table.column(KEY_COLUMN).to_numpy(zero_copy_only=False)
+
+    def _append(self, df: pd.DataFrame, base_dir: str, ingest_date: Any):
+        """Dopisuje wiersze jako nowe pliki partycji; `ingest_date` to jedna data lub data dla każdego wiersza."""
+        df = df.assign(**{GENRE_COLUMN: df[GENRE_COLUMN].astype(str), DATE_COLUMN: ingest_date})
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        # Unikalna nazwa plików: kolejne ingesty tylko dopisują pliki do partycji
+        ds.write_dataset(table, base_dir, format='parquet', partitioning=_PARTITIONING,
+                         basename_template=f'part-{uuid.uuid4().hex}-{{i}}.parquet',
+                         existing_data_behavior='overwrite_or_ignore')
+
+    def _dataset(self, base_dir: str) -> ds.Dataset:
+        return ds.dataset(base_dir, format='parquet', partitioning=_PARTITIONING,
+                          exclude_invalid_files=True, ignore_prefixes=['_', '.'])
+
+    def _keys(self, base_dir: str) -> pa.Array:
+        """Klucze zapisanych wierszy - wczytywana jest tylko kolumna track_id."""
+        if not self._read_meta(base_dir):
+            return pa.array([], type=pa.string())
+        return self._dataset(base_dir).to_table(columns=[KEY_COLUMN]).column(KEY_COLUMN).combine_chunks()
+
+    @staticmethod
+    def _partition_filter(genres: Optional[Sequence[str]], since: Optional[str], until: Optional[str]):
+        conditions = []
+        if genres is not None:
+            conditions.append(ds.field(GENRE_COLUMN).isin(list(genres)))
+        if since is not None:
+            conditions.append(ds.field(DATE_COLUMN) >= since)
+        if until is not None:
+            conditions.append(ds.field(DATE_COLUMN) <= until)
+
+        expression = None
+        for condition in conditions:
+            expression = condition if expression is None else expression & condition
+        return expression
+
+    @staticmethod
+    def _read_meta(base_dir: str) -> Dict[str, Any]:
+        path = os.path.join(base_dir, '_meta.json')
+        if not os.path.exists(path):
+            return {}
+        with open(path) as f:
+            return json.load(f)
+
+    @staticmethod
+    def _write_meta(base_dir: str, meta: Dict[str, Any]):
+        os.makedirs(base_dir, exist_ok=True)
+        tmp_path = os.path.join(base_dir, '_meta.json.tmp')
+        with open(tmp_path, 'w') as f:
+            json.dump(meta, f, indent=2)
+        os.replace(tmp_path, os.path.join(base_dir, '_meta.json'))
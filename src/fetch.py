@@ -0,0 +1,233 @@
+import hashlib
+import json
+import logging
+import os
+import re
+import shutil
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from src.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+HF_ENDPOINT = os.environ.get('HF_ENDPOINT', 'https://huggingface.co')
+_SHA256 = re.compile(r'^[0-9a-f]{64}$')
+_REDIRECT_CODES = (301, 302, 303, 307, 308)
+
+
+class _NoRedirect(urllib.request.HTTPRedirectHandler):
+    """Zwraca odpowiedź 3xx jako HTTPError zamiast podążać za przekierowaniem."""
+
+    def redirect_request(self, req, fp, code, msg, headers, newurl):
+        return None
+
+
+_NO_REDIRECT_OPENER = urllib.request.build_opener(_NoRedirect)
+
+
+def resolve_url(uri: str, revision: str = 'main') -> str:
+    """Zamienia URI `hf://datasets/<właściciel>/<zbiór>/<ścieżka>` na adres HTTP pliku; adresy HTTP zwraca bez zmian."""
+    if not uri.startswith('hf://'):
+        return uri
+    parts = uri[len('hf://'):].split('/')
+    if len(parts) < 4 or parts[0] != 'datasets':
+        raise ValueError(f"Unsupported Hugging Face URI: {uri} (expected hf://datasets/<owner>/<name>/<path>)")
+    repo, path = '/'.join(parts[1:3]), '/'.join(parts[3:])
+    return f"{HF_ENDPOINT}/datasets/{repo}/resolve/{revision}/{path}"
+
+
+class DatasetMirror:
+    """
+    Lokalne lustro plików danych adresowane treścią (SHA-256).
+
+    Pierwsze pobranie dzieli plik na fragmenty (zapytania HTTP Range) pobierane równolegle, z ponawianiem
+    i wznawianiem przerwanych fragmentów; po złożeniu plik jest weryfikowany sumą SHA-256 i zapisywany jako
+    `blobs/<sha256>`. Indeks `index.json` mapuje adres na sumę, więc kolejne uruchomienia nie korzystają z sieci.
+
+    Args:
+        mirror_dir: Katalog lustra.
+        chunk_size: Rozmiar fragmentu pobieranego jednym zapytaniem (bajty).
+        max_workers: Liczba równoległych połączeń.
+        retries: Liczba ponowień fragmentu po błędzie sieci.
+        timeout: Limit czasu pojedynczego zapytania (s).
+    """
+
+    def __init__(self, mirror_dir: str = 'data/mirror', chunk_size: int = 8 * 1024 ** 2, max_workers: int = 8,
+                 retries: int = 3, timeout: float = 30.0):
+        self.mirror_dir = Path(mirror_dir)
+        self.chunk_size = chunk_size
+        self.max_workers = max_workers
+        self.retries = retries
+        self.timeout = timeout
+        self._index_lock = threading.Lock()
+
+    @property
+    def index_path(self) -> Path:
+        return self.mirror_dir / 'index.json'
+
+    def blob_path(self, sha256: str) -> Path:
+        return self.mirror_dir / 'blobs' / sha256[:2] / sha256
+
+    def fetch(self, uri: str, sha256: Optional[str] = None, refresh: bool = False) -> Path:
+        """
+        Zwraca lokalną ścieżkę pliku spod `uri`, pobierając go tylko wtedy, gdy nie ma go w lustrze.
+
+        Args:
+            sha256: Oczekiwana suma kontrolna. Bez niej używana jest suma z nagłówka ETag (pliki LFS
+                na Hugging Face), a w ostateczności tylko zapisywana suma pobranej treści.
+            refresh: Wymusza ponowne sprawdzenie pliku na serwerze.
+        """
+        url = resolve_url(uri)
+        entry = self._read_index().get(url)
+        if entry and not refresh and (sha256 is None or entry['sha256'] == sha256):
+            path = self.blob_path(entry['sha256'])
+            if path.exists() and path.stat().st_size == entry['size']:
+                logger.info(f"Using mirrored copy of {url}: {path}")
+                metrics.inc('spotify_fetch_bytes_total', entry['size'], source='mirror')
+                return path
+
+        with metrics.timer('spotify_fetch_seconds'):
+            size, etag, accepts_ranges = self._head(url)
+            expected = sha256 or (etag if etag and _SHA256.match(etag) else None)
+            if expected and self.blob_path(expected).exists():
+                # Ta sama treść jest już w lustrze (np. pod innym adresem)
+                path = self.blob_path(expected)
+            else:
+                path = self._download(url, size, accepts_ranges, expected)
+
+        digest = path.name
+        self._update_index(url, {'sha256': digest, 'size': path.stat().st_size, 'etag': etag,
+                                 'fetched_at': time.strftime('%Y-%m-%dT%H:%M:%S')})
+        return path
+
+    def _head(self, url: str) -> Tuple[Optional[int], Optional[str], bool]:
+        # Hugging Face podaje rozmiar i sumę pliku LFS w nagłówkach X-Linked-* odpowiedzi 302 kierującej
+        # na CDN - po przekierowaniu już ich nie ma, więc pierwsze zapytanie nie podąża za przekierowaniem
+        linked = {}
+        try:
+            with self._open(urllib.request.Request(url, method='HEAD'), follow_redirects=False) as response:
+                headers = response.headers
+        except urllib.error.HTTPError as e:
+            if e.code not in _REDIRECT_CODES or not e.headers.get('Location'):
+                raise
+            linked = e.headers
+            location = urllib.parse.urljoin(url, e.headers['Location'])
+            with self._open(urllib.request.Request(location, method='HEAD')) as response:
+                headers = response.headers
+        size = linked.get('X-Linked-Size') or headers.get('X-Linked-Size') or headers.get('Content-Length')
+        etag = (linked.get('X-Linked-Etag') or headers.get('X-Linked-Etag') or headers.get('ETag') or '')
+        etag = etag.strip('"').removeprefix('W/').strip('"')
+        return (int(size) if size else None), (etag or None), headers.get('Accept-Ranges') == 'bytes'
+
+    def _download(self, url: str, size: Optional[int], accepts_ranges: bool, expected: Optional[str]) -> Path:
+        partial_dir = self.mirror_dir / 'partial' / hashlib.sha256(url.encode()).hexdigest()[:16]
+        partial_dir.mkdir(parents=True, exist_ok=True)
+
+        if size is not None and accepts_ranges:
+            ranges = [(start, min(start + self.chunk_size, size) - 1) for start in range(0, size, self.chunk_size)]
+        else:
+            # Serwer bez obsługi Range: jeden strumień, bez wznawiania
+            ranges = [(0, None)]
+        logger.info(f"Downloading {url} ({size or '?'} bytes) in {len(ranges)} chunk(s) "
+                    f"with {min(self.max_workers, len(ranges))} connection(s)")
+
+        chunk_paths = [partial_dir / f'chunk_{i:05d}' for i in range(len(ranges))]
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(ranges)),
+                                thread_name_prefix='dataset-fetch') as executor:
+            list(executor.map(lambda args: self._fetch_chunk(url, *args), zip(chunk_paths, ranges)))
+
+        path = self._assemble(chunk_paths, expected)
+        shutil.rmtree(partial_dir, ignore_errors=True)
+        return path
+
+    def _fetch_chunk(self, url: str, path: Path, byte_range: Tuple[int, Optional[int]]):
+        start, end = byte_range
+        expected_len = None if end is None else end - start + 1
+
+        for attempt in range(self.retries + 1):
+            done = path.stat().st_size if path.exists() and end is not None else 0
+            if expected_len is not None and done == expected_len:
+                return
+            if expected_len is not None and done > expected_len:
+                path.unlink()
+                done = 0
+            try:
+                request = urllib.request.Request(url)
+                if end is not None:
+                    # Wznowienie: pobieramy tylko brakującą końcówkę fragmentu
+                    request.add_header('Range', f'bytes={start + done}-{end}')
+                with self._open(request) as response, open(path, 'ab' if done else 'wb') as f:
+                    if end is not None and response.status != 206:
+                        raise IOError(f"Server ignored Range header (status {response.status})")
+                    while True:
+                        block = response.read(1024 * 1024)
+                        if not block:
+                            break
+                        f.write(block)
+                        metrics.inc('spotify_fetch_bytes_total', len(block), source='network')
+                if expected_len is None or path.stat().st_size == expected_len:
+                    return
+                raise IOError(f"Incomplete chunk {path.name}: {path.stat().st_size}/{expected_len} bytes")
+            except (urllib.error.URLError, OSError) as e:
+                if attempt == self.retries:
+                    raise
+                delay = 0.5 * 2 ** attempt
+                logger.warning(f"Chunk {path.name} failed ({e}), retrying in {delay:.1f}s")
+                time.sleep(delay)
+
+    def _assemble(self, chunk_paths: List[Path], expected: Optional[str]) -> Path:
+        tmp_path = self.mirror_dir / 'blobs' / f'.tmp-{os.getpid()}-{threading.get_ident()}'
+        tmp_path.parent.mkdir(parents=True, exist_ok=True)
+
+        digest = hashlib.sha256()
+        with open(tmp_path, 'wb') as out:
+            for chunk_path in chunk_paths:
+                with open(chunk_path, 'rb') as f:
+                    while block := f.read(4 * 1024 ** 2):
+                        digest.update(block)
+                        out.write(block)
+
+        sha256 = digest.hexdigest()
+        if expected is not None and sha256 != expected:
+            tmp_path.unlink()
+            # Uszkodzone fragmenty nie mogą zostać użyte przy wznowieniu
+            for chunk_path in chunk_paths:
+                chunk_path.unlink(missing_ok=True)
+            raise ValueError(f"Checksum mismatch: expected {expected}, got {sha256}")
+
+        path = self.blob_path(sha256)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        os.replace(tmp_path, path)
+        logger.info(f"Stored {path} (sha256 verified)" if expected else f"Stored {path}")
+        return path
+
+    def _open(self, request: urllib.request.Request, follow_redirects: bool = True):
+        token = os.environ.get('HF_TOKEN')
+        if token and request.full_url.startswith(HF_ENDPOINT):
+            request.add_header('Authorization', f'Bearer {token}')
+        if not follow_redirects:
+            return _NO_REDIRECT_OPENER.open(request, timeout=self.timeout)
+        return urllib.request.urlopen(request, timeout=self.timeout)
+
+    def _read_index(self) -> Dict[str, Dict[str, Any]]:
+        if not self.index_path.exists():
+            return {}
+        with open(self.index_path) as f:
+            return json.load(f)
+
+    def _update_index(self, url: str, entry: Dict[str, Any]):
+        with self._index_lock:
+            index = self._read_index()
+            index[url] = entry
+            self.index_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.index_path.with_suffix('.tmp')
+            with open(tmp_path, 'w') as f:
+                json.dump(index, f, indent=2)
+            os.replace(tmp_path, self.index_path)
@@ -1,8 +1,15 @@
+import csv
 import logging
 from pathlib import Path
 from abc import ABC, abstractmethod
+from typing import Optional
 
 import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pa_csv
+
+from src.fetch import DatasetMirror
+from src.metrics import metrics
 
 logger = logging.getLogger(__name__)
 
@@ -17,10 +24,58 @@ class DataLoader(ABC):
         pass
 
 
+# Źródło zbioru Spotify Tracks używane przez skrypty treningowe
+DATA_SOURCE = "hf://datasets/maharshipandya/spotify-tracks-dataset/dataset.csv"
+
+# Jawne typy kolumn zbioru Spotify (te same, które pandas wnioskuje z pliku), dzięki czemu czytnik
+# równoległy nie musi zgadywać typów osobno dla każdego bloku, a wynik nie zależy od podziału pliku
+SPOTIFY_SCHEMA = {
+    'track_id': pa.string(),
+    'artists': pa.string(),
+    'album_name': pa.string(),
+    'track_name': pa.string(),
+    'track_genre': pa.dictionary(pa.int32(), pa.string()),
+    'popularity': pa.int64(),
+    'explicit': pa.bool_(),
+    'duration_ms': pa.int64(),
+    'time_signature': pa.int64(),
+    'key': pa.int64(),
+    'mode': pa.int64(),
+    'danceability': pa.float64(),
+    'energy': pa.float64(),
+    'loudness': pa.float64(),
+    'speechiness': pa.float64(),
+    'acousticness': pa.float64(),
+    'instrumentalness': pa.float64(),
+    'liveness': pa.float64(),
+    'valence': pa.float64(),
+    'tempo': pa.float64(),
+}
+
+
 class LocalCSVDataLoader(DataLoader):
+    """
+    Wczytuje lokalny plik CSV.
+
+    Silnik 'pandas' to jednowątkowy parser C. Silnik 'pyarrow' dzieli plik na bloki zakończone na granicy
+    wierszy i parsuje je równolegle we wszystkich rdzeniach, z jawnymi typami kolumn (SPOTIFY_SCHEMA);
+    kolumna track_genre od razu trafia do typu category. Konwersja do pandas zwalnia bufory Arrow
+    w trakcie (self_destruct), więc szczyt pamięci nie obejmuje dwóch pełnych kopii danych.
 
-    def __init__(self, filepath: str | Path):
+    Args:
+        filepath: Ścieżka do pliku CSV.
+        engine: 'pandas' lub 'pyarrow' (równoległy).
+        block_size: Rozmiar bloku parsowanego przez jeden wątek (bajty, tylko 'pyarrow').
+    """
+
+    ENGINES = ('pandas', 'pyarrow')
+
+    def __init__(self, filepath: str | Path, engine: str = 'pandas', block_size: int = 16 * 1024 ** 2):
+        if engine not in self.ENGINES:
+            raise ValueError(f"Unsupported engine: {engine} (expected one of {self.ENGINES})")
         self.filepath = Path(filepath)
+        self.engine = engine
+        self.block_size = block_size
 
     def load(self) -> pd.DataFrame:
         if not self.filepath.exists():
@@ -31,17 +86,46 @@ class LocalCSVDataLoader(DataLoader):
             raise ValueError(f"Unsupported file type: {self.filepath}")
 
         try:
-            logger.info(f"Loading data from {self.filepath}")
-            return pd.read_csv(self.filepath)
+            logger.info(f"Loading data from {self.filepath} ({self.engine} engine)")
+            with metrics.timer('spotify_load_seconds', loader='local_csv', engine=self.engine):
+                df = self._read_parallel() if self.engine == 'pyarrow' else pd.read_csv(self.filepath)
+            metrics.inc('spotify_rows_loaded_total', len(df), loader='local_csv')
+            metrics.inc('spotify_load_bytes_total', self.filepath.stat().st_size, loader='local_csv')
+            return df
         except Exception as e:
             logger.error(f"Error loading data from {self.filepath}: {e}")
             raise e
 
+    def _read_parallel(self) -> pd.DataFrame:
+        with open(self.filepath, 'rb') as f:
+            header = f.readline().decode('utf-8').rstrip('\r\n')
+        # Nienazwane kolumny (np. indeks zapisany przez pandas) dostają te same nazwy co w pd.read_csv
+        names = [name or f'Unnamed: {i}' for i, name in enumerate(next(csv.reader([header])))]
+
+        table = pa_csv.read_csv(
+            self.filepath,
+            read_options=pa_csv.ReadOptions(use_threads=True, block_size=self.block_size,
+                                            column_names=names, skip_rows=1),
+            convert_options=pa_csv.ConvertOptions(
+                column_types={col: typ for col, typ in SPOTIFY_SCHEMA.items() if col in names},
+                strings_can_be_null=True,
+            ),
+        )
+        # Bloki kolumn przenoszone są bez łączenia w jedną macierz, a bufory Arrow zwalniane na bieżąco
+        return table.to_pandas(split_blocks=True, self_destruct=True)
+
 
 class HuggingFaceCSVDataLoader(DataLoader):
+    """
+    Wczytuje zdalny CSV (hf:// lub http) przez lokalne lustro: plik pobierany jest równolegle
+    i weryfikowany tylko przy pierwszym użyciu, kolejne uruchomienia czytają go z dysku bez sieci.
+    Z `mirror_dir=None` plik czytany jest bezpośrednio strumieniem przez pandas.
+    """
 
-    def __init__(self, hf_uri: str):
+    def __init__(self, hf_uri: str, mirror_dir: Optional[str] = 'data/mirror', sha256: Optional[str] = None):
         self.hf_uri = hf_uri
+        self.mirror = DatasetMirror(mirror_dir) if mirror_dir else None
+        self.sha256 = sha256
 
     def load(self) -> pd.DataFrame:
 
@@ -52,7 +136,11 @@ class HuggingFaceCSVDataLoader(DataLoader):
 
         try:
             logger.info(f"Loading remote data from {self.hf_uri}")
-            return pd.read_csv(self.hf_uri)
+            with metrics.timer('spotify_load_seconds', loader='huggingface'):
+                source = self.mirror.fetch(self.hf_uri, sha256=self.sha256) if self.mirror else self.hf_uri
+                df = pd.read_csv(source)
+            metrics.inc('spotify_rows_loaded_total', len(df), loader='huggingface')
+            return df
         except Exception as e:
             logger.error(f"Error loading remote data: {e}")
             raise e
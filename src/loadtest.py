@@ -0,0 +1,314 @@
+import http.client
+import json
+import logging
+import queue
+import re
+import threading
+import time
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from urllib.parse import urlsplit
+
+import numpy as np
+import pandas as pd
+
+from src.resources import current_rss_mb, latency_percentiles
+from src.serving import json_default
+from src.synthetic import sample_songs
+
+logger = logging.getLogger(__name__)
+
+# Górne granice kubełków histogramu latencji (ms); ostatni kubełek to +Inf
+LATENCY_BUCKETS_MS = (0.5, 1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000)
+DEFAULT_SLO = ('p99<20ms',)
+
+_SLO_PATTERN = re.compile(r'^(p50|p95|p99|max|mean)\s*<\s*(\d+(?:\.\d+)?)\s*(ms)?$')
+# Znacznik końca harmonogramu w kolejce żądań
+_STOP = object()
+
+
+class InProcessTarget:
+    """Wywołuje SpotifyPredictor.predict_batch bezpośrednio w procesie generatora obciążenia."""
+
+    name = 'in-process'
+
+    def __init__(self, predictor: Any):
+        self.predictor = predictor
+
+    def send(self, batch: pd.DataFrame, payload: bytes) -> int:
+        return len(self.predictor.predict_batch(batch))
+
+
+class HttpTarget:
+    """
+    Wysyła partie jako JSON (POST) na endpoint predykcji, np. uruchomiony przez src.serving.serve_predictions.
+    Każdy wątek generatora utrzymuje własne połączenie keep-alive, żeby nie mierzyć zestawiania TCP.
+    """
+
+    def __init__(self, url: str, timeout: float = 10.0):
+        parts = urlsplit(url)
+        self.name = url
+        self.host, self.port = parts.hostname, parts.port or 80
+        self.path = parts.path or '/predict'
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def send(self, batch: pd.DataFrame, payload: bytes) -> int:
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = self._local.connection = http.client.HTTPConnection(self.host, self.port,
+                                                                             timeout=self.timeout)
+        try:
+            connection.request('POST', self.path, body=payload, headers={'Content-Type': 'application/json'})
+            response = connection.getresponse()
+            body = response.read()
+        except (OSError, http.client.HTTPException):
+            # Zerwane połączenie - następne żądanie otworzy nowe
+            connection.close()
+            self._local.connection = None
+            raise
+        if response.status != 200:
+            raise RuntimeError(f"HTTP {response.status}: {body[:200].decode(errors='replace')}")
+        return len(json.loads(body)['predictions'])
+
+
+def parse_batch_mix(spec: str) -> Dict[int, float]:
+    """'1:0.7,10:0.2,100:0.1' -> {1: 0.7, 10: 0.2, 100: 0.1} (wagi nie muszą sumować się do 1)."""
+    mix = {}
+    for item in spec.split(','):
+        size, _, weight = item.partition(':')
+        mix[int(size)] = float(weight or 1)
+    if not mix or min(mix) < 1 or min(mix.values()) <= 0:
+        raise ValueError(f"Invalid batch mix: {spec!r} (expected e.g. '1:0.7,10:0.2,100:0.1')")
+    return mix
+
+
+def parse_slo(spec: str) -> Tuple[str, float]:
+    """'p99<20ms' -> ('p99_ms', 20.0); obsługiwane są p50, p95, p99, max i mean."""
+    match = _SLO_PATTERN.match(spec.strip().lower())
+    if match is None:
+        raise ValueError(f"Invalid latency objective: {spec!r} (expected e.g. 'p99<20ms')")
+    return f'{match.group(1)}_ms', float(match.group(2))
+
+
+class LoadTester:
+    """
+    Generator obciążenia ścieżki predykcji z pomiarem latencji, przepustowości, CPU i RSS.
+
+    Tryb zamknięty (`rate=None`): `concurrency` wątków wysyła żądania jedno po drugim tak szybko, jak
+    odpowiada cel - mierzy maksymalną przepustowość. Tryb otwarty (`rate` żądań/s): przybycia mają
+    rozkład Poissona niezależny od odpowiedzi, a latencja liczona jest od zaplanowanej chwili wysłania,
+    więc czas oczekiwania w kolejce przy przeciążeniu jest wliczony (bez "coordinated omission").
+
+    Args:
+        target: InProcessTarget lub HttpTarget.
+        concurrency: Liczba równoległych wątków wysyłających żądania.
+        rate: Docelowa liczba żądań na sekundę (None - tryb zamknięty).
+        duration: Czas trwania pomiaru (sekundy), bez rozgrzewki.
+        batch_mix: Rozkład rozmiarów partii {rozmiar: waga}.
+        warmup: Czas rozgrzewki (sekundy); jej żądania nie trafiają do wyników.
+        sample_interval: Co ile sekund próbkowane są CPU, RSS i przepustowość.
+        pool_size: Liczba syntetycznych utworów (w formacie SAMPLE_SONG), z których losowane są partie.
+    """
+
+    def __init__(self, target: Any, concurrency: int = 4, rate: Optional[float] = None, duration: float = 10.0,
+                 batch_mix: Optional[Dict[int, float]] = None, warmup: float = 1.0, sample_interval: float = 0.5,
+                 pool_size: int = 2000, seed: int = 42):
+        self.target = target
+        self.concurrency = concurrency
+        self.rate = rate
+        self.duration = duration
+        self.batch_mix = batch_mix or {1: 1.0}
+        self.warmup = warmup
+        self.sample_interval = sample_interval
+        self.seed = seed
+        self._payloads = self._build_payloads(pool_size)
+
+    def run(self) -> Dict[str, Any]:
+        """Wykonuje jeden pomiar i zwraca raport (latencje, histogram, przepustowość, przebieg CPU/RSS)."""
+        records: List[Tuple[float, float, int, bool]] = []
+        requests: queue.Queue = queue.Queue()
+        start = time.perf_counter()
+        end = start + self.warmup + self.duration
+        timeline = _ResourceTimeline(records, start, self.sample_interval).start()
+
+        workers = [threading.Thread(target=self._worker, args=(i, requests, records, start, end),
+                                    name=f'load-{i}', daemon=True) for i in range(self.concurrency)]
+        for worker in workers:
+            worker.start()
+        if self.rate:
+            self._schedule(requests, start, end)
+        for worker in workers:
+            worker.join()
+        samples = timeline.stop()
+        finished = time.perf_counter()
+
+        return self._report([r for r in records if r[0] >= self.warmup], samples,
+                            finished - start - self.warmup)
+
+    def _build_payloads(self, pool_size: int, variants: int = 16) -> Dict[int, List[Tuple[pd.DataFrame, bytes]]]:
+        """Gotowe partie (DataFrame i JSON) dla każdego rozmiaru - koszt przygotowania nie obciąża pomiaru."""
+        pool = pd.DataFrame(sample_songs(max(pool_size, max(self.batch_mix)), seed=self.seed))
+        rng = np.random.default_rng(self.seed)
+        payloads = {}
+        for size in self.batch_mix:
+            payloads[size] = []
+            for offset in rng.integers(0, len(pool) - size + 1, size=variants):
+                batch = pool.iloc[offset:offset + size].reset_index(drop=True)
+                payloads[size].append((batch, json.dumps(batch.to_dict(orient='records'), default=json_default)
+                                       .encode('utf-8')))
+        return payloads
+
+    def _schedule(self, requests: queue.Queue, start: float, end: float):
+        """Przybycia Poissona z intensywnością `rate`; kolejka jest nieograniczona, więc przeciążenie rośnie w latencji."""
+        rng = np.random.default_rng(self.seed)
+        scheduled = start
+        while True:
+            scheduled += rng.exponential(1 / self.rate)
+            if scheduled >= end:
+                break
+            delay = scheduled - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            requests.put(scheduled)
+        for _ in range(self.concurrency):
+            requests.put(_STOP)
+
+    def _worker(self, index: int, requests: queue.Queue, records: list, start: float, end: float):
+        rng = np.random.default_rng([self.seed, index])
+        sizes = np.array(list(self.batch_mix))
+        weights = np.array(list(self.batch_mix.values()))
+        weights = weights / weights.sum()
+        while True:
+            if self.rate:
+                scheduled = requests.get()
+                if scheduled is _STOP:
+                    return
+            else:
+                scheduled = time.perf_counter()
+                if scheduled >= end:
+                    return
+            size = int(rng.choice(sizes, p=weights))
+            batch, payload = self._payloads[size][rng.integers(len(self._payloads[size]))]
+            try:
+                self.target.send(batch, payload)
+                ok = True
+            except Exception as e:
+                logger.debug(f"Request failed: {e}")
+                ok = False
+            records.append((scheduled - start, time.perf_counter() - scheduled, size, ok))
+
+    def _report(self, records: list, samples: List[Dict[str, float]], elapsed: float) -> Dict[str, Any]:
+        report: Dict[str, Any] = {
+            'target': self.target.name,
+            'mode': 'open' if self.rate else 'closed',
+            'concurrency': self.concurrency,
+            'rate': self.rate,
+            'duration_s': elapsed,
+            'batch_mix': {str(size): weight for size, weight in self.batch_mix.items()},
+            'requests': len(records),
+        }
+        ok = [r for r in records if r[3]]
+        report['errors'] = len(records) - len(ok)
+        report['error_rate'] = report['errors'] / len(records) if records else 0.0
+        report['throughput'] = {
+            'requests_per_s': len(ok) / elapsed if elapsed > 0 else 0.0,
+            'predictions_per_s': sum(r[2] for r in ok) / elapsed if elapsed > 0 else 0.0,
+        }
+        if ok:
+            latencies = np.array([r[1] for r in ok])
+            report['latency'] = latency_percentiles(latencies)
+            report['latency_by_batch'] = {
+                str(size): latency_percentiles([r[1] for r in ok if r[2] == size])
+                for size in self.batch_mix if any(r[2] == size for r in ok)
+            }
+            counts = np.histogram(latencies * 1000, bins=(0,) + LATENCY_BUCKETS_MS + (np.inf,))[0]
+            report['histogram'] = [{'le_ms': le, 'count': int(n)}
+                                   for le, n in zip(LATENCY_BUCKETS_MS + (float('inf'),), counts)]
+        # Bez próbek z rozgrzewki, o ile pomiar trwał dłużej niż jeden interwał
+        measured = [s for s in samples if s['t'] > self.warmup] or samples
+        report['resources'] = {
+            'cpu_mean_pct': float(np.mean([s['cpu_pct'] for s in measured])) if measured else 0.0,
+            'cpu_max_pct': float(max((s['cpu_pct'] for s in measured), default=0.0)),
+            'rss_max_mb': float(max((s['rss_mb'] for s in measured), default=current_rss_mb())),
+        }
+        report['timeline'] = samples
+        return report
+
+
+class _ResourceTimeline:
+    """Wątek tła zapisujący co `interval` sekund: CPU procesu (% jednego rdzenia), RSS i liczbę żądań/s."""
+
+    def __init__(self, records: list, start: float, interval: float):
+        self.records = records
+        self.start_time = start
+        self.interval = interval
+        self.samples: List[Dict[str, float]] = []
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> '_ResourceTimeline':
+        self._thread = threading.Thread(target=self._run, name='load-timeline', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> List[Dict[str, float]]:
+        self._stop.set()
+        self._thread.join()
+        return self.samples
+
+    def _run(self):
+        wall, cpu, done = time.perf_counter(), time.process_time(), 0
+        while not self._stop.wait(self.interval):
+            now, now_cpu, now_done = time.perf_counter(), time.process_time(), len(self.records)
+            self.samples.append({
+                't': now - self.start_time,
+                'cpu_pct': 100 * (now_cpu - cpu) / (now - wall),
+                'rss_mb': current_rss_mb(),
+                'requests_per_s': (now_done - done) / (now - wall),
+            })
+            wall, cpu, done = now, now_cpu, now_done
+
+
+def check_slo(report: Dict[str, Any], objectives: Sequence[str] = DEFAULT_SLO,
+              min_predictions_per_s: Optional[float] = None, max_error_rate: float = 0.0) -> Dict[str, Any]:
+    """
+    Ocenia raport LoadTester względem celów: latencji (np. 'p99<20ms'), minimalnej liczby predykcji
+    na sekundę i maksymalnego odsetka błędów. Zwraca listę sprawdzeń i łączny werdykt `passed`.
+    """
+    latency = report.get('latency', {})
+    checks = []
+    for spec in objectives:
+        metric, threshold = parse_slo(spec)
+        # Brak udanych żądań - cel latencji niespełniony
+        value = latency.get(metric, float('inf'))
+        checks.append({'name': spec, 'value': value, 'threshold': threshold, 'passed': value < threshold})
+    if min_predictions_per_s is not None:
+        value = report['throughput']['predictions_per_s']
+        checks.append({'name': f'predictions/s>={min_predictions_per_s:g}', 'value': value,
+                       'threshold': min_predictions_per_s, 'passed': value >= min_predictions_per_s})
+    checks.append({'name': f'error_rate<={max_error_rate:g}', 'value': report['error_rate'],
+                   'threshold': max_error_rate, 'passed': report['error_rate'] <= max_error_rate})
+    return {'passed': all(c['passed'] for c in checks), 'checks': checks}
+
+
+def find_capacity(tester: LoadTester, rates: Sequence[float], objectives: Sequence[str] = DEFAULT_SLO,
+                  max_error_rate: float = 0.0) -> Dict[str, Any]:
+    """
+    Zwiększa obciążenie krokami (tryb otwarty, kolejne `rates` żądań/s) do pierwszego kroku, który nie
+    spełnia SLO. Wynik `capacity` to przepustowość ostatniego zaliczonego kroku - np. ile predykcji/s
+    obsługuje jedna maszyna przy p99 < 20 ms.
+    """
+    steps = []
+    capacity = None
+    for rate in sorted(rates):
+        tester.rate = rate
+        report = tester.run()
+        report['slo'] = check_slo(report, objectives, max_error_rate=max_error_rate)
+        steps.append(report)
+        logger.info(f"{rate:g} req/s: p99 {report.get('latency', {}).get('p99_ms', float('nan')):.2f} ms, "
+                    f"{report['throughput']['predictions_per_s']:,.0f} predictions/s - "
+                    f"{'PASS' if report['slo']['passed'] else 'FAIL'}")
+        if not report['slo']['passed']:
+            break
+        capacity = {'rate': rate, **report['throughput']}
+    return {'objectives': list(objectives), 'capacity': capacity, 'steps': steps}
@@ -0,0 +1,203 @@
+import hashlib
+import json
+import logging
+import os
+import platform
+import random
+from datetime import datetime
+from importlib import metadata
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Stała liczba wątków w trybie deterministycznym: kolejność sumowania histogramów XGBoost
+# zależy od liczby wątków, więc przypinamy ją niezależnie od liczby rdzeni maszyny
+DETERMINISTIC_THREADS = 4
+
+LIBRARIES = ['numpy', 'pandas', 'scikit-learn', 'xgboost', 'pyarrow', 'joblib']
+
+# Zmienne środowiskowe wpływające na liczbę wątków bibliotek numerycznych
+THREAD_ENV_VARS = ['OMP_NUM_THREADS', 'OPENBLAS_NUM_THREADS', 'MKL_NUM_THREADS']
+
+
+def dataset_fingerprint(df: pd.DataFrame) -> Dict[str, Any]:
+    """Odcisk zbioru danych: SHA-256 z hashy wierszy (pandas) oraz kształt i typy kolumn."""
+    row_hashes = pd.util.hash_pandas_object(df, index=False).to_numpy()
+    return {
+        'sha256': hashlib.sha256(row_hashes.tobytes()).hexdigest(),
+        'rows': len(df),
+        'columns': {col: str(dtype) for col, dtype in df.dtypes.items()},
+    }
+
+
+def array_fingerprint(values: np.ndarray) -> str:
+    """SHA-256 tablicy (np. predykcji) - pozwala sprawdzić, czy dwa przebiegi dały identyczny model."""
+    return hashlib.sha256(np.ascontiguousarray(values, dtype=np.float64).tobytes()).hexdigest()
+
+
+def library_versions() -> Dict[str, Optional[str]]:
+    versions: Dict[str, Optional[str]] = {'python': platform.python_version()}
+    for name in LIBRARIES:
+        try:
+            versions[name] = metadata.version(name)
+        except metadata.PackageNotFoundError:
+            versions[name] = None
+    return versions
+
+
+class RunManifest:
+    """
+    Manifest przebiegu treningu lub tuningu: odcisk danych, konfiguracja cleanera i preprocessora,
+    hiperparametry, liczby wątków, wersje bibliotek, czasy etapów i metryki.
+
+    W trybie deterministycznym manifest ustala ziarna generatorów losowych, a `n_jobs` zwraca stałą
+    liczbę wątków zamiast -1. Dwa przebiegi na maszynach o różnej liczbie rdzeni dają wtedy ten sam model
+    (zgodne `predictions_sha256`), więc można je porównać zarówno pod względem czasu, jak i dokładności.
+
+    Args:
+        run: Nazwa przebiegu (np. 'training_v1').
+        deterministic: Tryb deterministyczny.
+        threads: Liczba wątków w trybie deterministycznym (domyślnie DETERMINISTIC_THREADS).
+        seed: Ziarno generatorów losowych.
+    """
+
+    def __init__(self, run: str, deterministic: bool = False, threads: Optional[int] = None, seed: int = 42):
+        self.run = run
+        self.deterministic = deterministic
+        self.threads = threads or DETERMINISTIC_THREADS
+        self.seed = seed
+        self.started_at = datetime.now()
+        self.data: Dict[str, Any] = {
+            'run': run,
+            'started_at': self.started_at.isoformat(timespec='seconds'),
+            'deterministic': deterministic,
+            'seed': seed,
+            'platform': platform.platform(),
+            'libraries': library_versions(),
+            'threads': {
+                'cpu_count': os.cpu_count(),
+                'n_jobs': self.n_jobs,
+                **{var: os.environ.get(var) for var in THREAD_ENV_VARS},
+            },
+        }
+        if deterministic:
+            self.pin_seeds()
+
+    @property
+    def n_jobs(self) -> int:
+        """Liczba wątków dla modeli: stała w trybie deterministycznym, -1 (wszystkie rdzenie) w pozostałych."""
+        return self.threads if self.deterministic else -1
+
+    def pin_seeds(self):
+        random.seed(self.seed)
+        np.random.seed(self.seed)
+
+    def record(self, key: str, value: Any) -> Any:
+        """Zapisuje sekcję manifestu i zwraca `value` (wygodne jako etap pipeline'u)."""
+        self.data[key] = value
+        return value
+
+    def record_dataset(self, df: pd.DataFrame, source: Optional[str] = None) -> Dict[str, Any]:
+        return self.record('dataset', {'source': source, **dataset_fingerprint(df)})
+
+    def record_model(self, model: Any):
+        """Hiperparametry modelu (get_params) i faktycznie użyta liczba wątków."""
+        params = model.get_params() if hasattr(model, 'get_params') else {}
+        self.data['model'] = {
+            'class': model.__class__.__name__,
+            'params': {k: v for k, v in params.items() if _is_json_scalar(v)},
+        }
+        self.data['threads']['model_n_jobs'] = params.get('n_jobs')
+
+    def record_cleaner(self, cleaner: Any):
+        self.data['cleaner'] = {'class': cleaner.__class__.__name__, **_scalar_attributes(cleaner)}
+
+    def record_preprocessor(self, preprocessor: Any):
+        """Konfiguracja preprocessora oraz listy cech (kolejność kolumn wpływa na model)."""
+        config = _scalar_attributes(preprocessor)
+        pipeline = getattr(preprocessor, 'pipeline', None)
+        if pipeline is not None and hasattr(pipeline, 'transformers_'):
+            config['transformers'] = {name: list(columns) for name, _, columns in pipeline.transformers_
+                                      if name != 'remainder'}
+        config['n_features'] = len(getattr(preprocessor, 'feature_names', []))
+        self.data['preprocessor'] = {'class': preprocessor.__class__.__name__, **config}
+
+    def record_pipeline(self, report: Dict[str, Any]):
+        """Czasy i szczyt pamięci etapów z raportu PipelineRunner."""
+        self.data['timings'] = {
+            'total_seconds': report.get('total_seconds'),
+            'stages': {name: {k: rep[k] for k in ('status', 'seconds', 'peak_rss_mb') if k in rep}
+                       for name, rep in report.get('stages', {}).items()},
+        }
+
+    def record_metrics(self, metrics: Dict[str, Any], predictions: Optional[np.ndarray] = None):
+        self.data['metrics'] = {k: v for k, v in metrics.items() if k in ('rmse', 'mae', 'r2', 'bias')}
+        if predictions is not None:
+            self.data['metrics']['predictions_sha256'] = array_fingerprint(predictions)
+
+    def save(self, output_dir: str = 'reports/runs') -> str:
+        os.makedirs(output_dir, exist_ok=True)
+        path = os.path.join(output_dir, f"{self.run}_{self.started_at:%Y%m%d_%H%M%S}.json")
+        with open(path, 'w') as f:
+            json.dump(self.data, f, indent=2, default=str)
+        logger.info(f"Run manifest saved to {path}")
+        return path
+
+
+def _is_json_scalar(value: Any) -> bool:
+    return value is None or isinstance(value, (bool, int, float, str))
+
+
+def _scalar_attributes(obj: Any) -> Dict[str, Any]:
+    return {k: v for k, v in vars(obj).items() if not k.startswith('_') and _is_json_scalar(v)}
+
+
+def _same_value(a: Any, b: Any) -> bool:
+    # Brakujące wartości (np. parametr `missing` XGBoost) zapisywane są jako NaN, a NaN != NaN
+    both_nan = isinstance(a, float) and isinstance(b, float) and np.isnan(a) and np.isnan(b)
+    return a == b or both_nan
+
+
+def load_manifest(path: str) -> Dict[str, Any]:
+    with open(path) as f:
+        return json.load(f)
+
+
+def compare_manifests(baseline: Dict[str, Any], candidate: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Porównuje dwa manifesty: czy dane, konfiguracja i predykcje są identyczne, różnice metryk
+    oraz przyspieszenie etapów (czas bazowy / czas nowy).
+    """
+    def section(manifest: Dict[str, Any], key: str) -> Dict[str, Any]:
+        return manifest.get(key) or {}
+
+    base_params = {k: v for k, v in section(baseline, 'model').get('params', {}).items() if k != 'n_jobs'}
+    cand_params = {k: v for k, v in section(candidate, 'model').get('params', {}).items() if k != 'n_jobs'}
+    changed_params: List[str] = sorted(k for k in set(base_params) | set(cand_params)
+                                       if not _same_value(base_params.get(k), cand_params.get(k)))
+
+    base_metrics, cand_metrics = section(baseline, 'metrics'), section(candidate, 'metrics')
+    base_stages = section(baseline, 'timings').get('stages', {})
+    cand_stages = section(candidate, 'timings').get('stages', {})
+
+    speedups = {}
+    for name, rep in cand_stages.items():
+        old, new = base_stages.get(name, {}).get('seconds'), rep.get('seconds')
+        if old and new and base_stages[name].get('status') == rep.get('status') == 'done':
+            speedups[name] = old / new
+
+    return {
+        'same_dataset': section(baseline, 'dataset').get('sha256') == section(candidate, 'dataset').get('sha256'),
+        'changed_params': changed_params,
+        'same_predictions': (base_metrics.get('predictions_sha256') is not None
+                             and base_metrics.get('predictions_sha256') == cand_metrics.get('predictions_sha256')),
+        'metric_deltas': {k: cand_metrics[k] - base_metrics[k] for k in ('rmse', 'mae', 'r2')
+                          if k in base_metrics and k in cand_metrics},
+        'threads': {'baseline': section(baseline, 'threads'), 'candidate': section(candidate, 'threads')},
+        'total_speedup': (section(baseline, 'timings').get('total_seconds') or 0) /
+                         (section(candidate, 'timings').get('total_seconds') or float('inf')),
+        'stage_speedups': speedups,
+    }
@@ -0,0 +1,268 @@
+import bisect
+import functools
+import json
+import logging
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Zdarzenia (pojedyncze pomiary) trafiają do osobnego loggera w formacie JSON.
+# Domyślnie jest wyłączony, więc koszt to jedno sprawdzenie poziomu logowania.
+events_logger = logging.getLogger('src.metrics.events')
+events_logger.propagate = False
+
+# Domyślne przedziały histogramów czasu (sekundy) - od pojedynczej predykcji po trening
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+                   1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0, 1800.0)
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+def _label_key(labels: Dict[str, Any]) -> LabelKey:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _format_labels(key: LabelKey, extra: Optional[Dict[str, str]] = None) -> str:
+    pairs = list(key) + list((extra or {}).items())
+    if not pairs:
+        return ''
+    escaped = [(k, v.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')) for k, v in pairs]
+    return '{' + ','.join(f'{k}="{v}"' for k, v in escaped) + '}'
+
+
+class _Histogram:
+    def __init__(self, buckets: Sequence[float]):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class Timer:
+    """
+    Mierzy czas bloku kodu i zapisuje go w histogramie. Działa jako context manager
+    oraz jako dekorator. Po wyjściu z bloku czas dostępny jest w `elapsed`.
+    """
+
+    def __init__(self, registry: 'MetricsRegistry', name: str, labels: Dict[str, Any]):
+        self.registry = registry
+        self.name = name
+        self.labels = labels
+        self.elapsed: float = 0.0
+        self._start = 0.0
+
+    def __enter__(self) -> 'Timer':
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.elapsed = time.perf_counter() - self._start
+        labels = self.labels if exc_type is None else {**self.labels, 'status': 'error'}
+        self.registry.observe(self.name, self.elapsed, **labels)
+
+    def __call__(self, func: Callable) -> Callable:
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with Timer(self.registry, self.name, self.labels):
+                return func(*args, **kwargs)
+        return wrapper
+
+
+class MetricsRegistry:
+    """
+    Rejestr metryk procesu: liczniki, wartości chwilowe (gauge) i histogramy.
+    Udostępnia eksport w formacie tekstowym Prometheusa (plik lub endpoint HTTP)
+    oraz strukturalny log JSON z każdym pomiarem.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters: Dict[str, Dict[LabelKey, float]] = {}
+        self._gauges: Dict[str, Dict[LabelKey, float]] = {}
+        self._histograms: Dict[str, Dict[LabelKey, _Histogram]] = {}
+        self._buckets: Dict[str, Tuple[float, ...]] = {}
+        self._help: Dict[str, str] = {}
+        self._server: Optional[ThreadingHTTPServer] = None
+
+    def describe(self, name: str, help_text: str, buckets: Optional[Sequence[float]] = None):
+        """Ustawia opis metryki (linia # HELP) i opcjonalnie własne przedziały histogramu."""
+        self._help[name] = help_text
+        if buckets is not None:
+            self._buckets[name] = tuple(sorted(buckets))
+
+    def inc(self, name: str, value: float = 1.0, **labels):
+        """Zwiększa licznik."""
+        key = _label_key(labels)
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0.0) + value
+        self._emit('counter', name, value, labels)
+
+    def set(self, name: str, value: float, **labels):
+        """Ustawia wartość chwilową (gauge)."""
+        with self._lock:
+            self._gauges.setdefault(name, {})[_label_key(labels)] = value
+        self._emit('gauge', name, value, labels)
+
+    def observe(self, name: str, value: float, **labels):
+        """Dodaje pomiar do histogramu."""
+        key = _label_key(labels)
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            hist = series.get(key)
+            if hist is None:
+                hist = series[key] = _Histogram(self._buckets.get(name, DEFAULT_BUCKETS))
+            hist.observe(value)
+        self._emit('histogram', name, value, labels)
+
+    def timer(self, name: str, **labels) -> Timer:
+        """Zwraca timer (context manager / dekorator) zapisujący czas do histogramu `name`."""
+        return Timer(self, name, labels)
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._gauges.clear()
+            self._histograms.clear()
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Zwraca bieżący stan wszystkich metryk jako słownik (np. do zapisu w raporcie JSON)."""
+        with self._lock:
+            return {
+                'counters': {n: [{'labels': dict(k), 'value': v} for k, v in s.items()]
+                             for n, s in self._counters.items()},
+                'gauges': {n: [{'labels': dict(k), 'value': v} for k, v in s.items()]
+                           for n, s in self._gauges.items()},
+                'histograms': {n: [{'labels': dict(k), 'count': h.count, 'sum': h.sum}
+                                   for k, h in s.items()]
+                               for n, s in self._histograms.items()},
+            }
+
+    def to_prometheus(self) -> str:
+        """Eksportuje metryki w formacie tekstowym Prometheusa (exposition format 0.0.4)."""
+        lines: List[str] = []
+        with self._lock:
+            for kind, store in (('counter', self._counters), ('gauge', self._gauges)):
+                for name in sorted(store):
+                    self._header(lines, name, kind)
+                    for key, value in store[name].items():
+                        lines.append(f'{name}{_format_labels(key)} {value:g}')
+
+            for name in sorted(self._histograms):
+                self._header(lines, name, 'histogram')
+                for key, hist in self._histograms[name].items():
+                    cumulative = 0
+                    for bound, count in zip(hist.buckets, hist.counts):
+                        cumulative += count
+                        lines.append(f'{name}_bucket{_format_labels(key, {"le": f"{bound:g}"})} {cumulative}')
+                    lines.append(f'{name}_bucket{_format_labels(key, {"le": "+Inf"})} {hist.count}')
+                    lines.append(f'{name}_sum{_format_labels(key)} {hist.sum:g}')
+                    lines.append(f'{name}_count{_format_labels(key)} {hist.count}')
+        return '\n'.join(lines) + '\n'
+
+    def write_prometheus(self, path: str) -> str:
+        """Zapisuje metryki do pliku (np. dla node_exporter textfile collector). Zapis jest atomowy."""
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        tmp_path = f'{path}.tmp'
+        with open(tmp_path, 'w') as f:
+            f.write(self.to_prometheus())
+        os.replace(tmp_path, path)
+        logger.info(f"Metrics written to {path}")
+        return path
+
+    def serve_prometheus(self, port: int = 9108, host: str = '0.0.0.0') -> ThreadingHTTPServer:
+        """Uruchamia w wątku tła endpoint HTTP /metrics dla Prometheusa."""
+        registry = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?')[0] != '/metrics':
+                    self.send_error(404)
+                    return
+                body = registry.to_prometheus().encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=self._server.serve_forever, name='metrics-http', daemon=True).start()
+        logger.info(f"Serving Prometheus metrics on http://{host}:{self._server.server_port}/metrics")
+        return self._server
+
+    def enable_json_log(self, path: str):
+        """Włącza strukturalny log JSON (jedna linia na pomiar) zapisywany do pliku."""
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        handler = logging.FileHandler(path)
+        handler.setFormatter(logging.Formatter('%(message)s'))
+        events_logger.addHandler(handler)
+        events_logger.setLevel(logging.INFO)
+        return handler
+
+    def _header(self, lines: List[str], name: str, kind: str):
+        if name in self._help:
+            lines.append(f'# HELP {name} {self._help[name]}')
+        lines.append(f'# TYPE {name} {kind}')
+
+    @staticmethod
+    def _emit(kind: str, name: str, value: float, labels: Dict[str, Any]):
+        if events_logger.isEnabledFor(logging.INFO):
+            events_logger.info(json.dumps({
+                'ts': time.time(), 'type': kind, 'metric': name, 'value': value,
+                'labels': {k: str(v) for k, v in labels.items()},
+            }))
+
+
+# Globalny rejestr używany przez moduły src
+metrics = MetricsRegistry()
+
+metrics.describe('spotify_load_seconds', 'Czas wczytywania danych.')
+metrics.describe('spotify_rows_loaded_total', 'Liczba wczytanych wierszy.')
+metrics.describe('spotify_load_bytes_total', 'Rozmiar wczytanych plików danych (bajty).')
+metrics.describe('spotify_fetch_seconds', 'Czas pobierania pliku danych do lokalnego lustra.')
+metrics.describe('spotify_fetch_bytes_total', 'Bajty danych pobrane z sieci lub odczytane z lustra.')
+metrics.describe('spotify_feature_store_seconds', 'Czas operacji magazynu cech (ingest, kodowanie, odczyt).')
+metrics.describe('spotify_feature_store_rows_total', 'Wiersze zapisane, pominięte i odczytane z magazynu cech.')
+metrics.describe('spotify_clean_step_seconds', 'Czas kroków czyszczenia danych.')
+metrics.describe('spotify_clean_rows_removed_total', 'Liczba wierszy usuniętych podczas czyszczenia.')
+metrics.describe('spotify_preprocess_seconds', 'Czas dopasowania i transformacji preprocessora.')
+metrics.describe('spotify_preprocess_rows_total', 'Liczba wierszy przetworzonych przez preprocessor.')
+metrics.describe('spotify_train_seconds', 'Czas trenowania modelu.')
+metrics.describe('spotify_train_rows_total', 'Liczba wierszy użytych do trenowania.')
+metrics.describe('spotify_plan_seconds', 'Czas planowania budżetu treningu (krzywa uczenia).')
+metrics.describe('spotify_tune_seconds', 'Całkowity czas tuningu hiperparametrów.')
+metrics.describe('spotify_tune_trial_seconds',
+                 'Czas jednej próby tuningu: dopasowanie i ocena na wszystkich foldach CV (suma czasów foldów).')
+metrics.describe('spotify_tune_trials_total', 'Liczba ocenionych kombinacji hiperparametrów.')
+metrics.describe('spotify_serializer_seconds', 'Czas zapisu/odczytu artefaktów.')
+metrics.describe('spotify_serializer_bytes_total', 'Rozmiar zapisanych/wczytanych artefaktów.')
+metrics.describe('spotify_stream_records_total', 'Rekordy przetworzone w trybie strumieniowym (ok/błąd).')
+metrics.describe('spotify_shard_predictions_total', 'Predykcje zespołu per gatunek według rodzaju modelu (shard/globalny).')
+metrics.describe('spotify_predict_seconds', 'Latencja predykcji.')
+metrics.describe('spotify_predictions_total', 'Liczba wykonanych predykcji (wierszy).')
+metrics.describe('spotify_model_info', 'Wersja modelu obsługującego predykcje (1 - aktywna).')
+metrics.describe('spotify_model_swap_seconds', 'Czas weryfikacji, wczytania i rozgrzewki nowego modelu przed podmianą.')
+metrics.describe('spotify_model_swaps_total', 'Liczba podmian modelu w działającym procesie.')
+metrics.describe('spotify_similarity_seconds', 'Czas budowy indeksu podobnych utworów i zapytań top-k.')
+metrics.describe('spotify_similarity_queries_total', 'Liczba zapytań o podobne utwory (wiersze).')
+metrics.describe('spotify_explain_seconds', 'Czas wyznaczania atrybucji cech dla partii.')
+metrics.describe('spotify_explanations_total', 'Liczba wyjaśnionych predykcji (wierszy).')
+metrics.describe('spotify_drift_seconds', 'Czas sprawdzania dryfu danych dla partii.')
+metrics.describe('spotify_drift_psi', 'PSI ostatniej partii względem danych treningowych.')
+metrics.describe('spotify_drift_missing_total', 'Liczba brakujących wartości w danych do predykcji.')
+metrics.describe('spotify_drift_unknown_total', 'Liczba nieznanych kategorii (np. gatunków spoza treningu).')
+metrics.describe('spotify_drift_out_of_range_total', 'Liczba wartości spoza zakresu treningowego.')
+metrics.describe('spotify_pipeline_stage_seconds', 'Czas etapów pipeline\'u.')
@@ -0,0 +1,235 @@
+import logging
+import threading
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from src.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# Zabezpieczenie przed log(0) w PSI dla pustych przedziałów
+PSI_EPSILON = 1e-4
+
+
+def psi(expected: np.ndarray, actual: np.ndarray) -> float:
+    """Population Stability Index między dwoma rozkładami (proporcjami w tych samych przedziałach)."""
+    expected = np.clip(expected, PSI_EPSILON, None)
+    actual = np.clip(actual, PSI_EPSILON, None)
+    return float(np.sum((actual - expected) * np.log(actual / expected)))
+
+
+def binned_ks(expected: np.ndarray, actual: np.ndarray) -> float:
+    """Statystyka Kołmogorowa-Smirnowa liczona na dystrybuantach z przedziałów (dolne ograniczenie dokładnej)."""
+    return float(np.abs(np.cumsum(expected) - np.cumsum(actual)).max())
+
+
+@dataclass
+class ReferenceProfile:
+    """
+    Statystyki referencyjne zbioru treningowego zapisywane razem z preprocessorem.
+
+    Cechy numeryczne: przedziały z kwantyli treningowych (`cuts`), proporcje w przedziałach, min/max.
+    Cechy kategoryczne: znane kategorie i ich proporcje.
+    """
+    numeric: Dict[str, Dict[str, Any]] = field(default_factory=dict)
+    categorical: Dict[str, Dict[str, Any]] = field(default_factory=dict)
+    n_rows: int = 0
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame, numeric_features: List[str], categorical_features: List[str],
+                   n_bins: int = 20) -> 'ReferenceProfile':
+        profile = cls(n_rows=len(df))
+        quantiles = np.linspace(0, 1, n_bins + 1)[1:-1]
+
+        for col in numeric_features:
+            values = df[col].to_numpy(dtype=np.float64)
+            values = values[~np.isnan(values)]
+            cuts = np.unique(np.quantile(values, quantiles)) if len(values) else np.array([])
+            counts = np.bincount(np.searchsorted(cuts, values, side='right'), minlength=len(cuts) + 1)
+            profile.numeric[col] = {
+                'cuts': cuts,
+                'expected': counts / max(counts.sum(), 1),
+                'min': float(values.min()) if len(values) else np.nan,
+                'max': float(values.max()) if len(values) else np.nan,
+            }
+
+        for col in categorical_features:
+            counts = df[col].value_counts(dropna=True)
+            profile.categorical[col] = {
+                'categories': counts.index.tolist(),
+                'expected': (counts / max(counts.sum(), 1)).to_numpy(),
+            }
+        return profile
+
+
+class _FeatureSketch:
+    """Skumulowane liczności jednej cechy - pamięć stała, niezależna od liczby wierszy."""
+
+    def __init__(self, n_buckets: int):
+        self.counts = np.zeros(n_buckets, dtype=np.int64)
+        self.missing = 0
+        self.unknown = 0
+        # Nieznane kategorie w próbce rozkładu - ta sama populacja co `counts` (PSI)
+        self.binned_unknown = 0
+        self.out_of_range = 0
+        self.rows = 0
+
+
+class DriftMonitor:
+    """
+    Monitor dryfu i jakości danych działający w ścieżce predykcji wsadowej.
+
+    Dla każdej partii liczy wektorowo (np.searchsorted/np.bincount) rozkład każdej cechy w przedziałach
+    referencyjnych i zwraca PSI oraz binowaną statystykę KS, a także liczbę braków, nieznanych kategorii
+    (np. gatunków, które OneHotEncoder zamienia na same zera) i wartości spoza zakresu treningowego.
+    Skumulowane szkice pozwalają ocenić dryf całego strumienia (`summary()`).
+    Monitor może być współdzielony przez wiele wątków (np. endpoint HTTP): losowanie próbki i aktualizacja
+    szkiców odbywają się pod blokadą, a ocena partii - poza nią.
+
+    Braki, nieznane kategorie i wartości spoza zakresu liczone są na wszystkich wierszach, a rozkład
+    (PSI/KS) na losowej próbce `sample_size` wierszy partii - koszt jest więc stały niezależnie od jej rozmiaru.
+
+    Args:
+        reference: Statystyki referencyjne z SpotifyPipelinePreprocessor.process().
+        psi_threshold: Próg PSI, powyżej którego cecha uznawana jest za dryfującą (0.2 - typowa wartość).
+        min_rows: Minimalna liczba wierszy próbki do liczenia PSI/KS (mniejsze partie tylko aktualizują szkice).
+        sample_size: Liczba wierszy partii używana do rozkładu; None - wszystkie wiersze.
+    """
+
+    def __init__(self, reference: ReferenceProfile, psi_threshold: float = 0.2, min_rows: int = 100,
+                 sample_size: Optional[int] = 2048, seed: int = 42):
+        self.reference = reference
+        self.psi_threshold = psi_threshold
+        self.min_rows = min_rows
+        self.sample_size = sample_size
+        self._rng = np.random.default_rng(seed)
+        self._lock = threading.Lock()
+        self.last_report: Optional[Dict[str, Dict[str, Any]]] = None
+
+        self._numeric = {col: _FeatureSketch(len(spec['cuts']) + 1) for col, spec in reference.numeric.items()}
+        self._categorical = {col: _FeatureSketch(len(spec['categories'])) for col, spec in reference.categorical.items()}
+        self._category_index = {col: pd.Index(spec['categories']) for col, spec in reference.categorical.items()}
+
+    def observe(self, df: pd.DataFrame) -> Dict[str, Dict[str, Any]]:
+        """Aktualizuje szkice danymi partii i zwraca raport dryfu dla tej partii (cecha -> statystyki)."""
+        with metrics.timer('spotify_drift_seconds'):
+            sample = None
+            if self.sample_size is not None and len(df) > self.sample_size:
+                # Generator NumPy nie jest bezpieczny wątkowo
+                with self._lock:
+                    sample = self._rng.integers(0, len(df), self.sample_size)
+
+            report: Dict[str, Dict[str, Any]] = {}
+            batches: Dict[str, _FeatureSketch] = {}
+            for col in self._numeric:
+                report[col], batches[col] = self._observe_numeric(col, df[col], sample)
+            for col in self._categorical:
+                report[col], batches[col] = self._observe_categorical(col, df[col], sample)
+
+            sketches = {**self._numeric, **self._categorical}
+            with self._lock:
+                for col, batch in batches.items():
+                    self._accumulate(sketches[col], batch)
+                self.last_report = report
+
+        for col, stats in report.items():
+            metrics.inc('spotify_drift_missing_total', stats['missing'], feature=col)
+            metrics.inc('spotify_drift_unknown_total', stats['unknown'], feature=col)
+            metrics.inc('spotify_drift_out_of_range_total', stats['out_of_range'], feature=col)
+            if stats['psi'] is not None:
+                metrics.set('spotify_drift_psi', stats['psi'], feature=col)
+
+        drifting = [col for col, stats in report.items() if stats['drift']]
+        if drifting:
+            logger.warning(f"Drift detected (PSI > {self.psi_threshold}) in features: {drifting}")
+        return report
+
+    def summary(self) -> Dict[str, Dict[str, Any]]:
+        """Dryf całego strumienia od utworzenia monitora (na skumulowanych szkicach)."""
+        out = {}
+        with self._lock:
+            for kind, sketches, specs in (('numeric', self._numeric, self.reference.numeric),
+                                          ('categorical', self._categorical, self.reference.categorical)):
+                for col, sketch in sketches.items():
+                    out[col] = self._scores(specs[col]['expected'], sketch.counts, sketch, kind == 'numeric')
+        return out
+
+    def _observe_numeric(self, col: str, series: pd.Series,
+                         sample: Optional[np.ndarray]) -> Tuple[Dict[str, Any], _FeatureSketch]:
+        spec = self.reference.numeric[col]
+        values = series.to_numpy(dtype=np.float64, na_value=np.nan)
+        n_bins = len(spec['cuts']) + 1
+
+        batch = _FeatureSketch(n_bins)
+        batch.rows = len(values)
+        batch.missing = int(np.count_nonzero(np.isnan(values)))
+        # Porównania z NaN dają False, więc braki nie są liczone jako wartości spoza zakresu
+        batch.out_of_range = int(np.count_nonzero((values < spec['min']) | (values > spec['max'])))
+
+        binned = values if sample is None else values[sample]
+        binned = binned[~np.isnan(binned)]
+        batch.counts = np.bincount(np.searchsorted(spec['cuts'], binned, side='right'), minlength=n_bins)
+        return self._scores(spec['expected'], batch.counts, batch, ks=True), batch
+
+    def _observe_categorical(self, col: str, series: pd.Series,
+                             sample: Optional[np.ndarray]) -> Tuple[Dict[str, Any], _FeatureSketch]:
+        spec = self.reference.categorical[col]
+        codes = self._category_codes(col, series)
+        is_missing = series.isna().to_numpy()
+        n_bins = len(spec['categories'])
+
+        batch = _FeatureSketch(n_bins)
+        batch.rows = len(codes)
+        batch.missing = int(np.count_nonzero(is_missing))
+        batch.unknown = int(np.count_nonzero((codes < 0) & ~is_missing))
+
+        binned = codes if sample is None else codes[sample]
+        binned_missing = is_missing if sample is None else is_missing[sample]
+        batch.counts = np.bincount(binned[binned >= 0], minlength=n_bins)
+        batch.binned_unknown = int(np.count_nonzero((binned < 0) & ~binned_missing))
+        return self._scores(spec['expected'], batch.counts, batch, ks=False), batch
+
+    def _category_codes(self, col: str, series: pd.Series) -> np.ndarray:
+        """Kody kategorii referencyjnych (-1 dla nieznanych i braków)."""
+        index = self._category_index[col]
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            # Mapujemy tylko (nieliczne) kategorie kolumny, a wiersze przez tablicę przejść
+            lookup = np.append(index.get_indexer(series.cat.categories), -1)
+            return lookup[series.cat.codes.to_numpy()]
+        return index.get_indexer(series.to_numpy(dtype=object))
+
+    def _scores(self, expected: np.ndarray, counts: np.ndarray, sketch: _FeatureSketch, ks: bool) -> Dict[str, Any]:
+        # Nieznane kategorie trafiają do osobnego przedziału, którego w danych referencyjnych nie było
+        observed = np.append(counts, sketch.binned_unknown)
+        total = observed.sum()
+        enough = total >= self.min_rows
+
+        psi_value: Optional[float] = None
+        ks_value: Optional[float] = None
+        if enough:
+            actual = observed / total
+            psi_value = psi(np.append(expected, 0.0), actual)
+            if ks:
+                ks_value = binned_ks(expected, actual[:-1])
+
+        return {
+            'rows': sketch.rows,
+            'missing': sketch.missing,
+            'unknown': sketch.unknown,
+            'out_of_range': sketch.out_of_range,
+            'psi': psi_value,
+            'ks': ks_value,
+            'drift': psi_value is not None and psi_value > self.psi_threshold,
+        }
+
+    @staticmethod
+    def _accumulate(total: _FeatureSketch, batch: _FeatureSketch):
+        total.counts += batch.counts
+        total.rows += batch.rows
+        total.missing += batch.missing
+        total.unknown += batch.unknown
+        total.binned_unknown += batch.binned_unknown
+        total.out_of_range += batch.out_of_range
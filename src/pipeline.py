@@ -0,0 +1,284 @@
+import json
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, Future, wait, FIRST_COMPLETED
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from src.metrics import metrics
+from src.profiling import StageProfiler
+from src.resources import PeakMemorySampler, Stopwatch, peak_rss_mb
+
+logger = logging.getLogger(__name__)
+
+
+class Stage:
+    """
+    Pojedynczy etap pipeline'u.
+
+    Args:
+        name: Unikalna nazwa etapu.
+        func: Funkcja wykonywana w etapie. Dostaje wyniki etapów z `deps` (w tej kolejności).
+        deps: Nazwy etapów, od których zależy ten etap.
+        outputs: Pliki produkowane przez etap. Jeśli istnieją i są nowsze niż wyjścia
+            zależności, etap uznawany jest za aktualny i pomijany.
+        restore: Funkcja odtwarzająca wynik pominiętego etapu (np. wczytanie parquet).
+        main_thread: Czy etap musi być wykonany w głównym wątku (np. rysowanie wykresów).
+    """
+
+    def __init__(self, name: str, func: Callable[..., Any], deps: Sequence[str] = (),
+                 outputs: Sequence[str] = (), restore: Optional[Callable[[], Any]] = None,
+                 main_thread: bool = False):
+        self.name = name
+        self.func = func
+        self.deps = list(deps)
+        self.outputs = list(outputs)
+        self.restore = restore
+        self.main_thread = main_thread
+
+
+class PipelineRunner:
+    """
+    Deklaratywny runner etapów (DAG). Niezależne etapy wykonywane są równolegle
+    w puli wątków, aktualne etapy są pomijane, a po każdym uruchomieniu zapisywany
+    jest raport czasu i szczytowej pamięci dla każdego etapu.
+    """
+
+    def __init__(self, name: str, max_workers: Optional[int] = None, report_dir: str = 'reports',
+                 force: bool = False, profiler: Optional[StageProfiler] = None):
+        self.name = name
+        self.max_workers = max_workers
+        self.report_dir = report_dir
+        self.force = force
+        # W trybie profilowania etapy wykonywane są po kolei w głównym wątku,
+        # aby cProfile i tracemalloc przypisywały koszty do właściwego etapu
+        self.profiler = profiler
+
+        self.stages: Dict[str, Stage] = {}
+        self.report: Dict[str, Any] = {}
+
+        self._results: Dict[str, Any] = {}
+        self._status: Dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    def add_stage(self, name: str, func: Callable[..., Any], deps: Sequence[str] = (), **kwargs) -> Stage:
+        """Rejestruje etap w pipeline. Zależności muszą być zarejestrowane wcześniej."""
+        if name in self.stages:
+            raise ValueError(f"Stage '{name}' is already registered.")
+        missing = [d for d in deps if d not in self.stages]
+        if missing:
+            raise ValueError(f"Stage '{name}' depends on unknown stages: {missing}")
+
+        stage = Stage(name, func, deps, **kwargs)
+        self.stages[name] = stage
+        return stage
+
+    def run(self) -> Dict[str, Any]:
+        """
+        Uruchamia pipeline i zwraca słownik {nazwa_etapu: wynik}.
+        Wyniki pominiętych etapów są odtwarzane leniwie, tylko jeśli są potrzebne.
+        """
+        logger.info(f"Running pipeline '{self.name}' ({len(self.stages)} stages)")
+        self._results.clear()
+        self._status = {name: 'pending' for name in self.stages}
+        stage_reports: Dict[str, Dict[str, Any]] = {}
+
+        self._plan_skips(stage_reports)
+
+        started_at = datetime.now()
+        t0 = time.perf_counter()
+        error: Optional[BaseException] = None
+
+        with PeakMemorySampler() as sampler, ThreadPoolExecutor(max_workers=self.max_workers,
+                                                                thread_name_prefix=self.name) as pool:
+            running: Dict[Future, str] = {}
+
+            while True:
+                if error is None:
+                    ready = [s for name, s in self.stages.items()
+                             if self._status[name] == 'pending'
+                             and all(self._status[d] in ('done', 'skipped') for d in s.deps)]
+                    for stage in ready:
+                        if not self._runs_inline(stage):
+                            self._status[stage.name] = 'running'
+                            running[pool.submit(self._execute, stage, sampler, t0)] = stage.name
+
+                    # Etapy wymagające głównego wątku wykonujemy od razu,
+                    # podczas gdy pozostałe pracują w tle. Status 'running' dostają dopiero przy starcie,
+                    # więc po błędzie nieuruchomione etapy zostają anulowane
+                    inline = [s for s in ready if self._runs_inline(s)]
+                    for stage in inline:
+                        self._status[stage.name] = 'running'
+                        stage_reports[stage.name], error = self._execute(stage, sampler, t0)
+                        if error is not None:
+                            break
+                    if inline:
+                        continue
+
+                if not running:
+                    break
+
+                finished, _ = wait(list(running), return_when=FIRST_COMPLETED)
+                for future in finished:
+                    name = running.pop(future)
+                    stage_reports[name], stage_error = future.result()
+                    if error is None:
+                        error = stage_error
+
+        for name, status in self._status.items():
+            if status == 'pending':
+                self._status[name] = 'cancelled'
+                stage_reports[name] = {'status': 'cancelled'}
+
+        total = time.perf_counter() - t0
+        self._write_report(stage_reports, started_at, total)
+
+        if error is not None:
+            logger.error(f"Pipeline '{self.name}' failed after {total:.2f}s: {error}")
+            raise error
+
+        logger.info(f"Pipeline '{self.name}' finished in {total:.2f}s")
+        return {name: self._result(name) for name in self.stages if self._status[name] == 'done'}
+
+    def result(self, name: str) -> Any:
+        """Zwraca wynik etapu z ostatniego uruchomienia (odtwarzając go, jeśli etap był pominięty)."""
+        return self._result(name)
+
+    def _runs_inline(self, stage: Stage) -> bool:
+        return stage.main_thread or self.profiler is not None
+
+    def _plan_skips(self, stage_reports: Dict[str, Dict[str, Any]]):
+        """
+        Oznacza jako pominięte etapy aktualne (wyjścia istnieją i są nowsze niż wyjścia
+        zależności) oraz etapy, których wyniki potrzebne są wyłącznie etapom aktualnym.
+        """
+        if self.force:
+            return
+
+        dependents: Dict[str, List[str]] = {name: [] for name in self.stages}
+        for stage in self.stages.values():
+            for d in stage.deps:
+                dependents[d].append(stage.name)
+
+        # Rejestracja wymusza kolejność topologiczną, więc wystarczy jeden przebieg w przód...
+        freshness: Dict[str, str] = {}
+        for name, stage in self.stages.items():
+            freshness[name] = self._freshness(stage, freshness, has_dependents=bool(dependents[name]))
+        fresh = {name: state == 'fresh' for name, state in freshness.items()}
+
+        # ...i jeden wstecz, aby ustalić, które nieaktualne etapy są w ogóle potrzebne.
+        # Końcowe etapy zapisujące pliki (np. cache parquet) podążają za swoimi
+        # zależnościami - nie wymuszają ponownego pobrania danych tylko po to, by je zapisać.
+        needed: Dict[str, bool] = {}
+        for name in reversed(list(self.stages)):
+            stage = self.stages[name]
+            if fresh[name]:
+                needed[name] = False
+            elif not dependents[name]:
+                needed[name] = not stage.outputs or not stage.deps
+            else:
+                needed[name] = any(needed[d] for d in dependents[name])
+
+        for name, stage in self.stages.items():
+            if not dependents[name] and stage.outputs and stage.deps:
+                needed[name] = any(needed[d] for d in stage.deps)
+
+        for name, stage in self.stages.items():
+            if not needed[name]:
+                self._status[name] = 'skipped'
+                stage_reports[name] = {'status': 'skipped', 'deps': stage.deps}
+                logger.info(f"[{self.name}] Stage '{name}' is up to date, skipping.")
+
+    def _freshness(self, stage: Stage, freshness: Dict[str, str], has_dependents: bool) -> str:
+        """
+        Zwraca 'fresh' (wynik można odtworzyć z wyjść), 'stale' (wyjścia starsze niż
+        wyjścia zależności) lub 'missing' (brak wyjść albo nie da się ich odtworzyć).
+        """
+        if not stage.outputs or not all(os.path.exists(p) for p in stage.outputs):
+            return 'missing'
+        if stage.restore is None and has_dependents:
+            return 'missing'
+
+        # Zależności bez wyjść traktujemy jako źródła danych (np. pobranie zbioru),
+        # a brakujące wyjścia pośrednie nie unieważniają etapów, które z nich powstały
+        upstream = [self.stages[d] for d in stage.deps if self.stages[d].outputs]
+        if any(freshness[s.name] == 'stale' for s in upstream):
+            return 'stale'
+
+        oldest_output = min(os.path.getmtime(p) for p in stage.outputs)
+        upstream_outputs = [p for s in upstream for p in s.outputs
+                            if p not in stage.outputs and os.path.exists(p)]
+        if any(os.path.getmtime(p) > oldest_output for p in upstream_outputs):
+            return 'stale'
+        return 'fresh'
+
+    def _result(self, name: str) -> Any:
+        with self._lock:
+            if name not in self._results and self._status.get(name) == 'skipped':
+                restore = self.stages[name].restore
+                self._results[name] = restore() if restore is not None else None
+            return self._results.get(name)
+
+    def _execute(self, stage: Stage, sampler: PeakMemorySampler,
+                 t0: float) -> Tuple[Dict[str, Any], Optional[Exception]]:
+        """Wykonuje etap i zwraca jego raport oraz ewentualny wyjątek."""
+        logger.info(f"[{self.name}] Stage '{stage.name}' started")
+        start_offset = time.perf_counter() - t0
+        sampler.open(stage.name)
+        error: Optional[Exception] = None
+        result = None
+
+        with Stopwatch() as sw:
+            try:
+                args = [self._result(d) for d in stage.deps]
+                if self.profiler is None:
+                    result = stage.func(*args)
+                else:
+                    with self.profiler.profile(stage.name):
+                        result = stage.func(*args)
+            except Exception as e:
+                error = e
+
+        status = 'failed' if error is not None else 'done'
+        report = {
+            'status': status,
+            'deps': stage.deps,
+            'start_offset_s': round(start_offset, 4),
+            'seconds': round(sw.elapsed, 4),
+            'peak_rss_mb': round(sampler.close(stage.name), 1),
+            'thread': threading.current_thread().name,
+        }
+
+        with self._lock:
+            self._results[stage.name] = result
+            self._status[stage.name] = status
+
+        metrics.observe('spotify_pipeline_stage_seconds', sw.elapsed, pipeline=self.name, stage=stage.name,
+                        status=status)
+        if error is not None:
+            logger.error(f"[{self.name}] Stage '{stage.name}' failed: {error}")
+        else:
+            logger.info(f"[{self.name}] Stage '{stage.name}' finished in {sw.elapsed:.2f}s")
+        return report, error
+
+    def _write_report(self, stage_reports: Dict[str, Dict[str, Any]], started_at: datetime, total: float):
+        self.report = {
+            'pipeline': self.name,
+            'started_at': started_at.isoformat(timespec='seconds'),
+            'total_seconds': round(total, 4),
+            'process_peak_rss_mb': round(peak_rss_mb(), 1),
+            'stages': {name: stage_reports.get(name, {}) for name in self.stages},
+        }
+
+        os.makedirs(self.report_dir, exist_ok=True)
+        path = os.path.join(self.report_dir, f"{self.name}_{started_at:%Y%m%d_%H%M%S}.json")
+        with open(path, 'w') as f:
+            json.dump(self.report, f, indent=2)
+
+        summary: List[str] = [f"{'stage':<20}{'status':<10}{'seconds':>10}{'peak MB':>10}"]
+        for name, rep in self.report['stages'].items():
+            summary.append(f"{name:<20}{rep.get('status', '?'):<10}"
+                           f"{rep.get('seconds', 0.0):>10.2f}{rep.get('peak_rss_mb', 0.0):>10.1f}")
+        logger.info(f"Pipeline report saved to {path}\n" + "\n".join(summary))
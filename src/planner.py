@@ -0,0 +1,211 @@
+import json
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import xgboost as xgb
+from sklearn.model_selection import train_test_split
+
+from src.evaluation import ModelEvaluator
+from src.metrics import metrics
+from src.resources import Stopwatch
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class TrainingPlan:
+    """
+    Zalecana wielkość zbioru treningowego i liczba rund boostingu.
+
+    Args:
+        data_fraction: Część X_train, na której trenować (1.0 - całość).
+        n_estimators: Liczba rund boostingu.
+        predicted_rmse: RMSE przewidywane przez krzywą uczenia dla zalecanej wielkości danych.
+        reference_rmse: RMSE pełnych danych i pełnej liczby rund (obserwowane lub z krzywej).
+        tolerance: Dopuszczalny względny wzrost RMSE względem reference_rmse.
+        curve: Parametry krzywej uczenia rmse(n) = a + b * n^(-c).
+        grid: Wyniki przebiegów (część danych, wiersze, najlepsze RMSE i krzywa po rundach).
+    """
+    data_fraction: float
+    n_estimators: int
+    predicted_rmse: float
+    reference_rmse: float
+    tolerance: float
+    n_rows: int = 0
+    curve: Dict[str, float] = field(default_factory=dict)
+    grid: List[Dict[str, Any]] = field(default_factory=list)
+
+    def subsample(self, X: np.ndarray, y: np.ndarray, seed: int = 42) -> Tuple[np.ndarray, np.ndarray]:
+        """Deterministyczna próbka `data_fraction` wierszy (X, y)."""
+        if self.data_fraction >= 1.0:
+            return X, y
+        n = max(1, int(round(len(X) * self.data_fraction)))
+        rows = np.sort(np.random.default_rng(seed).choice(len(X), size=n, replace=False))
+        return X[rows], np.asarray(y)[rows]
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+    def save(self, path: str) -> str:
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with open(path, 'w') as f:
+            json.dump(self.to_dict(), f, indent=2)
+        logger.info(f"Training plan saved to {path}")
+        return path
+
+    @classmethod
+    def load(cls, path: str) -> 'TrainingPlan':
+        with open(path) as f:
+            return cls(**json.load(f))
+
+
+class TrainingPlanner:
+    """
+    Planer kosztu treningu: trenuje model na rosnących częściach danych (równolegle), mierzy RMSE
+    na wydzielonym zbiorze walidacyjnym dla kolejnych liczb rund (iteration_range, bez ponownego treningu)
+    i dopasowuje krzywą uczenia rmse(n) = a + b * n^(-c).
+
+    Zalecenie to najmniejsza liczba wierszy, dla której krzywa mieści się w połowie tolerancji względem
+    RMSE pełnych danych, oraz najmniejsza liczba rund mieszcząca się w drugiej połowie tolerancji
+    (krzywa rund z najbliższego przebiegu na co najmniej tylu danych). Dzięki krzywej największa część
+    siatki nie musi obejmować całych danych - RMSE pełnego zbioru jest ekstrapolowane.
+
+    Args:
+        build: Funkcja tworząca model XGBoost (dostaje liczbę wątków), np. src.trainers.build_model.
+        fractions: Części danych treningowych do sprawdzenia.
+        tolerance: Dopuszczalny względny wzrost RMSE (0.01 = 1%).
+        validation_size: Część X_train odkładana na walidację przebiegów.
+        n_checkpoints: Liczba punktów krzywej po rundach.
+        early_stopping_rounds: Zatrzymanie przebiegu, gdy RMSE walidacyjne przestaje spadać (None - bez).
+        n_jobs: Łączna liczba wątków (-1 - wszystkie rdzenie), dzielona między równoległe przebiegi.
+    """
+
+    DEFAULT_FRACTIONS = (0.05, 0.1, 0.2, 0.35, 0.5)
+
+    def __init__(self, build: Callable[[int], xgb.XGBRegressor], fractions: Sequence[float] = DEFAULT_FRACTIONS,
+                 tolerance: float = 0.01, validation_size: float = 0.2, n_checkpoints: int = 30,
+                 early_stopping_rounds: Optional[int] = 50, n_jobs: int = -1, seed: int = 42):
+        if not fractions or not all(0 < f <= 1 for f in fractions):
+            raise ValueError(f"Fractions must be in (0, 1], got {list(fractions)}.")
+        self.build = build
+        self.fractions = sorted(fractions)
+        self.tolerance = tolerance
+        self.validation_size = validation_size
+        self.n_checkpoints = n_checkpoints
+        self.early_stopping_rounds = early_stopping_rounds
+        self.n_jobs = n_jobs
+        self.seed = seed
+        self._evaluator = ModelEvaluator(plot_mode='none')
+
+    def plan(self, X_train: np.ndarray, y_train: np.ndarray) -> TrainingPlan:
+        y_train = np.asarray(y_train)
+        X_fit, X_val, y_fit, y_val = train_test_split(X_train, y_train, test_size=self.validation_size,
+                                                      random_state=self.seed)
+        # Zagnieżdżone próbki: mniejsza część danych jest podzbiorem większej
+        order = np.random.default_rng(self.seed).permutation(len(X_fit))
+
+        total = self.n_jobs if self.n_jobs > 0 else (os.cpu_count() or 1)
+        threads = max(1, total // len(self.fractions))
+        logger.info(f"Planning training budget on {len(self.fractions)} data fractions "
+                    f"({min(total, len(self.fractions))} in parallel x {threads} threads)")
+
+        with metrics.timer('spotify_plan_seconds'), ThreadPoolExecutor(
+                max_workers=max(1, total // threads), thread_name_prefix='planner') as executor:
+            futures = []
+            for fraction in self.fractions:
+                rows = order[:max(1, int(round(len(X_fit) * fraction)))]
+                futures.append(executor.submit(self._run, fraction, X_fit[rows], y_fit[rows], X_val, y_val, threads))
+            grid = [future.result() for future in futures]
+
+        return self._recommend(grid, n_full=len(X_fit), n_train=len(X_train))
+
+    def _run(self, fraction: float, X: np.ndarray, y: np.ndarray, X_val: np.ndarray, y_val: np.ndarray,
+             threads: int) -> Dict[str, Any]:
+        model = self.build(threads)
+        if self.early_stopping_rounds is not None:
+            model.set_params(early_stopping_rounds=self.early_stopping_rounds)
+        with Stopwatch() as sw:
+            model.fit(X, y, eval_set=[(X_val, y_val)], verbose=False)
+
+        total = model.get_booster().num_boosted_rounds()
+        checkpoints = np.unique(np.linspace(1, total, num=min(self.n_checkpoints, total)).astype(int))
+        curve = [{'n_trees': int(n), 'rmse': self._evaluator._calculate_metrics(
+            y_val, model.predict(X_val, iteration_range=(0, int(n))))['rmse']} for n in checkpoints]
+
+        best = min(point['rmse'] for point in curve)
+        logger.info(f"  fraction {fraction:.2f}: {len(X)} rows, {total} rounds, best RMSE {best:.4f} "
+                    f"({sw.elapsed:.1f}s)")
+        return {'fraction': fraction, 'rows': len(X), 'rounds': total, 'fit_seconds': sw.elapsed,
+                'best_rmse': best, 'round_curve': curve}
+
+    def _recommend(self, grid: List[Dict[str, Any]], n_full: int, n_train: int) -> TrainingPlan:
+        rows = np.array([run['rows'] for run in grid], dtype=float)
+        best = np.array([run['best_rmse'] for run in grid])
+        curve = fit_learning_curve(rows, best)
+
+        # Połowa tolerancji na mniejsze dane, połowa na mniej rund
+        half = self.tolerance / 2
+        reference = float(best[-1]) if grid[-1]['fraction'] >= 1.0 else predict_rmse(curve, n_full)
+        reference = min(reference, float(best.min()))
+        n_needed = rows_for_rmse(curve, reference * (1 + half))
+        fraction = float(min(1.0, max(n_needed / n_full, self.fractions[0])))
+        if n_needed > rows[-1] and grid[-1]['fraction'] < 1.0:
+            logger.warning("Learning curve extrapolated beyond the largest sampled fraction; "
+                           "consider adding larger fractions to the grid.")
+
+        # Krzywa rund z najmniejszego przebiegu na co najmniej zalecanej liczbie wierszy (lub największego)
+        source = next((run for run in grid if run['rows'] >= fraction * n_full), grid[-1])
+        limit = source['best_rmse'] * (1 + half)
+        n_trees = next(p['n_trees'] for p in source['round_curve'] if p['rmse'] <= limit)
+        if source['rows'] < fraction * n_full:
+            # Więcej danych zwykle wymaga więcej rund - bez krzywej dla tylu wierszy zostawiamy pełny budżet
+            n_trees = source['rounds']
+
+        plan = TrainingPlan(data_fraction=round(fraction, 4), n_estimators=int(n_trees),
+                            predicted_rmse=predict_rmse(curve, fraction * n_full), reference_rmse=reference,
+                            tolerance=self.tolerance, n_rows=int(round(fraction * n_train)), curve=curve, grid=grid)
+        logger.info(f"Recommended: {plan.data_fraction:.0%} of training data ({plan.n_rows} rows), "
+                    f"{plan.n_estimators} rounds (predicted RMSE {plan.predicted_rmse:.4f}, "
+                    f"reference {plan.reference_rmse:.4f})")
+        return plan
+
+
+def fit_learning_curve(n_rows: np.ndarray, rmse: np.ndarray) -> Dict[str, float]:
+    """
+    Dopasowuje rmse(n) = a + b * n^(-c). Dla siatki asymptot `a` poniżej najmniejszego RMSE
+    log(rmse - a) jest liniowe względem log(n); wybierana jest asymptota o najmniejszym błędzie.
+    Przy jednym punkcie lub RMSE rosnącym z danymi zwracana jest krzywa płaska.
+    """
+    n_rows, rmse = np.asarray(n_rows, dtype=float), np.asarray(rmse, dtype=float)
+    flat = {'a': float(rmse.min()), 'b': 0.0, 'c': 1.0}
+    if len(n_rows) < 2 or rmse[np.argmax(n_rows)] >= rmse[np.argmin(n_rows)]:
+        return flat
+
+    best, best_error = flat, np.inf
+    for a in np.linspace(0, rmse.min(), num=200, endpoint=False):
+        slope, intercept = np.polyfit(np.log(n_rows), np.log(rmse - a), 1)
+        if slope >= 0:
+            continue
+        candidate = {'a': float(a), 'b': float(np.exp(intercept)), 'c': float(-slope)}
+        error = float(np.sum((predict_rmse(candidate, n_rows) - rmse) ** 2))
+        if error < best_error:
+            best, best_error = candidate, error
+    return best
+
+
+def predict_rmse(curve: Dict[str, float], n_rows: Any) -> Any:
+    result = curve['a'] + curve['b'] * np.power(np.asarray(n_rows, dtype=float), -curve['c'])
+    return float(result) if np.ndim(result) == 0 else result
+
+
+def rows_for_rmse(curve: Dict[str, float], target: float) -> float:
+    """Najmniejsza liczba wierszy, dla której krzywa osiąga `target` (inf, jeśli poniżej asymptoty)."""
+    if curve['b'] == 0:
+        return 1.0 if target >= curve['a'] else float('inf')
+    if target <= curve['a']:
+        return float('inf')
+    return float((curve['b'] / (target - curve['a'])) ** (1 / curve['c']))
@@ -1,25 +1,100 @@
 import logging
 import os.path
 import argparse
+import re
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Optional, Tuple
 
+import numpy as np
 import pandas as pd
 from src.serializers import ModelSerializer
+from src.metrics import metrics
+from src.monitoring import DriftMonitor
+from src.synthetic import sample_songs
 
 
 logger = logging.getLogger(__name__)
 
 
+@dataclass
+class _ModelState:
+    """Komplet artefaktów jednej wersji modelu. Podmieniany w całości jednym przypisaniem."""
+    version: str
+    model: Any
+    preprocessor: Any
+    checksums: Tuple[Optional[str], Optional[str]]
+    monitor: Optional[DriftMonitor] = None
+    explainer: Any = None
+    similarity: Any = None
+
+
 class SpotifyPredictor:
     """
     Klasa wrapper służąca do wykonywania predykcji na nowych danych.
+
+    Predyktor może obserwować katalog artefaktów i bez restartu procesu przejść na nową wersję modelu
+    (`watch_interval` lub `start_watching()`). Nowa para `spotify-xgb-model_<wersja>.joblib` +
+    `spotify-preprocessor_<wersja>.joblib` jest brana pod uwagę dopiero wtedy, gdy obie mają pliki
+    `.sha256` (są w pełni zapisane), a model nie jest starszy od preprocessora. Para jest weryfikowana
+    sumą kontrolną, wczytywana i rozgrzewana w tle, a następnie podmieniana atomowo. Partie, które już
+    trwają, kończą się na poprzednim modelu.
+
+    Args:
+        monitor_drift: Jeśli True, predict_batch() sprawdza każdą partię monitorem dryfu
+            (statystyki referencyjne z treningu); raport ostatniej partii jest w `last_drift_report`.
+        watch_interval: Co ile sekund sprawdzać katalog artefaktów (None - bez obserwacji).
     """
 
-    def __init__(self, model_path: str, preprocessor_path: str):
+    MODEL_PATTERN = re.compile(r'^spotify-xgb-model_(?P<version>.+)\.joblib$')
+    PREPROCESSOR_TEMPLATE = 'spotify-preprocessor_{version}.joblib'
+    SIMILARITY_TEMPLATE = 'spotify-similar-tracks_{version}.joblib'
+    # Warianty modelu tej samej wersji (spotify-xgb-model_<wersja>.<wariant>.joblib) dzielą preprocessor i indeks
+    VARIANT_SUFFIX = re.compile(r'\.(fast|sharded)$')
+    WARMUP_ROWS = 32
+
+    def __init__(self, model_path: str, preprocessor_path: str, base_dir: str = 'models',
+                 monitor_drift: bool = False, watch_interval: Optional[float] = None):
+
+        self.serializer = ModelSerializer(base_dir=base_dir)
+        self.monitor_drift = monitor_drift
+
+        match = self.MODEL_PATTERN.match(os.path.basename(model_path))
+        self._state = self._load_state(match.group('version') if match else model_path,
+                                       model_path, preprocessor_path)
+        metrics.set('spotify_model_info', 1, version=self._state.version)
+
+        self._rejected: set = set()
+        self._swap_lock = threading.Lock()
+        self._stop_watching = threading.Event()
+        self._watcher: Optional[threading.Thread] = None
+        if watch_interval is not None:
+            self.start_watching(watch_interval)
+
+    @property
+    def version(self) -> str:
+        return self._state.version
+
+    @property
+    def model(self) -> Any:
+        return self._state.model
 
-        self.serializer = ModelSerializer()
-        self.model = self.serializer.load(model_path)
-        self.preprocessor = self.serializer.load(preprocessor_path)
+    @property
+    def preprocessor(self) -> Any:
+        return self._state.preprocessor
 
+    @property
+    def monitor(self) -> Optional[DriftMonitor]:
+        return self._state.monitor
+
+    @property
+    def last_drift_report(self) -> Optional[dict]:
+        # Zapisywany przez monitor pod jego blokadą - predict_batch() może być wołane z wielu wątków
+        monitor = self._state.monitor
+        return monitor.last_report if monitor is not None else None
+
+    @metrics.timer('spotify_predict_seconds', mode='single')
     def predict(self, song_data: dict) -> float:
         """
         Przyjmuje słownik z danymi piosenki i zwraca przewidywaną popularność (0-100).
@@ -28,10 +103,172 @@ class SpotifyPredictor:
         # Przygotowanie DataFrame
         df = pd.DataFrame([song_data])
 
+        # Jedna wersja modelu na całe wywołanie, nawet jeśli w trakcie nastąpi podmiana
+        state = self._state
+
         # Preprocessing-przygotowanie zbioru danych
-        X = self.preprocessor.transform_new_data(df)
+        X = state.preprocessor.transform_new_data(df)
 
         # Predykcja
-        prediction = self.model.predict(X)
+        prediction = state.model.predict(X)
+        metrics.inc('spotify_predictions_total', 1, mode='single')
 
         return float(prediction[0])
+
+    def predict_batch(self, songs: pd.DataFrame | list[dict]) -> np.ndarray:
+        """
+        Przyjmuje wiele utworów naraz (DataFrame lub listę słowników) i zwraca wektor predykcji.
+        Jeden przebieg preprocessora i modelu dla całej partii jest wielokrotnie szybszy niż predict() w pętli.
+        """
+        df = songs if isinstance(songs, pd.DataFrame) else pd.DataFrame(songs)
+        state = self._state
+
+        with metrics.timer('spotify_predict_seconds', mode='batch'):
+            X = state.preprocessor.transform_new_data(df)
+            predictions = np.asarray(state.model.predict(X), dtype=float)
+        metrics.inc('spotify_predictions_total', len(df), mode='batch')
+
+        if state.monitor is not None:
+            state.monitor.observe(df)
+
+        return predictions
+
+    def explain(self, songs: pd.DataFrame | list[dict], top_k: int = 5) -> pd.DataFrame:
+        """
+        Zwraca predykcje wraz z `top_k` najważniejszymi polami i ich wkładem (TreeSHAP XGBoost).
+        """
+        state = self._state
+        if state.explainer is None:
+            from src.explainers import PredictionExplainer
+            state.explainer = PredictionExplainer(state.model, state.preprocessor)
+        return state.explainer.explain(songs, top_k=top_k)
+
+    def similar_tracks(self, songs: pd.DataFrame | list[dict], k: int = 10) -> pd.DataFrame:
+        """
+        Zwraca `k` najbardziej podobnych utworów ze zbioru treningowego dla każdego utworu partii
+        (kolumny query, rank, distance, metadane sąsiada i jego znana popularność).
+        Indeks `spotify-similar-tracks_<wersja>.joblib` wczytywany jest przy pierwszym użyciu.
+        """
+        df = songs if isinstance(songs, pd.DataFrame) else pd.DataFrame(songs)
+        state = self._state
+        if state.similarity is None:
+            version = self.VARIANT_SUFFIX.sub('', state.version)
+            state.similarity = self.serializer.load(self.SIMILARITY_TEMPLATE.format(version=version))
+        return state.similarity.neighbours(state.preprocessor.transform_new_data(df), k=k)
+
+    def check_for_update(self) -> bool:
+        """
+        Jednorazowo sprawdza katalog artefaktów i, jeśli jest nowa kompletna para, podmienia model.
+        Zwraca True, jeśli nastąpiła podmiana.
+        """
+        candidate = self._find_candidate()
+        if candidate is None:
+            return False
+        version, model_file, preprocessor_file, checksums = candidate
+
+        with self._swap_lock:
+            if checksums == self._state.checksums:
+                return False
+            start = time.perf_counter()
+            try:
+                if not (self.serializer.verify(model_file) and self.serializer.verify(preprocessor_file)):
+                    raise ValueError("checksum verification failed")
+                state = self._load_state(version, model_file, preprocessor_file)
+                self._warm_up(state)
+            except Exception as e:
+                # Uszkodzona para nie jest ponawiana, dopóki nie pojawią się nowe pliki
+                logger.error(f"Nie udało się wczytać modelu w wersji {version}: {e}")
+                self._rejected.add(checksums)
+                metrics.inc('spotify_model_swaps_total', 1, status='failed')
+                return False
+
+            previous, self._state = self._state, state
+            elapsed = time.perf_counter() - start
+
+        metrics.observe('spotify_model_swap_seconds', elapsed)
+        metrics.inc('spotify_model_swaps_total', 1, status='done')
+        metrics.set('spotify_model_info', 0, version=previous.version)
+        metrics.set('spotify_model_info', 1, version=state.version)
+        logger.info(f"Podmieniono model: {previous.version} -> {state.version} ({elapsed:.2f}s)")
+        return True
+
+    def start_watching(self, interval: float = 5.0):
+        """Uruchamia wątek tła sprawdzający katalog artefaktów co `interval` sekund."""
+        if self._watcher is not None:
+            return
+        self._stop_watching.clear()
+        self._watcher = threading.Thread(target=self._watch, args=(interval,), name='model-watcher', daemon=True)
+        self._watcher.start()
+
+    def stop_watching(self):
+        self._stop_watching.set()
+        if self._watcher is not None:
+            self._watcher.join()
+            self._watcher = None
+
+    def _watch(self, interval: float):
+        while not self._stop_watching.wait(interval):
+            try:
+                self.check_for_update()
+            except Exception as e:
+                logger.error(f"Błąd obserwacji katalogu modeli: {e}")
+
+    def _find_candidate(self) -> Optional[Tuple[str, str, str, Tuple[str, str]]]:
+        """Najnowsza kompletna para artefaktów różna od bieżącej (wersja, pliki, sumy kontrolne)."""
+        base_dir = self.serializer.base_dir
+        # Tylko ten sam wariant co bieżący model - predyktor `.fast` nie może przejść na pełny model
+        variant = self._variant(self._state.version)
+        best, best_mtime = None, -1.0
+        for name in os.listdir(base_dir):
+            match = self.MODEL_PATTERN.match(name)
+            if match is None or self._variant(match.group('version')) != variant:
+                continue
+            version = match.group('version')
+            base_version = self.VARIANT_SUFFIX.sub('', version)
+            preprocessor_file = self.PREPROCESSOR_TEMPLATE.format(version=base_version)
+            checksums = (self.serializer.stored_checksum(name), self.serializer.stored_checksum(preprocessor_file))
+            if None in checksums or checksums in self._rejected:
+                continue
+            try:
+                model_mtime = os.path.getmtime(self.serializer.checksum_path(name))
+                preprocessor_mtime = os.path.getmtime(self.serializer.checksum_path(preprocessor_file))
+            except OSError:
+                continue
+            # Model zapisywany jest po preprocessorze - starszy model to para w trakcie ponownego treningu
+            if model_mtime >= preprocessor_mtime and model_mtime > best_mtime:
+                best, best_mtime = (version, name, preprocessor_file, checksums), model_mtime
+
+        if best is None or best[3] == self._state.checksums:
+            return None
+        return best
+
+    @classmethod
+    def _variant(cls, version: str) -> str:
+        """Sufiks wariantu wersji ('v2.fast' -> '.fast', 'v2' -> '')."""
+        match = cls.VARIANT_SUFFIX.search(version)
+        return match.group(0) if match else ''
+
+    def _load_state(self, version: str, model_file: str, preprocessor_file: str) -> _ModelState:
+        preprocessor = self.serializer.load(preprocessor_file)
+        state = _ModelState(
+            version=version,
+            model=self.serializer.load(model_file),
+            preprocessor=preprocessor,
+            checksums=(self.serializer.stored_checksum(model_file),
+                       self.serializer.stored_checksum(preprocessor_file)),
+        )
+        if self.monitor_drift:
+            reference = getattr(preprocessor, 'reference_profile', None)
+            if reference is None:
+                logger.warning("Preprocessor has no reference statistics (trained before drift monitoring), "
+                               "drift monitoring disabled.")
+            else:
+                state.monitor = DriftMonitor(reference)
+        return state
+
+    def _warm_up(self, state: _ModelState):
+        """Pierwsze predykcje nowego modelu (alokacje, cache) wykonywane przed podmianą, nie na ruchu."""
+        batch = pd.DataFrame(sample_songs(self.WARMUP_ROWS))
+        predictions = state.model.predict(state.preprocessor.transform_new_data(batch))
+        if not np.all(np.isfinite(predictions)):
+            raise ValueError("warm-up predictions are not finite")
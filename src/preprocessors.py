@@ -10,6 +10,9 @@ from sklearn.compose import ColumnTransformer
 from sklearn.pipeline import Pipeline
 from sklearn.impute import SimpleImputer
 
+from src.metrics import metrics
+from src.monitoring import ReferenceProfile
+
 
 logger = logging.getLogger(__name__)
 
@@ -41,6 +44,7 @@ class SpotifyPipelinePreprocessor(DataPreprocessor):
 
         self.pipeline: Optional[ColumnTransformer] = None
         self.feature_names: List[str] = []
+        self.reference_profile: Optional[ReferenceProfile] = None
 
     def process(self, df: pd.DataFrame) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
         logger.info("Starting data preprocessing pipeline...")
@@ -89,10 +93,17 @@ class SpotifyPipelinePreprocessor(DataPreprocessor):
 
         # Uczenie i transformacja danych
         logger.info("Fitting transformers on X_train...")
-        X_train_processed = self.pipeline.fit_transform(X_train)
+        with metrics.timer('spotify_preprocess_seconds', phase='fit'):
+            X_train_processed = self.pipeline.fit_transform(X_train)
+        metrics.inc('spotify_preprocess_rows_total', len(X_train), phase='fit')
+
+        # Statystyki referencyjne dla monitora dryfu (DriftMonitor) zapisywane razem z preprocessorem
+        self.reference_profile = ReferenceProfile.from_frame(X_train, numeric_features, categorical_features)
 
         logger.info("Transforming X_test...")
-        X_test_processed = self.pipeline.transform(X_test)
+        with metrics.timer('spotify_preprocess_seconds', phase='transform'):
+            X_test_processed = self.pipeline.transform(X_test)
+        metrics.inc('spotify_preprocess_rows_total', len(X_test), phase='transform')
 
         # Wyciągnięcie nazw kolumn po transformacji
         try:
@@ -119,7 +130,45 @@ class SpotifyPipelinePreprocessor(DataPreprocessor):
             raise ValueError("Pipeline nie został wytrenowany! Uruchom najpierw process() na danych treningowych.")
 
         # Zwraca tylko X (macierz cech), bo dla nowych danych nie ma y (targetu)
-        return self.pipeline.transform(df)
+        with metrics.timer('spotify_preprocess_seconds', phase='transform_new'):
+            X = self.pipeline.transform(df)
+        metrics.inc('spotify_preprocess_rows_total', len(df), phase='transform_new')
+        return X
+
+    def get_source_columns(self) -> List[str]:
+        """
+        Zwraca, dla każdej kolumny po transformacji, nazwę oryginalnej kolumny wejściowej
+        (np. wszystkie kolumny One-Hot 'track_genre_*' -> 'track_genre').
+        """
+        if self.pipeline is None:
+            raise ValueError("Pipeline nie został wytrenowany! Uruchom najpierw process() na danych treningowych.")
+
+        sources: List[Optional[str]] = [None] * len(self.get_feature_names())
+        for name, transformer, columns in self.pipeline.transformers_:
+            if name not in self.pipeline.output_indices_ or transformer == 'drop':
+                continue
+            if name == 'cat':
+                encoder = transformer.named_steps['onehot']
+                out = [col for col, cats in zip(columns, encoder.categories_) for _ in cats]
+            else:
+                out = list(columns)
+            sources[self.pipeline.output_indices_[name]] = out
+        return sources
+
+    def get_categories(self, X: np.ndarray, column: str = 'track_genre') -> np.ndarray:
+        """
+        Odtwarza oryginalną kategorię (np. gatunek) z zakodowanych kolumn One-Hot macierzy X.
+        Wiersze z nieznaną kategorią (same zera) dostają wartość None.
+        """
+        prefix = f"{column}_"
+        indices = [i for i, name in enumerate(self.get_feature_names()) if name.startswith(prefix)]
+        if not indices:
+            raise ValueError(f"No one-hot columns found for '{column}'.")
+
+        block = X[:, indices]
+        labels = np.array([self.feature_names[i][len(prefix):] for i in indices] + [None], dtype=object)
+        codes = np.where(block.max(axis=1) > 0, block.argmax(axis=1), len(indices))
+        return labels[codes]
 
     def _extract_feature_names(self) -> List[str]:
         """Metoda pomocnicza do wyciągania nazw z ColumnTransformera."""
@@ -0,0 +1,193 @@
+import cProfile
+import io
+import json
+import logging
+import os
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+PROFILE_MODES = ('cprofile', 'sampling')
+
+
+class _StackSampler:
+    """
+    Próbkujący profiler: co `interval` sekund zapisuje stos wywołań wskazanego wątku.
+    Wynik to słownik {stos: liczba próbek} gotowy do zapisu w formacie "folded" (flamegraph.pl, speedscope).
+    """
+
+    def __init__(self, thread_id: int, interval: float = 0.005):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name='stack-sampler', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            self.stacks[';'.join(reversed(stack))] += 1
+
+
+class StageProfiler:
+    """
+    Profiluje etapy pipeline'u: cProfile lub próbkowanie stosów oraz migawki tracemalloc.
+
+    Dla każdego etapu zapisuje w `output_dir`:
+        - `<etap>.prof` (tryb cprofile) - czytelny dla snakeviz, flameprof, gprof2dot,
+        - `<etap>.folded` (tryb sampling) - format dla flamegraph.pl / speedscope,
+        - `<etap>.alloc.txt` - miejsca alokacji pamięci (różnica migawek tracemalloc).
+    Na końcu `write_summary()` zapisuje zestawienie top-N funkcji i alokacji (summary.txt / summary.json).
+    """
+
+    def __init__(self, output_dir: str = 'reports/profile', mode: str = 'cprofile', top_n: int = 25,
+                 sample_interval: float = 0.005, trace_frames: int = 10):
+        if mode not in PROFILE_MODES:
+            raise ValueError(f"Unknown profile mode '{mode}'. Expected one of {PROFILE_MODES}.")
+        self.output_dir = output_dir
+        self.mode = mode
+        self.top_n = top_n
+        self.sample_interval = sample_interval
+        self.trace_frames = trace_frames
+
+        self.summary: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        os.makedirs(self.output_dir, exist_ok=True)
+
+    @contextmanager
+    def profile(self, name: str) -> Iterator[None]:
+        """Profiluje blok kodu jako etap o podanej nazwie."""
+        started_tracing = not tracemalloc.is_tracing()
+        if started_tracing:
+            tracemalloc.start(self.trace_frames)
+        tracemalloc.reset_peak()
+        before = tracemalloc.take_snapshot()
+
+        profiler: Optional[cProfile.Profile] = None
+        sampler: Optional[_StackSampler] = None
+        if self.mode == 'cprofile':
+            profiler = cProfile.Profile()
+            profiler.enable()
+        else:
+            sampler = _StackSampler(threading.get_ident(), self.sample_interval)
+            sampler.start()
+
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            if profiler is not None:
+                profiler.disable()
+            if sampler is not None:
+                sampler.stop()
+
+            _, traced_peak = tracemalloc.get_traced_memory()
+            after = tracemalloc.take_snapshot()
+            if started_tracing:
+                tracemalloc.stop()
+
+            entry = {
+                'seconds': elapsed,
+                'traced_peak_mb': traced_peak / 1024 ** 2,
+                'hot_functions': self._save_cprofile(name, profiler) if profiler else self._save_folded(name, sampler),
+                'allocations': self._save_allocations(name, before, after),
+            }
+            with self._lock:
+                self.summary[name] = entry
+            logger.info(f"Profiled '{name}' in {elapsed:.2f}s (traced peak {entry['traced_peak_mb']:.1f} MB)")
+
+    def write_summary(self) -> str:
+        """Zapisuje zestawienie najgorętszych funkcji i miejsc alokacji dla wszystkich etapów."""
+        with open(os.path.join(self.output_dir, 'summary.json'), 'w') as f:
+            json.dump(self.summary, f, indent=2)
+
+        lines: List[str] = []
+        for name, entry in self.summary.items():
+            lines.append(f"=== {name}: {entry['seconds']:.2f}s, traced peak {entry['traced_peak_mb']:.1f} MB ===")
+            lines.append(f"Top {self.top_n} hot functions ({self.mode}):")
+            for fn in entry['hot_functions']:
+                lines.append(f"  {fn['self_s']:>10.4f}s self {fn['total_s']:>10.4f}s total  {fn['function']}")
+            lines.append(f"Top {self.top_n} allocation sites:")
+            for alloc in entry['allocations']:
+                lines.append(f"  {alloc['size_kb']:>12.1f} KB {alloc['count']:>9} blocks  {alloc['site']}")
+            lines.append('')
+
+        path = os.path.join(self.output_dir, 'summary.txt')
+        with open(path, 'w') as f:
+            f.write('\n'.join(lines))
+        logger.info(f"Profile summary saved to {path}")
+        return path
+
+    def _save_cprofile(self, name: str, profiler: cProfile.Profile) -> List[Dict[str, Any]]:
+        profiler.dump_stats(os.path.join(self.output_dir, f'{name}.prof'))
+
+        stats = pstats.Stats(profiler, stream=io.StringIO())
+        rows = []
+        for (filename, lineno, func), (_, ncalls, tottime, cumtime, _) in stats.stats.items():
+            rows.append({
+                'function': f"{func} ({os.path.basename(filename)}:{lineno})",
+                'calls': ncalls,
+                'self_s': tottime,
+                'total_s': cumtime,
+            })
+        rows.sort(key=lambda r: r['self_s'], reverse=True)
+        return rows[:self.top_n]
+
+    def _save_folded(self, name: str, sampler: _StackSampler) -> List[Dict[str, Any]]:
+        with open(os.path.join(self.output_dir, f'{name}.folded'), 'w') as f:
+            for stack, count in sampler.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+        # Czas "self" to próbki, w których funkcja była na szczycie stosu, "total" - gdziekolwiek w stosie
+        self_samples: Counter = Counter()
+        total_samples: Counter = Counter()
+        for stack, count in sampler.stacks.items():
+            frames = stack.split(';')
+            self_samples[frames[-1]] += count
+            for frame in set(frames):
+                total_samples[frame] += count
+
+        return [{
+            'function': frame,
+            'calls': None,
+            'self_s': count * self.sample_interval,
+            'total_s': total_samples[frame] * self.sample_interval,
+        } for frame, count in self_samples.most_common(self.top_n)]
+
+    def _save_allocations(self, name: str, before: tracemalloc.Snapshot,
+                          after: tracemalloc.Snapshot) -> List[Dict[str, Any]]:
+        diff = after.compare_to(before, 'lineno')
+
+        with open(os.path.join(self.output_dir, f'{name}.alloc.txt'), 'w') as f:
+            for stat in diff[:self.top_n * 4]:
+                f.write(f"{stat}\n")
+
+        return [{
+            'site': str(stat.traceback[0]),
+            'size_kb': stat.size_diff / 1024,
+            'count': stat.count_diff,
+        } for stat in diff[:self.top_n]]
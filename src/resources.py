@@ -0,0 +1,126 @@
+import logging
+import os
+import resource
+import sys
+import threading
+import time
+from typing import Any, Callable, Dict, Optional, Sequence
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+def current_rss_mb() -> float:
+    """
+    Zwraca bieżące zużycie pamięci procesu (RSS) w MB.
+    Na Linuxie czyta /proc/self/statm, w pozostałych systemach używa ru_maxrss.
+    """
+    try:
+        with open('/proc/self/statm') as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf('SC_PAGE_SIZE') / 1024 ** 2
+    except (OSError, ValueError, IndexError):
+        return peak_rss_mb()
+
+
+def peak_rss_mb() -> float:
+    """Zwraca szczytowe zużycie pamięci procesu (RSS) od jego startu, w MB."""
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOS raportuje bajty, Linux kilobajty
+    divisor = 1024 ** 2 if sys.platform == 'darwin' else 1024
+    return max_rss / divisor
+
+
+class PeakMemorySampler:
+    """
+    Próbkuje RSS procesu w wątku tła i śledzi szczyt pamięci dla wielu
+    równoległych "okien" pomiarowych (np. etapów pipeline'u).
+    """
+
+    def __init__(self, interval: float = 0.05):
+        self.interval = interval
+        self._windows: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> 'PeakMemorySampler':
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='rss-sampler', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def open(self, key: str):
+        """Rozpoczyna okno pomiarowe o podanej nazwie."""
+        with self._lock:
+            self._windows[key] = current_rss_mb()
+
+    def close(self, key: str) -> float:
+        """Kończy okno pomiarowe i zwraca szczytowy RSS (MB) zaobserwowany w jego trakcie."""
+        rss = current_rss_mb()
+        with self._lock:
+            return max(self._windows.pop(key, rss), rss)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            rss = current_rss_mb()
+            with self._lock:
+                for key, peak in self._windows.items():
+                    if rss > peak:
+                        self._windows[key] = rss
+
+    def __enter__(self) -> 'PeakMemorySampler':
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+
+class Stopwatch:
+    """Prosty pomiar czasu ściennego z użyciem zegara monotonicznego."""
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.elapsed: float = 0.0
+
+    def __enter__(self) -> 'Stopwatch':
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.elapsed = time.perf_counter() - self.start
+
+
+def latency_percentiles(latencies_s: Sequence[float]) -> Dict[str, float]:
+    """Zamienia listę czasów (w sekundach) na percentyle w milisekundach."""
+    arr = np.asarray(latencies_s, dtype=float) * 1000
+    return {
+        'p50_ms': float(np.percentile(arr, 50)),
+        'p95_ms': float(np.percentile(arr, 95)),
+        'p99_ms': float(np.percentile(arr, 99)),
+        'max_ms': float(arr.max()),
+        'mean_ms': float(arr.mean()),
+    }
+
+
+def batch_latency(predict: Callable[[Any], Any], batch: Any, repeats: int = 20) -> Dict[str, float]:
+    """Percentyle latencji wielokrotnej predykcji tej samej partii (po jednej rozgrzewce) i przepustowość."""
+    predict(batch)  # rozgrzewka
+
+    latencies = []
+    for _ in range(repeats):
+        with Stopwatch() as sw:
+            predict(batch)
+        latencies.append(sw.elapsed)
+
+    stats = latency_percentiles(latencies)
+    stats['batch_size'] = len(batch)
+    stats['rows_per_s'] = len(batch) * len(latencies) / sum(latencies)
+    return stats
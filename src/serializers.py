@@ -1,14 +1,33 @@
 import os
+import hashlib
 import joblib
 import logging
-from typing import Any
+import uuid
+from typing import Any, Optional
+
+from src.metrics import metrics
 
 logger = logging.getLogger(__name__)
 
 
+CHECKSUM_SUFFIX = '.sha256'
+
+
+def file_sha256(path: str) -> str:
+    """Suma SHA-256 pliku liczona strumieniowo."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        while block := f.read(4 * 1024 ** 2):
+            digest.update(block)
+    return digest.hexdigest()
+
+
 class ModelSerializer:
     """
     Klasa odpowiedzialna za zapisywanie i odczytywanie artefaktów (modeli, preprocessorów).
+
+    Zapis jest atomowy (plik tymczasowy + os.replace), a po nim powstaje plik `<nazwa>.sha256`
+    z sumą kontrolną. Jego obecność oznacza, że artefakt został w pełni zapisany.
     """
 
     def __init__(self, base_dir: str = 'models'):
@@ -31,12 +50,23 @@ class ModelSerializer:
             Ścieżka do zapisanego pliku.
         """
         file_path = os.path.join(self.base_dir, filename)
+        # Unikalna nazwa per zapis - ten sam plik mogą zapisywać równolegle różne wątki i procesy
+        tmp_path = f"{file_path}.tmp-{uuid.uuid4().hex}"
         try:
-            joblib.dump(obj, file_path)
+            with metrics.timer('spotify_serializer_seconds', op='save'):
+                joblib.dump(obj, tmp_path)
+                checksum = file_sha256(tmp_path)
+                # Stara suma kontrolna znika przed podmianą pliku, nowa pojawia się dopiero po niej
+                self._remove_checksum(filename)
+                os.replace(tmp_path, file_path)
+                self._write_checksum(filename, checksum)
+            metrics.inc('spotify_serializer_bytes_total', os.path.getsize(file_path), op='save')
             logger.info(f"Zapisano pomyślnie: {file_path}")
             return file_path
         except Exception as e:
             logger.error(f"Błąd podczas zapisywania {filename}: {e}")
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
             raise
 
     def load(self, filename: str) -> Any:
@@ -50,9 +80,45 @@ class ModelSerializer:
             raise FileNotFoundError(error_msg)
 
         try:
-            obj = joblib.load(file_path)
+            with metrics.timer('spotify_serializer_seconds', op='load'):
+                obj = joblib.load(file_path)
+            metrics.inc('spotify_serializer_bytes_total', os.path.getsize(file_path), op='load')
             logger.info(f"Wczytano pomyślnie: {file_path}")
             return obj
         except Exception as e:
             logger.error(f"Błąd podczas wczytywania {filename}: {e}")
             raise
+
+    def checksum_path(self, filename: str) -> str:
+        return os.path.join(self.base_dir, filename + CHECKSUM_SUFFIX)
+
+    def stored_checksum(self, filename: str) -> Optional[str]:
+        """Suma zapisana obok artefaktu lub None, jeśli artefakt nie został (jeszcze) w pełni zapisany."""
+        try:
+            with open(self.checksum_path(filename)) as f:
+                return f.read().split()[0]
+        except (OSError, IndexError):
+            return None
+
+    def verify(self, filename: str) -> bool:
+        """Sprawdza, czy artefakt jest w pełni zapisany i zgodny ze swoją sumą kontrolną."""
+        expected = self.stored_checksum(filename)
+        file_path = os.path.join(self.base_dir, filename)
+        if expected is None or not os.path.exists(file_path):
+            return False
+        actual = file_sha256(file_path)
+        if actual != expected:
+            logger.warning(f"Suma kontrolna niezgodna dla {file_path}: {actual} != {expected}")
+            return False
+        return True
+
+    def _write_checksum(self, filename: str, checksum: str):
+        path = self.checksum_path(filename)
+        tmp_path = f"{path}.tmp-{uuid.uuid4().hex}"
+        with open(tmp_path, 'w') as f:
+            f.write(f"{checksum}  {filename}\n")
+        os.replace(tmp_path, path)
+
+    def _remove_checksum(self, filename: str):
+        if os.path.exists(self.checksum_path(filename)):
+            os.remove(self.checksum_path(filename))
@@ -0,0 +1,57 @@
+import json
+import logging
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+
+def serve_predictions(predictor: Any, port: int = 8000, host: str = '127.0.0.1') -> ThreadingHTTPServer:
+    """
+    Minimalny endpoint HTTP predykcji w tle: POST /predict z obiektem utworu lub listą utworów (JSON)
+    zwraca {"predictions": [...]}. Na potrzeby testów obciążenia i lokalnej integracji.
+    """
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+        # Nagłówki i treść idą osobnymi zapisami - bez tego Nagle + opóźnione ACK dodają ~40 ms
+        disable_nagle_algorithm = True
+
+        def do_POST(self):
+            if self.path != '/predict':
+                return self._reply(404, {'error': 'not found'})
+            try:
+                songs = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))))
+                songs = [songs] if isinstance(songs, dict) else songs
+                predictions = predictor.predict_batch(pd.DataFrame(songs))
+            except Exception as e:
+                return self._reply(400, {'error': str(e)})
+            self._reply(200, {'predictions': [float(p) for p in predictions]})
+
+        def _reply(self, status: int, body: Dict[str, Any]):
+            data = json.dumps(body, default=json_default).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, format, *args):
+            logger.debug(format % args)
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name='predict-http', daemon=True).start()
+    logger.info(f"Serving predictions on http://{host}:{server.server_port}/predict")
+    return server
+
+
+def json_default(value: Any) -> Any:
+    """Argument `default` dla json.dumps: skalary NumPy (np. z DataFrame.to_dict) jako typy Pythona."""
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
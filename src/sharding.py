@@ -0,0 +1,170 @@
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import xgboost as xgb
+from sklearn.cluster import KMeans
+
+from src.metrics import metrics
+from src.resources import Stopwatch
+from src.trainers import ModelTrainer
+
+logger = logging.getLogger(__name__)
+
+
+class GenreShardedRegressor:
+    """
+    Zespół mniejszych modeli XGBoost, po jednym na gatunek lub klaster gatunków, z modelem globalnym
+    dla gatunków rzadkich i nieznanych.
+
+    Gatunek wiersza odczytywany jest z kolumn One-Hot macierzy preprocessora, więc model działa
+    jak zwykły regresor (`fit(X, y)`, `predict(X)`) - również w SpotifyPredictor i ModelTrainer.
+    Predykcja partii grupuje wiersze po shardzie (jedno sortowanie) i wywołuje każdy model raz
+    dla wszystkich jego wierszy. Modele shardów trenowane są równolegle, każdy na `threads_per_shard` wątkach.
+
+    Args:
+        genres: Nazwy gatunków w kolejności kolumn One-Hot.
+        genre_columns: Indeksy kolumn One-Hot gatunku w macierzy cech.
+        shard_by: 'genre' (model na gatunek) lub 'cluster' (model na klaster gatunków o podobnym profilu).
+        n_clusters: Liczba klastrów gatunków (dla shard_by='cluster').
+        min_rows: Minimalna liczba wierszy treningowych gatunku, by dostał własny shard.
+        shard_params: Parametry XGBRegressor modeli shardów.
+        global_params: Parametry XGBRegressor modelu globalnego (domyślnie jak shard_params).
+        n_jobs: Łączna liczba wątków treningu (-1 - wszystkie rdzenie).
+        threads_per_shard: Liczba wątków jednego modelu.
+    """
+
+    DEFAULT_SHARD_PARAMS = {'n_estimators': 200, 'max_depth': 6, 'learning_rate': 0.1, 'subsample': 0.8,
+                            'colsample_bytree': 0.7, 'objective': 'reg:squarederror'}
+    SHARD_BY = ('genre', 'cluster')
+
+    def __init__(self, genres: List[str], genre_columns: List[int], shard_by: str = 'cluster', n_clusters: int = 16,
+                 min_rows: int = 1000, shard_params: Optional[Dict[str, Any]] = None,
+                 global_params: Optional[Dict[str, Any]] = None, n_jobs: int = -1, threads_per_shard: int = 1,
+                 random_state: int = 42):
+        if shard_by not in self.SHARD_BY:
+            raise ValueError(f"Unsupported shard_by: {shard_by} (expected one of {self.SHARD_BY})")
+        if len(genres) != len(genre_columns):
+            raise ValueError(f"Got {len(genres)} genres for {len(genre_columns)} one-hot columns.")
+        self.genres = list(genres)
+        self.genre_columns = np.asarray(genre_columns)
+        self.shard_by = shard_by
+        self.n_clusters = n_clusters
+        self.min_rows = min_rows
+        self.shard_params = shard_params or self.DEFAULT_SHARD_PARAMS
+        self.global_params = global_params or self.shard_params
+        self.n_jobs = n_jobs
+        self.threads_per_shard = threads_per_shard
+        self.random_state = random_state
+
+        # Shard dla każdego kodu gatunku; ostatnia pozycja (nieznany gatunek) i rzadkie gatunki -> model globalny
+        self.shard_of_genre: Optional[np.ndarray] = None
+        self.models: List[Any] = []
+        self.shards: List[Dict[str, Any]] = []
+
+    @classmethod
+    def from_preprocessor(cls, preprocessor, column: str = 'track_genre', **kwargs) -> 'GenreShardedRegressor':
+        """Tworzy model na podstawie nazw cech wytrenowanego preprocessora."""
+        prefix = f"{column}_"
+        names = list(preprocessor.get_feature_names())
+        columns = [i for i, name in enumerate(names) if name.startswith(prefix)]
+        if not columns:
+            raise ValueError(f"No one-hot columns found for '{column}'.")
+        return cls([names[i][len(prefix):] for i in columns], columns, **kwargs)
+
+    @property
+    def global_shard(self) -> int:
+        return len(self.models) - 1
+
+    def fit(self, X: np.ndarray, y: np.ndarray) -> 'GenreShardedRegressor':
+        y = np.asarray(y)
+        codes = self._genre_codes(X)
+        counts = np.bincount(codes, minlength=len(self.genres) + 1)[:len(self.genres)]
+        eligible = np.flatnonzero(counts >= self.min_rows)
+
+        if self.shard_by == 'cluster' and len(eligible) > self.n_clusters:
+            labels = self._cluster_genres(X, y, codes, eligible)
+        else:
+            labels = np.arange(len(eligible))
+        n_shards = int(labels.max()) + 1 if len(labels) else 0
+
+        self.shard_of_genre = np.full(len(self.genres) + 1, n_shards)
+        self.shard_of_genre[eligible] = labels
+        shard = self.shard_of_genre[codes]
+
+        # Model globalny uczony jest na wszystkich wierszach, shardy - na wierszach swoich gatunków
+        tasks = [np.flatnonzero(shard == s) for s in range(n_shards)] + [np.arange(len(y))]
+        threads = max(1, min(self.threads_per_shard, self._total_threads()))
+        workers = max(1, self._total_threads() // threads)
+        logger.info(f"Training {n_shards} genre shards + global model ({len(self.genres) - len(eligible)} "
+                    f"rare genres routed to global), {workers} in parallel x {threads} threads")
+
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='genre-shard') as executor:
+            futures = [executor.submit(self._fit_shard, s == n_shards, X[rows], y[rows], threads)
+                       for s, rows in enumerate(tasks)]
+            results = [future.result() for future in futures]
+
+        self.models = [model for model, _ in results]
+        self.shards = [{
+            'shard': s,
+            'genres': 'global' if s == n_shards else [self.genres[g] for g in np.flatnonzero(
+                self.shard_of_genre[:-1] == s)],
+            'rows': len(rows),
+            'fit_seconds': seconds,
+        } for s, (rows, (_, seconds)) in enumerate(zip(tasks, results))]
+        return self
+
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        shard = self.route(X)
+        predictions = np.empty(len(X), dtype=np.float32)
+
+        # Grupowanie wierszy po shardzie: jedno stabilne sortowanie i jedno wywołanie modelu na grupę
+        order = np.argsort(shard, kind='stable')
+        bounds = np.flatnonzero(np.diff(shard[order])) + 1
+        for rows in np.split(order, bounds):
+            if len(rows):
+                predictions[rows] = self.models[shard[rows[0]]].predict(X[rows])
+                metrics.inc('spotify_shard_predictions_total', len(rows),
+                            shard='global' if shard[rows[0]] == self.global_shard else 'genre')
+        return predictions
+
+    def route(self, X: np.ndarray) -> np.ndarray:
+        """Numer shardu dla każdego wiersza X (`global_shard` - model globalny)."""
+        if self.shard_of_genre is None:
+            raise ValueError("Model is not fitted. Run fit() first.")
+        return self.shard_of_genre[self._genre_codes(X)]
+
+    def get_params(self) -> Dict[str, Any]:
+        """Konfiguracja zespołu (dla manifestu przebiegu)."""
+        return {'shard_by': self.shard_by, 'n_clusters': self.n_clusters, 'min_rows': self.min_rows,
+                'n_shards': max(len(self.models) - 1, 0), 'n_jobs': self.n_jobs,
+                'threads_per_shard': self.threads_per_shard, 'random_state': self.random_state,
+                **{f'shard_{k}': v for k, v in self.shard_params.items()}}
+
+    def _genre_codes(self, X: np.ndarray) -> np.ndarray:
+        """Kod gatunku każdego wiersza; wiersze bez aktywnej kolumny One-Hot dostają len(genres)."""
+        block = X[:, self.genre_columns]
+        return np.where(block.max(axis=1) > 0, block.argmax(axis=1), len(self.genres))
+
+    def _cluster_genres(self, X: np.ndarray, y: np.ndarray, codes: np.ndarray, eligible: np.ndarray) -> np.ndarray:
+        """Grupuje gatunki po średnich cechach numerycznych i średniej popularności (profil gatunku)."""
+        numeric = np.delete(X, self.genre_columns, axis=1)
+        counts = np.bincount(codes, minlength=len(self.genres) + 1)[eligible]
+        sums = np.column_stack([np.bincount(codes, weights=numeric[:, j], minlength=len(self.genres) + 1)
+                                for j in range(numeric.shape[1])] +
+                               [np.bincount(codes, weights=y, minlength=len(self.genres) + 1)])
+        profiles = sums[eligible] / counts[:, None]
+        profiles = (profiles - profiles.mean(axis=0)) / (profiles.std(axis=0) + 1e-12)
+        return KMeans(n_clusters=self.n_clusters, n_init=10, random_state=self.random_state).fit_predict(profiles)
+
+    def _fit_shard(self, is_global: bool, X: np.ndarray, y: np.ndarray, threads: int):
+        params = self.global_params if is_global else self.shard_params
+        model = xgb.XGBRegressor(**{**params, 'n_jobs': threads, 'random_state': self.random_state})
+        with Stopwatch() as sw:
+            ModelTrainer().train(model, X, y)
+        return model, sw.elapsed
+
+    def _total_threads(self) -> int:
+        return self.n_jobs if self.n_jobs > 0 else (os.cpu_count() or 1)
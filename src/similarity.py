@@ -0,0 +1,202 @@
+import logging
+from typing import Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from sklearn.model_selection import train_test_split
+from sklearn.cluster import MiniBatchKMeans
+from sklearn.neighbors import KDTree
+
+from src.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# Kolumny identyfikujące utwór w wynikach (jeśli są dostępne w surowych danych)
+METADATA_COLUMNS = ['track_id', 'track_name', 'artists']
+
+
+class SimilarTracksIndex:
+    """
+    Indeks najbliższych sąsiadów w przestrzeni cech preprocessora.
+
+    Domyślnie indeksowane są tylko przeskalowane cechy numeryczne (audio), a gatunek sąsiada jest
+    zwracany w wynikach. Dostępne metody:
+        - 'ivf' (przybliżona, domyślna): punkty dzielone są k-średnimi na ~sqrt(N) list; zapytanie
+          przeszukuje tylko `n_probe` list o najbliższych centroidach. Zapytania partii grupowane są
+          po listach, więc odległości liczone są mnożeniem macierzy, a nie w pętli po wierszach,
+        - 'kdtree' (dokładna): KD-tree sklearn; przy kilkunastu słabo skorelowanych wymiarach
+          przegląda jednak dużą część punktów.
+
+    Args:
+        method: 'ivf' lub 'kdtree'.
+        n_lists: Liczba list IVF (domyślnie sqrt(N)).
+        n_probe: Liczba przeszukiwanych list IVF na zapytanie (więcej = lepsza trafność, wolniej);
+            gdy te listy mają razem mniej niż `k` punktów, przeszukiwane są kolejne najbliższe listy.
+        leaf_size: Rozmiar liścia KD-tree.
+        include_genre: Czy indeksować również kolumny One-Hot (gatunek wpływa wtedy na odległość).
+    """
+
+    METHODS = ('ivf', 'kdtree')
+
+    def __init__(self, method: str = 'ivf', n_lists: Optional[int] = None, n_probe: int = 16,
+                 leaf_size: int = 40, include_genre: bool = False, seed: int = 42):
+        if method not in self.METHODS:
+            raise ValueError(f"Unsupported method: {method} (expected one of {self.METHODS})")
+        self.method = method
+        self.n_lists = n_lists
+        self.n_probe = n_probe
+        self.leaf_size = leaf_size
+        self.include_genre = include_genre
+        self.seed = seed
+
+        self.columns: Optional[np.ndarray] = None
+        self.popularity: Optional[np.ndarray] = None
+        self.metadata: Optional[pd.DataFrame] = None
+        self.tree: Optional[KDTree] = None
+        # IVF: centroidy, punkty posortowane po listach (float32), granice list i pierwotne pozycje punktów
+        self.centroids: Optional[np.ndarray] = None
+        self.points: Optional[np.ndarray] = None
+        self.offsets: Optional[np.ndarray] = None
+        self.order: Optional[np.ndarray] = None
+        self.point_norms: Optional[np.ndarray] = None
+
+    def build(self, preprocessor, X: np.ndarray, popularity: np.ndarray,
+              metadata: Optional[pd.DataFrame] = None) -> 'SimilarTracksIndex':
+        """
+        Buduje indeks z macierzy cech (np. X_train z preprocessor.process()).
+
+        Args:
+            popularity: Znana popularność utworów (wiersze X).
+            metadata: Opcjonalne kolumny identyfikujące utwory (np. track_id, track_name), w kolejności wierszy X.
+        """
+        if metadata is not None and len(metadata) != len(X):
+            raise ValueError(f"Metadata has {len(metadata)} rows, feature matrix has {len(X)}.")
+
+        output = preprocessor.pipeline.output_indices_
+        names = ['num', 'cat'] if self.include_genre else ['num']
+        self.columns = np.concatenate([np.arange(output[name].start, output[name].stop) for name in names])
+
+        with metrics.timer('spotify_similarity_seconds', op='build', method=self.method):
+            if self.method == 'kdtree':
+                self.tree = KDTree(np.ascontiguousarray(X[:, self.columns], dtype=np.float64),
+                                   leaf_size=self.leaf_size)
+            else:
+                self._build_ivf(np.ascontiguousarray(X[:, self.columns], dtype=np.float32))
+
+        info = pd.DataFrame({'track_genre': preprocessor.get_categories(X)})
+        if metadata is not None:
+            info = pd.concat([metadata.reset_index(drop=True), info], axis=1)
+        self.metadata = info
+        self.popularity = np.asarray(popularity)
+        logger.info(f"Similar-tracks index ({self.method}) built: {len(X)} tracks, {len(self.columns)} dimensions")
+        return self
+
+    def query(self, X: np.ndarray, k: int = 10) -> Tuple[np.ndarray, np.ndarray]:
+        """Odległości i indeksy `k` najbliższych znanych utworów dla każdego wiersza X (posortowane rosnąco)."""
+        if self.popularity is None:
+            raise ValueError("Index is empty. Run build() first.")
+        k = min(k, len(self.popularity))
+        with metrics.timer('spotify_similarity_seconds', op='query', method=self.method):
+            if self.method == 'kdtree':
+                distances, indices = self.tree.query(np.ascontiguousarray(X[:, self.columns], dtype=np.float64), k=k)
+            else:
+                distances, indices = self._query_ivf(np.ascontiguousarray(X[:, self.columns], dtype=np.float32), k)
+        metrics.inc('spotify_similarity_queries_total', len(X))
+        return distances, indices
+
+    def neighbours(self, X: np.ndarray, k: int = 10) -> pd.DataFrame:
+        """
+        Sąsiedzi w formacie długim: po `k` wierszy na zapytanie
+        (query, rank, distance, popularity i kolumny metadanych).
+        """
+        distances, indices = self.query(X, k)
+        flat = indices.ravel()
+        result = self.metadata.iloc[flat].reset_index(drop=True)
+        result.insert(0, 'query', np.repeat(np.arange(len(X)), indices.shape[1]))
+        result.insert(1, 'rank', np.tile(np.arange(1, indices.shape[1] + 1), len(X)))
+        result.insert(2, 'distance', distances.ravel())
+        result['popularity'] = self.popularity[flat]
+        return result
+
+    @property
+    def dimensions(self) -> int:
+        return 0 if self.columns is None else len(self.columns)
+
+    def _build_ivf(self, A: np.ndarray):
+        n_lists = max(1, min(self.n_lists or int(np.sqrt(len(A))), len(A)))
+        kmeans = MiniBatchKMeans(n_clusters=n_lists, n_init=1, max_iter=20, batch_size=4096,
+                                 random_state=self.seed).fit(A)
+        self.centroids = kmeans.cluster_centers_.astype(np.float32)
+
+        labels = _squared_distances(A, self.centroids).argmin(axis=1)
+        self.order = np.argsort(labels, kind='stable')
+        self.points = A[self.order]
+        self.offsets = np.searchsorted(labels[self.order], np.arange(n_lists + 1))
+        self.point_norms = (self.points ** 2).sum(axis=1)
+
+    def _query_ivf(self, Q: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        n, n_lists = len(Q), len(self.centroids)
+        # Listy od najbliższego centroidu; jeśli n_probe list ma razem mniej niż k punktów,
+        # zapytanie przeszukuje kolejne listy, aż kandydatów będzie co najmniej k
+        ranked = np.argsort(_squared_distances(Q, self.centroids), axis=1)
+        covered = np.cumsum(np.diff(self.offsets)[ranked], axis=1)
+        n_probe = np.maximum(min(self.n_probe, n_lists), (covered < k).sum(axis=1) + 1)
+        probed = np.arange(n_lists)[None, :] < np.minimum(n_probe, n_lists)[:, None]
+
+        # Odległości bez składnika |q|^2 (stały dla zapytania, nie zmienia kolejności) - dodawany na końcu
+        best_d = np.full((n, k), np.inf, dtype=np.float32)
+        best_i = np.zeros((n, k), dtype=np.int64)
+
+        # Pary (zapytanie, lista) grupowane po liście: jedno mnożenie macierzy na listę
+        lists = ranked[probed]
+        queries = np.nonzero(probed)[0]
+        grouping = np.argsort(lists, kind='stable')
+        lists, queries = lists[grouping], queries[grouping]
+        bounds = np.flatnonzero(np.diff(lists)) + 1
+
+        for rows, lst in zip(np.split(queries, bounds), lists[np.r_[0, bounds]]):
+            start, stop = self.offsets[lst], self.offsets[lst + 1]
+            if start == stop:
+                continue
+            d = self.point_norms[start:stop][None, :] - 2 * Q[rows] @ self.points[start:stop].T
+            cand_d = np.concatenate([best_d[rows], d], axis=1)
+            cand_i = np.concatenate([best_i[rows], np.broadcast_to(np.arange(start, stop), d.shape)], axis=1)
+            keep = np.argpartition(cand_d, k - 1, axis=1)[:, :k]
+            best_d[rows] = np.take_along_axis(cand_d, keep, axis=1)
+            best_i[rows] = np.take_along_axis(cand_i, keep, axis=1)
+
+        ranking = best_d.argsort(axis=1)
+        best_d = np.take_along_axis(best_d, ranking, axis=1) + (Q ** 2).sum(axis=1)[:, None]
+        indices = self.order[np.take_along_axis(best_i, ranking, axis=1)]
+        return np.sqrt(np.clip(best_d, 0, None)).astype(np.float64), indices
+
+
+def _squared_distances(A: np.ndarray, B: np.ndarray) -> np.ndarray:
+    return (A ** 2).sum(axis=1)[:, None] - 2 * A @ B.T + (B ** 2).sum(axis=1)[None, :]
+
+
+def training_metadata(raw: pd.DataFrame, clean: pd.DataFrame, preprocessor) -> Optional[pd.DataFrame]:
+    """
+    Metadane utworów (METADATA_COLUMNS) w kolejności wierszy X_train z preprocessor.process(clean).
+
+    Cleaner zachowuje etykiety wierszy surowych danych, a train_test_split z tym samym ziarnem
+    i liczbą wierszy zawsze wybiera te same pozycje - podział odtwarzamy więc na samych etykietach.
+    """
+    columns = [col for col in METADATA_COLUMNS if col in raw.columns]
+    if not columns:
+        return None
+    train_labels, _ = train_test_split(clean.index.to_numpy(), test_size=preprocessor.test_size,
+                                       random_state=preprocessor.random_state)
+    return raw.loc[train_labels, columns].reset_index(drop=True)
+
+
+def brute_force_neighbours(index: SimilarTracksIndex, X_index: np.ndarray, X: np.ndarray,
+                           k: int = 10) -> np.ndarray:
+    """Referencyjne wyszukiwanie przez pełną macierz odległości (do porównania z indeksem w benchmarku)."""
+    A = X_index[:, index.columns]
+    squared = _squared_distances(X[:, index.columns], A)
+    k = min(k, len(A))
+    candidates = np.argpartition(squared, k - 1, axis=1)[:, :k]
+    order = np.take_along_axis(squared, candidates, axis=1).argsort(axis=1)
+    return np.take_along_axis(candidates, order, axis=1)
+
@@ -0,0 +1,190 @@
+import json
+import logging
+import queue
+import threading
+import time
+from typing import Any, BinaryIO, Dict, Iterator, List, Optional
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from src.metrics import metrics
+from src.serving import json_default
+
+logger = logging.getLogger(__name__)
+
+STREAM_FORMATS = ('jsonl', 'arrow')
+PREDICTION_FIELD = 'predicted_popularity'
+ERROR_FIELD = 'error'
+
+# Znacznik końca strumienia w kolejce czytnika
+_EOF = object()
+
+
+class StreamScorer:
+    """
+    Strumieniowa predykcja w jednym, stale rozgrzanym procesie: czyta utwory z wejścia (JSON Lines
+    lub strumień Arrow IPC), przewiduje partiami i zapisuje wyniki na wyjście, gdy tylko są gotowe.
+
+    Przepływ jest ograniczony w obu kierunkach: czytnik JSON Lines działa w osobnym wątku, ale kolejka
+    między nim a predykcją ma stały rozmiar, a zapis na wyjście blokuje - wolny odbiorca zatrzymuje więc
+    czytanie wejścia i proces nie buforuje całego strumienia w pamięci. Niepełna partia jest wysyłana
+    po `max_wait` sekundach bez nowych danych, żeby rzadki strumień nie czekał na zapełnienie partii.
+
+    Args:
+        predictor: SpotifyPredictor (lub obiekt z metodą predict_batch).
+        batch_size: Maksymalna liczba utworów w partii.
+        max_wait: Maksymalny czas oczekiwania na dopełnienie partii (sekundy).
+        id_column: Jeśli podana, na wyjście trafia tylko ta kolumna i predykcja (zamiast całego rekordu).
+        prefetch: Liczba partii, które czytnik może wyprzedzić predykcję.
+    """
+
+    def __init__(self, predictor: Any, batch_size: int = 1000, max_wait: float = 0.05,
+                 id_column: Optional[str] = None, prefetch: int = 2):
+        self.predictor = predictor
+        self.batch_size = batch_size
+        self.max_wait = max_wait
+        self.id_column = id_column
+        self.prefetch = prefetch
+
+    def score(self, source: BinaryIO, sink: BinaryIO, fmt: str = 'jsonl') -> int:
+        """Przetwarza cały strumień i zwraca liczbę zapisanych rekordów."""
+        if fmt not in STREAM_FORMATS:
+            raise ValueError(f"Unsupported stream format: {fmt} (expected one of {STREAM_FORMATS})")
+        return self.score_jsonl(source, sink) if fmt == 'jsonl' else self.score_arrow(source, sink)
+
+    def score_jsonl(self, source: BinaryIO, sink: BinaryIO) -> int:
+        """
+        JSON Lines: jeden utwór (obiekt JSON) na linię. Każdy rekord wyjściowy to rekord wejściowy
+        z polem `predicted_popularity`; linia, której nie da się odczytać lub przewidzieć, daje rekord
+        z polami `error` i `line`, a strumień jest przetwarzany dalej.
+        """
+        written = 0
+        for batch in self._line_batches(source):
+            records, errors = [], []
+            for number, line in batch:
+                try:
+                    record = json.loads(line)
+                    if not isinstance(record, dict):
+                        raise ValueError("expected a JSON object")
+                    records.append((number, record))
+                except ValueError as e:
+                    errors.append((number, str(e)))
+
+            output: Dict[int, Dict[str, Any]] = {n: {ERROR_FIELD: msg, 'line': n} for n, msg in errors}
+            if records:
+                output.update(self._predict_records(records))
+
+            sink.write(''.join(json.dumps(output[n], default=json_default) + '\n'
+                               for n, _ in batch).encode('utf-8'))
+            sink.flush()
+            written += len(batch)
+            # Błędy parsowania i rekordy odrzucone przez predyktor (rekordy błędów mają tylko pola error i line)
+            failed = sum(record.keys() == {ERROR_FIELD, 'line'} for record in output.values())
+            self._count(len(batch) - failed, failed, 'jsonl')
+        return written
+
+    def score_arrow(self, source: BinaryIO, sink: BinaryIO) -> int:
+        """
+        Strumień Arrow IPC: wynikowe partie mają schemat wejścia (lub id_column) z kolumnami
+        `predicted_popularity` i `error`. Wiersz, którego nie da się przewidzieć, ma pustą predykcję
+        i komunikat w `error` (pusty dla poprawnych wierszy), a strumień jest przetwarzany dalej.
+        """
+        reader = pa.ipc.open_stream(source)
+        writer = None
+        written = 0
+        try:
+            for incoming in reader:
+                for start in range(0, incoming.num_rows, self.batch_size):
+                    batch = incoming.slice(start, self.batch_size)
+                    predictions, errors = self._predict_frame(batch.to_pandas())
+                    columns = [batch.column(self.id_column)] if self.id_column else list(batch.columns)
+                    names = [self.id_column] if self.id_column else list(batch.schema.names)
+                    result = pa.RecordBatch.from_arrays(
+                        columns + [pa.array(predictions, type=pa.float64(), from_pandas=True),
+                                   pa.array(errors, type=pa.string())],
+                        names=names + [PREDICTION_FIELD, ERROR_FIELD])
+                    if writer is None:
+                        writer = pa.ipc.new_stream(sink, result.schema)
+                    writer.write_batch(result)
+                    sink.flush()
+                    written += result.num_rows
+                    failed = sum(error is not None for error in errors)
+                    self._count(result.num_rows - failed, failed, 'arrow')
+        finally:
+            if writer is not None:
+                writer.close()
+        return written
+
+    def _predict_records(self, records: List[tuple]) -> Dict[int, Dict[str, Any]]:
+        numbers = [n for n, _ in records]
+        rows = [r for _, r in records]
+        try:
+            predictions = self.predictor.predict_batch(pd.DataFrame(rows))
+        except Exception as e:
+            # Błąd całej partii (np. brak kolumny w jednym rekordzie) - ustalamy, które rekordy go powodują
+            if len(records) == 1:
+                return {numbers[0]: {ERROR_FIELD: str(e), 'line': numbers[0]}}
+            middle = len(records) // 2
+            return {**self._predict_records(records[:middle]), **self._predict_records(records[middle:])}
+
+        output = {}
+        for number, record, prediction in zip(numbers, rows, predictions):
+            base = {self.id_column: record.get(self.id_column)} if self.id_column else record
+            output[number] = {**base, PREDICTION_FIELD: float(prediction)}
+        return output
+
+    def _predict_frame(self, df: pd.DataFrame) -> tuple:
+        """Predykcje partii (NaN dla odrzuconych wierszy) i komunikaty błędów (None dla poprawnych)."""
+        try:
+            return np.asarray(self.predictor.predict_batch(df), dtype=float), [None] * len(df)
+        except Exception as e:
+            # Jak w JSON Lines: dzielimy partię, żeby odrzucić tylko wiersze powodujące błąd
+            if len(df) == 1:
+                return np.array([np.nan]), [str(e)]
+            middle = len(df) // 2
+            left, right = self._predict_frame(df.iloc[:middle]), self._predict_frame(df.iloc[middle:])
+            return np.concatenate([left[0], right[0]]), left[1] + right[1]
+
+    def _line_batches(self, source: BinaryIO) -> Iterator[List[tuple]]:
+        """Partie (numer linii, treść) z wątku czytnika; partia kończy się po batch_size liniach lub max_wait."""
+        lines: queue.Queue = queue.Queue(maxsize=self.batch_size * self.prefetch)
+        reader = threading.Thread(target=self._read_lines, args=(source, lines), name='stream-reader', daemon=True)
+        reader.start()
+
+        finished = False
+        while not finished:
+            item = lines.get()
+            if item is _EOF:
+                break
+            batch = [item]
+            deadline = time.monotonic() + self.max_wait
+            while len(batch) < self.batch_size:
+                try:
+                    item = lines.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                if item is _EOF:
+                    finished = True
+                    break
+                batch.append(item)
+            yield batch
+
+        reader.join()
+
+    @staticmethod
+    def _read_lines(source: BinaryIO, lines: queue.Queue):
+        try:
+            for number, line in enumerate(source, start=1):
+                if line.strip():
+                    lines.put((number, line))
+        finally:
+            lines.put(_EOF)
+
+    @staticmethod
+    def _count(ok: int, failed: int, fmt: str):
+        if ok:
+            metrics.inc('spotify_stream_records_total', ok, format=fmt, status='ok')
+        if failed:
+            metrics.inc('spotify_stream_records_total', failed, format=fmt, status='error')
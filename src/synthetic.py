@@ -0,0 +1,153 @@
+import logging
+import os
+from pathlib import Path
+from typing import List
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from src.cleaners import SpotifyDataCleaner
+
+logger = logging.getLogger(__name__)
+
+# Kolejność kolumn zgodna ze schematem z tests/conftest.py
+SPOTIFY_COLUMNS = [
+    'track_id', 'artists', 'album_name', 'track_name', 'track_genre', 'popularity', 'explicit',
+    'duration_ms', 'time_signature', 'key', 'mode', 'danceability', 'energy', 'loudness',
+    'speechiness', 'acousticness', 'instrumentalness', 'liveness', 'valence', 'tempo',
+]
+
+
+def genre_names(n_genres: int = 114) -> List[str]:
+    """Zwraca listę nazw gatunków (liczba zbliżona do prawdziwego zbioru)."""
+    base = ['pop', 'rock', 'jazz', 'classical', 'hip-hop', 'edm', 'metal', 'folk', 'latin', 'k-pop']
+    return base[:n_genres] + [f'genre_{i:03d}' for i in range(max(0, n_genres - len(base)))]
+
+
+def make_synthetic_tracks(n_rows: int, seed: int = 42, n_genres: int = 114, duplicate_frac: float = 0.02,
+                          missing_frac: float = 0.0005, id_offset: int = 0) -> pd.DataFrame:
+    """
+    Generuje surowe dane w kształcie zbioru Spotify (te same kolumny i typy co w conftest.py).
+
+    Popularność zależy od gatunku i kilku cech audio, więc model ma czego się uczyć.
+    Część wierszy to duplikaty track_id, a część ma brakujące metadane - tak jak w prawdziwym zbiorze.
+    """
+    rng = np.random.default_rng(seed)
+    genres = np.array(genre_names(n_genres))
+
+    ids = np.arange(id_offset, id_offset + n_rows)
+    # Duplikaty: część wierszy wskazuje na wcześniejszy track_id
+    n_dup = int(n_rows * duplicate_frac)
+    if n_dup:
+        dup_idx = rng.choice(n_rows, size=n_dup, replace=False)
+        ids[dup_idx] = rng.integers(id_offset, id_offset + n_rows, size=n_dup)
+    track_ids = np.char.add('track_', ids.astype(str))
+
+    genre_idx = rng.integers(0, len(genres), size=n_rows)
+    # Bazowa popularność gatunku nie zależy od ziarna, więc kolejne kawałki CSV są spójne
+    genre_base = np.random.default_rng(len(genres)).uniform(10, 70, size=len(genres))
+
+    danceability = rng.beta(5, 3, n_rows)
+    energy = rng.beta(4, 2, n_rows)
+    loudness = np.clip(rng.normal(-8.0, 4.0, n_rows), -50.0, 4.0)
+    valence = rng.uniform(0.0, 1.0, n_rows)
+    acousticness = rng.beta(1, 3, n_rows)
+    explicit = rng.random(n_rows) < 0.08
+
+    popularity = (genre_base[genre_idx] + 10 * danceability + 0.8 * loudness - 5 * acousticness
+                  + 4 * explicit + rng.normal(0, 10, n_rows))
+
+    df = pd.DataFrame({
+        'track_id': track_ids.astype(object),
+        'artists': np.char.add('Artist ', (ids % 50_000).astype(str)).astype(object),
+        'album_name': np.char.add('Album ', (ids % 80_000).astype(str)).astype(object),
+        'track_name': np.char.add('Track ', ids.astype(str)).astype(object),
+        'track_genre': genres[genre_idx],
+        'popularity': np.clip(popularity, 0, 100).round().astype(np.int64),
+        'explicit': explicit,
+        'duration_ms': rng.gamma(9.0, 25_000.0, n_rows).astype(np.int64) + 30_000,
+        'time_signature': rng.choice([3, 4, 5, 1], size=n_rows, p=[0.08, 0.89, 0.02, 0.01]),
+        'key': rng.integers(0, 12, size=n_rows),
+        'mode': rng.integers(0, 2, size=n_rows),
+        'danceability': danceability,
+        'energy': energy,
+        'loudness': loudness,
+        'speechiness': rng.beta(1, 12, n_rows),
+        'acousticness': acousticness,
+        'instrumentalness': rng.beta(0.3, 2, n_rows),
+        'liveness': rng.beta(2, 8, n_rows),
+        'valence': valence,
+        'tempo': rng.normal(120.0, 28.0, n_rows).clip(30.0, 240.0),
+    }, columns=SPOTIFY_COLUMNS)
+
+    n_missing = int(n_rows * missing_frac)
+    if n_missing:
+        missing_idx = rng.choice(n_rows, size=n_missing, replace=False)
+        df.loc[missing_idx, ['artists', 'album_name', 'track_name']] = np.nan
+
+    return df
+
+
+def write_synthetic_csv(path: str | Path, n_rows: int, seed: int = 42, chunk_size: int = 1_000_000,
+                        n_genres: int = 114) -> Path:
+    """
+    Zapisuje syntetyczny zbiór do CSV w kawałkach, aby nie trzymać w pamięci całych 10M wierszy.
+    Format pliku odpowiada oryginalnemu dataset.csv (z kolumną indeksu 'Unnamed: 0').
+    """
+    path = Path(path)
+    os.makedirs(path.parent, exist_ok=True)
+
+    logger.info(f"Writing {n_rows} synthetic rows to {path}")
+    written = 0
+    chunk_no = 0
+    while written < n_rows:
+        size = min(chunk_size, n_rows - written)
+        chunk = make_synthetic_tracks(size, seed=seed + chunk_no, n_genres=n_genres, id_offset=written)
+        chunk.index = pd.RangeIndex(written, written + size)
+        chunk.to_csv(path, mode='w' if chunk_no == 0 else 'a', header=chunk_no == 0)
+        written += size
+        chunk_no += 1
+
+    return path
+
+
+def write_synthetic_parquet(path: str | Path, n_rows: int, seed: int = 42, chunk_size: int = 1_000_000,
+                            n_genres: int = 114) -> Path:
+    """
+    Zapisuje czyszczony syntetyczny zbiór (wyjście SpotifyDataCleaner) do jednego pliku Parquet
+    w kawałkach - jedna grupa wierszy na kawałek, bez trzymania całego zbioru w pamięci.
+    """
+    path = Path(path)
+    os.makedirs(path.parent, exist_ok=True)
+
+    logger.info(f"Writing {n_rows} cleaned synthetic rows to {path}")
+    writer = None
+    written = 0
+    chunk_no = 0
+    try:
+        while written < n_rows:
+            size = min(chunk_size, n_rows - written)
+            chunk = SpotifyDataCleaner().clean(
+                make_synthetic_tracks(size, seed=seed + chunk_no, n_genres=n_genres, id_offset=written))
+            # Gatunek jako zwykły tekst - słowniki kategorii różnią się między kawałkami
+            chunk['track_genre'] = chunk['track_genre'].astype(str)
+            table = pa.Table.from_pandas(chunk, preserve_index=False)
+            if writer is None:
+                writer = pq.ParquetWriter(path, table.schema)
+            writer.write_table(table.cast(writer.schema))
+            written += size
+            chunk_no += 1
+    finally:
+        if writer is not None:
+            writer.close()
+
+    return path
+
+
+def sample_songs(n: int, seed: int = 0, n_genres: int = 114) -> List[dict]:
+    """Zwraca listę słowników w formacie SAMPLE_SONG z inference.py (wejście SpotifyPredictor.predict)."""
+    df = make_synthetic_tracks(n, seed=seed, n_genres=n_genres, duplicate_frac=0.0,
+                               missing_frac=0.0)
+    return df.drop(columns=['popularity']).to_dict(orient='records')
@@ -1,12 +1,30 @@
 import logging
-import time
 from typing import Any
 import pandas as pd
 import numpy as np
+import xgboost as xgb
+
+from src.metrics import metrics
 
 logger = logging.getLogger(__name__)
 
 
+def build_model(n_jobs: int = -1, seed: int = 42) -> xgb.XGBRegressor:
+    """Produkcyjna konfiguracja XGBoost (main.py, punkt odniesienia w compare_models.py)."""
+    logger.info("Inicjalizacja modelu XGBoost...")
+    return xgb.XGBRegressor(
+        n_estimators=1500,
+        learning_rate=0.03,
+        max_depth=12,
+        subsample=0.8,
+        colsample_bytree=0.7,
+        objective='reg:squarederror',
+        n_jobs=n_jobs,
+        random_state=seed,
+        min_child_weight=1,
+    )
+
+
 class ModelTrainer:
     """
     Klasa odpowiedzialna za proces trenowania modelu.
@@ -27,16 +45,15 @@ class ModelTrainer:
         model_name = model.__class__.__name__
         logger.info(f"Starting training for: {model_name}")
 
-        start_time = time.time()
-
         try:
             # Trenujemy model
-            model.fit(X_train, y_train)
+            with metrics.timer('spotify_train_seconds', model=model_name) as timer:
+                model.fit(X_train, y_train)
         except Exception as e:
             logger.error(f"Training failed for {model_name}: {e}")
             raise e
 
-        elapsed_time = time.time() - start_time
-        logger.info(f"Training completed for {model_name} in {elapsed_time:.2f} seconds.")
+        metrics.inc('spotify_train_rows_total', len(X_train), model=model_name)
+        logger.info(f"Training completed for {model_name} in {timer.elapsed:.2f} seconds.")
 
         return model
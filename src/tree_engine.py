@@ -0,0 +1,219 @@
+import json
+import logging
+from typing import Any, Dict, List, Mapping, Sequence, Tuple, Union
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Moduł celowo zależy wyłącznie od NumPy: wyeksportowany model można uruchomić
+# bez importowania xgboost, scikit-learn ani pandas (np. w zadaniach scoringu na brzegu).
+
+IDENTITY_OBJECTIVES = ('reg:squarederror', 'reg:absoluteerror', 'reg:pseudohubererror', 'reg:quantileerror')
+
+Rows = Union[Mapping[str, Sequence[Any]], Sequence[Mapping[str, Any]]]
+
+
+class NumpyTreeEngine:
+    """
+    Samodzielny silnik predykcji: preprocessing (imputacja, standaryzacja, One-Hot) i las drzew
+    zapisane jako płaskie tablice NumPy.
+
+    Wszystkie drzewa przechowywane są w jednej tablicy węzłów (indeksy globalne): `feature`, `threshold`,
+    `left` (prawe dziecko to zawsze `left + 1`), `default_right` (gałąź dla brakującej wartości) i `value`
+    (wartość liścia). Liście wskazują same na siebie, więc ewaluacja to `max_depth` wektorowych kroków
+    dla całej partii i wszystkich drzew naraz.
+    """
+
+    ARRAYS = ('feature', 'threshold', 'left', 'default_right', 'value', 'roots')
+
+    def __init__(self, feature: np.ndarray, threshold: np.ndarray, left: np.ndarray, default_right: np.ndarray,
+                 value: np.ndarray, roots: np.ndarray, base_score: float, max_depth: int,
+                 preprocessing: Dict[str, Any], batch_size: int = 1024):
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.default_right = default_right
+        self.value = value
+        self.roots = roots
+        self.base_score = float(base_score)
+        self.max_depth = int(max_depth)
+        self.preprocessing = preprocessing
+        self.batch_size = batch_size
+
+        self._numeric = preprocessing['numeric']
+        self._categorical = preprocessing['categorical']
+        self._category_index = [{value: j for j, value in enumerate(col['categories'])} for col in self._categorical]
+
+    @property
+    def n_features(self) -> int:
+        return len(self._numeric['columns']) + sum(len(col['categories']) for col in self._categorical)
+
+    @classmethod
+    def from_model(cls, model: Any, preprocessor: Any) -> 'NumpyTreeEngine':
+        """
+        Eksportuje wytrenowany model XGBoost (XGBRegressor lub Booster) i dopasowany
+        SpotifyPipelinePreprocessor. Wymaga bibliotek tylko w momencie eksportu, nie ewaluacji.
+        """
+        booster = model.get_booster() if hasattr(model, 'get_booster') else model
+        learner = json.loads(booster.save_raw(raw_format='json'))['learner']
+
+        objective = learner['objective']['name']
+        if objective not in IDENTITY_OBJECTIVES:
+            raise ValueError(f"Unsupported objective '{objective}'. Expected one of {IDENTITY_OBJECTIVES}.")
+        if learner['gradient_booster']['name'] != 'gbtree':
+            raise ValueError(f"Unsupported booster '{learner['gradient_booster']['name']}', expected 'gbtree'.")
+
+        base_score = float(learner['learner_model_param']['base_score'].strip('[]'))
+        trees = learner['gradient_booster']['model']['trees']
+
+        feature, threshold, left, default_right, value, roots = ([] for _ in range(6))
+        max_depth, offset = 0, 0
+        for tree in trees:
+            lc, rc = tree['left_children'], tree['right_children']
+            order, depth = cls._breadth_first(lc, rc)
+            new_id = {old: offset + i for i, old in enumerate(order)}
+            cond = tree['split_conditions']
+
+            for old in order:
+                is_leaf = lc[old] == -1
+                # Dzieci węzła mają kolejne numery (prawe = lewe + 1); liść wskazuje na siebie,
+                # a jego wartość przechowywana jest w split_conditions
+                feature.append(0 if is_leaf else tree['split_indices'][old])
+                threshold.append(np.inf if is_leaf else cond[old])
+                left.append(new_id[old] if is_leaf else new_id[lc[old]])
+                default_right.append(not is_leaf and not tree['default_left'][old])
+                value.append(cond[old] if is_leaf else 0.0)
+            roots.append(offset)
+
+            max_depth = max(max_depth, depth)
+            offset += len(order)
+
+        engine = cls(
+            feature=np.asarray(feature, dtype=np.int32), threshold=np.asarray(threshold, dtype=np.float32),
+            left=np.asarray(left, dtype=np.int32), default_right=np.asarray(default_right, dtype=bool),
+            value=np.asarray(value, dtype=np.float32), roots=np.asarray(roots, dtype=np.int32),
+            base_score=base_score, max_depth=max_depth, preprocessing=cls._export_preprocessor(preprocessor),
+        )
+        logger.info(f"Exported {len(trees)} trees ({offset} nodes, depth {max_depth}) to NumPy engine")
+        return engine
+
+    def save(self, path: str) -> str:
+        """Zapisuje silnik do pliku .npz (tablice + metadane JSON, bez pickle)."""
+        meta = {'base_score': self.base_score, 'max_depth': self.max_depth, 'preprocessing': self.preprocessing}
+        with open(path, 'wb') as f:
+            np.savez_compressed(f, meta=np.frombuffer(json.dumps(meta).encode(), dtype=np.uint8),
+                                **{name: getattr(self, name) for name in self.ARRAYS})
+        logger.info(f"NumPy tree engine saved to {path}")
+        return path
+
+    @classmethod
+    def load(cls, path: str) -> 'NumpyTreeEngine':
+        with np.load(path, allow_pickle=False) as data:
+            meta = json.loads(data['meta'].tobytes().decode())
+            arrays = {name: data[name] for name in cls.ARRAYS}
+        return cls(**arrays, base_score=meta['base_score'], max_depth=meta['max_depth'],
+                   preprocessing=meta['preprocessing'])
+
+    def transform(self, rows: Rows) -> np.ndarray:
+        """
+        Odpowiednik SpotifyPipelinePreprocessor.transform_new_data. Przyjmuje DataFrame,
+        słownik kolumn lub listę słowników (jeden na utwór).
+        """
+        columns = self._as_columns(rows)
+        names = self._numeric['columns'] + [spec['column'] for spec in self._categorical]
+        n_rows = len(columns[names[0]])
+        X = np.zeros((n_rows, self.n_features), dtype=np.float64)
+
+        numeric = self._numeric
+        for j, col in enumerate(numeric['columns']):
+            x = np.asarray(columns[col], dtype=np.float64)
+            x = np.where(np.isnan(x), numeric['fill'][j], x)
+            X[:, j] = (x - numeric['mean'][j]) / numeric['scale'][j]
+
+        offset = len(numeric['columns'])
+        for spec, index in zip(self._categorical, self._category_index):
+            values = np.asarray(columns[spec['column']], dtype=object)
+            uniques, inverse = np.unique(values.astype(str), return_inverse=True)
+            # Kategorie mapowane raz na unikalną wartość, a nie na wiersz
+            first = np.zeros(len(uniques), dtype=np.int64)
+            first[inverse[::-1]] = np.arange(len(values))[::-1]
+            codes = np.array([index.get(self._impute(values[i], spec['fill']), -1) for i in first], dtype=np.int64)
+            row_codes = codes[inverse]
+            known = row_codes >= 0
+            X[np.nonzero(known)[0], offset + row_codes[known]] = 1.0
+            offset += len(spec['categories'])
+        return X
+
+    def predict(self, rows: Rows) -> np.ndarray:
+        """Predykcja dla surowych danych (preprocessing + las drzew)."""
+        return self.predict_matrix(self.transform(rows))
+
+    def predict_matrix(self, X: np.ndarray) -> np.ndarray:
+        """Predykcja dla macierzy już zakodowanych cech. Partie po `batch_size` wierszy ograniczają pamięć."""
+        # XGBoost porównuje cechy w precyzji float32
+        X = np.asarray(X, dtype=np.float32)
+        out = np.empty(len(X), dtype=np.float32)
+        for start in range(0, len(X), self.batch_size):
+            out[start:start + self.batch_size] = self._predict_block(X[start:start + self.batch_size])
+        return out
+
+    def _predict_block(self, X: np.ndarray) -> np.ndarray:
+        flat = np.ascontiguousarray(X).ravel()
+        row_offset = (np.arange(len(X), dtype=np.int64) * X.shape[1])[:, None]
+        has_missing = bool(np.isnan(flat).any())
+
+        node = np.broadcast_to(self.roots, (len(X), len(self.roots))).copy()
+        for _ in range(self.max_depth):
+            x = flat.take(row_offset + self.feature.take(node))
+            go_right = x >= self.threshold.take(node)
+            if has_missing:
+                go_right |= np.isnan(x) & self.default_right.take(node)
+            node = self.left.take(node) + go_right
+        return self.value.take(node).sum(axis=1, dtype=np.float32) + np.float32(self.base_score)
+
+    @staticmethod
+    def _breadth_first(left: List[int], right: List[int]) -> Tuple[List[int], int]:
+        """Kolejność węzłów wszerz (rodzeństwo obok siebie) oraz głębokość drzewa."""
+        order, level, depth = [0], [0], 0
+        while True:
+            level = [c for n in level if left[n] != -1 for c in (left[n], right[n])]
+            if not level:
+                return order, depth
+            order.extend(level)
+            depth += 1
+
+    @staticmethod
+    def _impute(value: Any, fill: Any) -> Any:
+        if value is None or (isinstance(value, float) and np.isnan(value)):
+            return fill
+        return value.item() if isinstance(value, np.generic) else value
+
+    @staticmethod
+    def _as_columns(rows: Rows) -> Mapping[str, Sequence[Any]]:
+        if isinstance(rows, Mapping) or hasattr(rows, 'columns'):
+            return rows
+        rows = list(rows)
+        return {key: [row.get(key) for row in rows] for key in rows[0]}
+
+    @staticmethod
+    def _export_preprocessor(preprocessor: Any) -> Dict[str, Any]:
+        spec: Dict[str, Any] = {'numeric': {'columns': [], 'fill': [], 'mean': [], 'scale': []}, 'categorical': []}
+        for name, transformer, columns in preprocessor.pipeline.transformers_:
+            if name == 'num':
+                imputer, scaler = transformer.named_steps['imputer'], transformer.named_steps['scaler']
+                spec['numeric'] = {
+                    'columns': list(columns),
+                    'fill': imputer.statistics_.astype(float).tolist(),
+                    'mean': scaler.mean_.astype(float).tolist(),
+                    'scale': scaler.scale_.astype(float).tolist(),
+                }
+            elif name == 'cat':
+                imputer, encoder = transformer.named_steps['imputer'], transformer.named_steps['onehot']
+                for column, fill, categories in zip(columns, imputer.statistics_, encoder.categories_):
+                    spec['categorical'].append({
+                        'column': column,
+                        'fill': fill.item() if isinstance(fill, np.generic) else fill,
+                        'categories': [c.item() if isinstance(c, np.generic) else c for c in categories],
+                    })
+        return spec
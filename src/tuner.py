@@ -1,9 +1,11 @@
 import logging
-from typing import Any
+from typing import Any, Optional
 
 import xgboost as xgb
 from sklearn.model_selection import RandomizedSearchCV
 
+from src.metrics import metrics
+
 
 logger = logging.getLogger(__name__)
 
@@ -11,11 +13,21 @@ logger = logging.getLogger(__name__)
 class ModelTuner:
     """
     Klasa odpowiedzialna za znalezienie najlepszych hiperparametrów modelu.
+
+    `n_jobs` to liczba wątków każdego modelu XGBoost; losowanie kombinacji i podział CV
+    zależą tylko od `random_state`, więc przy stałym `n_jobs` wynik nie zależy od liczby rdzeni.
+    `max_estimators` (np. z planu treningu) ogranicza przeszukiwane liczby drzew.
     """
 
-    def __init__(self, n_iter: int = 20, cv: int = 3):
+    N_ESTIMATORS = [500, 1000, 1500]
+
+    def __init__(self, n_iter: int = 20, cv: int = 3, n_jobs: int = -1, random_state: int = 42,
+                 max_estimators: Optional[int] = None):
         self.n_iter = n_iter  # liczba kombinacji
         self.cv = cv  # ilość podziałów danych
+        self.n_jobs = n_jobs
+        self.random_state = random_state
+        self.max_estimators = max_estimators
 
     def tune(self, X, y) -> dict[str, Any]:
         """
@@ -25,7 +37,7 @@ class ModelTuner:
 
         # Definicja przestrzeni poszukiwań (Grid)
         param_dist = {
-            'n_estimators': [500, 1000, 1500],  # liczba drzew
+            'n_estimators': self._estimator_grid(),  # liczba drzew
             'learning_rate': [0.01, 0.05, 0.1, 0.2],  # szybkość uczenia
             'max_depth': [4, 6, 8, 10],  # głębokość drzewa
             'subsample': [0.7, 0.8, 0.9, 1.0],  # Jaki % próbek brać do każdego drzewa
@@ -34,7 +46,7 @@ class ModelTuner:
         }
 
         # Model bazowy
-        xgb_model = xgb.XGBRegressor(objective='reg:squarederror', n_jobs=-1, random_state=42)
+        xgb_model = xgb.XGBRegressor(objective='reg:squarederror', n_jobs=self.n_jobs, random_state=self.random_state)
 
         # Konfiguracja przeszukiwania
         random_search = RandomizedSearchCV(
@@ -45,12 +57,24 @@ class ModelTuner:
             cv=self.cv,
             verbose=1,
             n_jobs=-1,
-            random_state=42
+            random_state=self.random_state
         )
 
-        random_search.fit(X, y)
+        with metrics.timer('spotify_tune_seconds'):
+            random_search.fit(X, y)
+
+        # Czas próby = suma czasów dopasowania i oceny na wszystkich foldach (cv_results_ podaje średnie po foldach)
+        results = random_search.cv_results_
+        for fit_time, score_time in zip(results['mean_fit_time'], results['mean_score_time']):
+            metrics.observe('spotify_tune_trial_seconds', float(fit_time + score_time) * random_search.n_splits_)
+        metrics.inc('spotify_tune_trials_total', len(results['params']))
 
         logger.info(f"Najlepsze parametry znalezione: {random_search.best_params_}")
         logger.info(f"Najlepszy wynik (RMSE z CV): {-random_search.best_score_:.4f}")
 
         return random_search.best_params_
+
+    def _estimator_grid(self) -> list[int]:
+        if self.max_estimators is None:
+            return self.N_ESTIMATORS
+        return sorted({min(n, self.max_estimators) for n in self.N_ESTIMATORS})
@@ -3,47 +3,78 @@ import seaborn as sns
 import pandas as pd
 import numpy as np
 import logging
+from pathlib import Path
+
+from src.eda import EDAStats, EDAStatsEngine
 
 logger = logging.getLogger(__name__)
 
 
 class SpotifyVisualizer:
+    """
+    Wykresy EDA rysowane z zagregowanych statystyk (EDAStatsEngine), a nie z pełnej ramki danych.
+    Statystyki liczone są raz, w jednym przebiegu porcjami, i cache'owane per odcisk zbioru,
+    więc kolejne wykresy (i kolejne uruchomienia notatnika) nie przeliczają danych.
+
+    Args:
+        data: DataFrame albo ścieżka do pliku .parquet / .csv (czytanego porcjami).
+        engine: Opcjonalny silnik statystyk (np. z innym rozmiarem porcji lub katalogiem cache).
+    """
 
-    def __init__(self, df: pd.DataFrame):
-        self.df = df
+    def __init__(self, data: pd.DataFrame | str | Path, engine: EDAStatsEngine | None = None):
+        self.data = data
+        self.engine = engine or EDAStatsEngine()
+        self._stats: EDAStats | None = None
 
         # Ustawienia estetyczne dla wszystkich wykresów
         # sns.set_theme(style="whitegrid")
         plt.rcParams['figure.figsize'] = (12, 6)
 
+    @property
+    def stats(self) -> EDAStats:
+        if self._stats is None:
+            self._stats = self.engine.compute(self.data)
+        return self._stats
+
+    @property
+    def df(self) -> pd.DataFrame:
+        """Próbka danych (jednostajna) używana do wykresów punktowych."""
+        return self.stats.sample
+
     def plot_target_distribution(self, target_col: str = 'popularity'):
         """
         Analiza rozkładu zmiennej celu.
         """
+        hist = self.stats.numeric.get(target_col)
+        if hist is None:
+            logger.warning(f"Brak kolumny '{target_col}'.")
+            return
+
         plt.figure()
-        sns.histplot(self.df[target_col], bins=50, kde=True, color='purple')
+        counts, edges = hist.histogram(bins=50)
+        plt.stairs(counts, edges, fill=True, color='purple')
         plt.title(f'Rozkład zmiennej celu: {target_col}')
         plt.xlabel('Wartość')
         plt.ylabel('Liczebność')
         plt.show()
 
         # Podstawowe statystyki
-        stats = self.df[target_col].describe()
+        stats = pd.Series(hist.describe())
         logger.info(f"Statystyki celu:\n{stats}")
 
     def plot_correlation_matrix(self):
         """
         Generuje heatmapę korelacji, aby zobrazować zależności między cechami.
+        Korelacja Spearmana liczona jest na próbce rezerwuarowej wierszy pobieranej jednostajnie ze wszystkich
+        porcji danych (dokładna, gdy zbiór mieści się w próbce).
         """
-        # Wybieramy tylko kolumny numeryczne do korelacji
-        numeric_df: pd.DataFrame = self.df.select_dtypes(include=[np.number])
+        corr = self.stats.spearman
 
-        if numeric_df.empty:
+        if corr.empty:
             logger.warning("Brak kolumn numerycznych do analizy korelacji.")
             return
 
         plt.figure(figsize=(12, 10))
-        corr = numeric_df.corr(method='spearman')
 
         mask = np.triu(np.ones_like(corr, dtype=bool))  # Ukrywa górny trójkąt (duplikaty)
 
@@ -60,34 +91,42 @@ class SpotifyVisualizer:
             # Domyślnie najważniejsze cechy audio
             features = ['danceability', 'energy', 'loudness', 'acousticness', 'valence']
 
+        sample = self.stats.sample
+        # Próbkowanie danych dla lepszej czytelności wykresu
+        if len(sample) > sample_size:
+            sample_df = sample.sample(n=sample_size, random_state=42)
+        else:
+            sample_df = sample
+
         for feature in features:
-            if feature not in self.df.columns:
+            if feature not in sample_df.columns:
                 continue
 
             plt.figure(figsize=(10, 5))
-            # Próbkowanie danych dla lepszej czytelności wykresu
-            if len(self.df) > sample_size:
-                sample_df = self.df.sample(n=sample_size, random_state=42)
-            else:
-                sample_df = self.df
-
             sns.regplot(x=feature, y=target_col, data=sample_df, scatter_kws={'alpha': 0.1}, line_kws={'color': 'red'})
             plt.title(f'{feature} vs {target_col}')
             plt.show()
 
     def plot_genre_popularity(self, top_n: int = 20):
         """
-        Analiza wpływu gatunku na popularność (Boxplot).
+        Analiza wpływu gatunku na popularność (Boxplot z kwantyli per gatunek).
         """
-        if 'track_genre' not in self.df.columns:
+        genres = self.stats.grouped.get('track_genre')
+        if not genres:
             return
 
         # Obliczamy średnią popularność dla gatunków i sortujemy
-        order = self.df.groupby('track_genre', observed=False)['popularity'].mean().sort_values(ascending=False).index[:top_n]
-
-        plt.figure(figsize=(14, 8))
-        sns.boxplot(x='track_genre', y='popularity', data=self.df, order=order, palette='viridis', hue='track_genre', legend=False)
-        plt.title(f'Top {top_n} Gatunków wg Popularności')
+        order = self.stats.group_means('track_genre').sort_values(ascending=False).index[:top_n]
+
+        fig, ax = plt.subplots(figsize=(14, 8))
+        boxes = [genres[g].box_stats(label=str(g)) for g in order]
+        colors = sns.color_palette('viridis', len(boxes))
+        artists = ax.bxp(boxes, showfliers=False, patch_artist=True)
+        for patch, color in zip(artists['boxes'], colors):
+            patch.set_facecolor(color)
+        ax.set_title(f'Top {top_n} Gatunków wg Popularności')
+        ax.set_xlabel('track_genre')
+        ax.set_ylabel('popularity')
         plt.xticks(rotation=45)
         plt.show()
 
@@ -111,11 +150,13 @@ class SpotifyVisualizer:
         n_rows = (num_features + n_cols - 1) // n_cols
 
         fig, axes = plt.subplots(n_rows, n_cols, figsize=(n_cols * 5, n_rows * 4))
-        axes = axes.flatten()  # Spłaszczenie tablicy osi dla łatwiejszej iteracji
+        axes = np.atleast_1d(axes).flatten()  # Spłaszczenie tablicy osi dla łatwiejszej iteracji
 
         for i, feature in enumerate(features):
-            if feature in self.df.columns:
-                sns.histplot(self.df[feature], bins=30, kde=True, ax=axes[i], color='skyblue')
+            hist = self.stats.numeric.get(feature)
+            if hist is not None:
+                counts, edges = hist.histogram(bins=30)
+                axes[i].stairs(counts, edges, fill=True, color='skyblue')
                 axes[i].set_title(f'Rozkład: {feature}')
                 axes[i].set_xlabel('')
                 axes[i].set_ylabel('')
@@ -132,15 +173,17 @@ class SpotifyVisualizer:
         Analiza wpływu długości utworu na popularność.
         Zawiera konwersję ms -> minuty oraz filtrację ekstremalnych outlierów (>15 min) dla czytelności.
         """
-        if 'duration_ms' not in self.df.columns:
+        sample = self.stats.sample
+        if 'duration_ms' not in sample.columns:
             logger.warning("Brak kolumny 'duration_ms'. Pomijam analizę czasu trwania.")
             return
 
-        df_viz = self.df.copy()
-        df_viz['duration_min'] = df_viz['duration_ms'] / 60000
+        # Konwersja tylko na próbce - bez kopiowania całego zbioru
+        duration_min = sample['duration_ms'] / 60000
 
         # Filtrujemy audiobooki i sety DJ-skie (> 10 min) dla czytelności wykresu
-        df_filtered = df_viz[df_viz['duration_min'] < 10]
+        df_filtered = pd.DataFrame({'duration_min': duration_min, target_col: sample[target_col]})
+        df_filtered = df_filtered[df_filtered['duration_min'] < 10]
 
         # Przygotowujemy próbkę
         if len(df_filtered) > sample_size:
@@ -163,27 +206,28 @@ class SpotifyVisualizer:
     def plot_explicit_content_impact(self, sample_size: int = 1000):
         """
         Analiza wpływu treści wulgarnych (Explicit) na popularność.
+        Boxploty liczone są z kwantyli całego zbioru, a nie z próbki.
         """
-        if 'explicit' not in self.df.columns:
+        groups = self.stats.grouped.get('explicit')
+        if not groups:
             logger.warning("Brak kolumny 'explicit'. Pomijam analizę.")
             return
 
-        # Przygotowujemy próbkę
-        if len(self.df) > sample_size:
-            sample_df = self.df.sample(n=sample_size, random_state=42)
-        else:
-            sample_df = self.df
-
         # Generujemy wykres boxplot
-        plt.figure(figsize=(8, 6))
-        sns.boxplot(x='explicit', y='popularity', data=sample_df, palette='Set2', hue='explicit', legend=False)
-
-        plt.title('Wpływ treści Explicit na popularność')
-        plt.xlabel('Czy utwór jest Explicit?')
-        plt.ylabel('Popularność')
+        fig, ax = plt.subplots(figsize=(8, 6))
+        order = sorted(groups, key=lambda g: int(g))
+        colors = sns.color_palette('Set2', len(order))
+        artists = ax.bxp([groups[g].box_stats(label=str(g)) for g in order], showfliers=False, patch_artist=True)
+        for patch, color in zip(artists['boxes'], colors):
+            patch.set_facecolor(color)
+
+        ax.set_title('Wpływ treści Explicit na popularność')
+        ax.set_xlabel('Czy utwór jest Explicit?')
+        ax.set_ylabel('Popularność')
         plt.show()
 
         # Logujemy statystyki
-        mean_vals = self.df.groupby('explicit', observed=False)['popularity'].mean()
-        logger.info(f"Średnia popularność - Not Explicit: {mean_vals.get(False, 0):.2f}")
-        logger.info(f"Średnia popularność - Explicit: {mean_vals.get(True, 0):.2f}")
+        mean_vals = self.stats.group_means('explicit')
+        mean_vals.index = mean_vals.index.astype(int)
+        logger.info(f"Średnia popularność - Not Explicit: {mean_vals.get(0, 0):.2f}")
+        logger.info(f"Średnia popularność - Explicit: {mean_vals.get(1, 0):.2f}")
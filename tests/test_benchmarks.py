@@ -0,0 +1,63 @@
+import xgboost as xgb
+
+from src.benchmarks import BenchmarkSuite, compare_engines, compare_results
+from src.cleaners import SpotifyDataCleaner
+from src.preprocessors import SpotifyPipelinePreprocessor
+from src.serializers import ModelSerializer
+from src.synthetic import make_synthetic_tracks
+
+
+def test_synthetic_data_matches_fixture_schema(sample_raw_data):
+    df = make_synthetic_tracks(200)
+
+    assert set(df.columns) == set(sample_raw_data.columns)
+    for col in sample_raw_data.columns:
+        assert df[col].dtype.kind == sample_raw_data[col].dtype.kind, col
+
+    # Część wierszy to duplikaty, tak jak w prawdziwym zbiorze
+    assert df['track_id'].duplicated().any()
+    assert df['popularity'].between(0, 100).all()
+
+
+def test_benchmark_suite_measures_every_stage(tmp_path):
+    suite = BenchmarkSuite(sizes=[500], data_dir=str(tmp_path), n_estimators=5, max_depth=3,
+                           single_predict_calls=5, batch_size=50, batch_repeats=3)
+    results = suite.run()
+
+    stages = results['results']['500']
+    for stage in ['load', 'load_parallel', 'clean', 'process', 'transform_new_data', 'train', 'serialize', 'predictor_load', 'explain', 'drift_monitor']:
+        assert stages[stage]['seconds'] > 0
+        assert stages[stage]['peak_rss_mb'] > 0
+
+    assert stages['predict_single']['p50_ms'] <= stages['predict_single']['p99_ms']
+    assert stages['predict_batch']['batch_size'] == 50
+
+
+def test_compare_results_flags_regressions():
+    baseline = {'results': {'1000': {'train': {'seconds': 1.0, 'peak_rss_mb': 100.0},
+                                     'predict_single': {'p99_ms': 5.0}}}}
+    candidate = {'results': {'1000': {'train': {'seconds': 1.05, 'peak_rss_mb': 150.0},
+                                      'predict_single': {'p99_ms': 8.0}}}}
+
+    regressions = compare_results(baseline, candidate, time_threshold=0.10, memory_threshold=0.20)
+    flagged = {(r['stage'], r['metric']) for r in regressions}
+
+    assert flagged == {('train', 'peak_rss_mb'), ('predict_single', 'p99_ms')}
+
+
+def test_compare_engines_reports_both_runtimes(tmp_path):
+    df = SpotifyDataCleaner().clean(make_synthetic_tracks(1000, n_genres=8))
+    preprocessor = SpotifyPipelinePreprocessor(target_col='popularity', test_size=0.2, random_state=42)
+    X_train, _, y_train, _ = preprocessor.process(df)
+    model = xgb.XGBRegressor(n_estimators=10, max_depth=4, random_state=42).fit(X_train, y_train)
+    serializer = ModelSerializer(base_dir=str(tmp_path))
+    serializer.save(model, 'model.joblib')
+    serializer.save(preprocessor, 'preprocessor.joblib')
+
+    results = compare_engines('model.joblib', 'preprocessor.joblib', str(tmp_path / 'model.npz'),
+                              base_dir=str(tmp_path), n_rows=500, batch_size=100)
+
+    assert results['max_abs_diff'] < 1e-3
+    assert results['runtimes']['xgboost']['imports_xgboost']
+    assert not results['runtimes']['numpy_engine']['imports_xgboost']
+    assert results['runtimes']['numpy_engine']['rows_per_s'] > 0
@@ -30,3 +30,11 @@ def test_cleaner_keeps_model_columns(sample_raw_data):
     ]
     for col in required_cols:
         assert col in df_clean.columns
+
+
+def test_cleaner_can_keep_track_id_as_index(sample_raw_data):
+    df_clean = SpotifyDataCleaner(keep_track_id=True).clean(sample_raw_data)
+
+    assert df_clean.index.name == 'track_id'
+    assert list(df_clean.index) == ['id1', 'id2', 'id3', 'id4']
+    assert 'track_id' not in df_clean.columns
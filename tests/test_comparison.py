@@ -0,0 +1,87 @@
+import threading
+
+import pytest
+from sklearn.linear_model import Ridge
+from threadpoolctl import threadpool_info
+
+from src.cleaners import SpotifyDataCleaner
+from src.comparison import ModelComparison, ModelSpec, default_specs, save_leaderboard
+from src.preprocessors import SpotifyPipelinePreprocessor
+from src.synthetic import make_synthetic_tracks
+
+
+class _Tracker:
+    """Rdzenie zajęte przez jednocześnie trenowane modele i limity OpenMP widziane w trakcie treningu."""
+
+    def __init__(self, parties: int):
+        self.active = self.peak = 0
+        self.openmp_threads = []
+        self.lock = threading.Lock()
+        # Modele trenowane równolegle czekają na siebie - nakładanie się treningów nie zależy od czasu
+        self.barrier = threading.Barrier(parties, timeout=10)
+
+
+class _TrackedRidge(Ridge):
+    """Ridge zliczający rdzenie zajęte przez jednocześnie trenowane modele."""
+
+    def __init__(self, tracker=None, threads=1):
+        super().__init__()
+        self.tracker = tracker
+        self.threads = threads
+
+    def fit(self, X, y):
+        tracker = self.tracker
+        with tracker.lock:
+            tracker.active += self.threads
+            tracker.peak = max(tracker.peak, tracker.active)
+            tracker.openmp_threads += [i['num_threads'] for i in threadpool_info() if i['user_api'] == 'openmp']
+        tracker.barrier.wait()
+        with tracker.lock:
+            tracker.active -= self.threads
+        return super().fit(X, y)
+
+    def __getstate__(self):
+        # Ranking mierzy rozmiar modelu przez pickle - licznik z blokadami nie jest częścią modelu
+        return {**super().__getstate__(), 'tracker': None}
+
+
+@pytest.fixture
+def matrices():
+    df = SpotifyDataCleaner().clean(make_synthetic_tracks(1500, n_genres=8))
+    preprocessor = SpotifyPipelinePreprocessor(target_col='popularity', test_size=0.2, random_state=42)
+    return preprocessor.process(df)
+
+
+def test_leaderboard_ranks_models_and_reports_failures(matrices, tmp_path):
+    X_train, X_test, y_train, y_test = matrices
+
+    def broken(_):
+        raise RuntimeError("boom")
+
+    specs = [spec for spec in default_specs(threads=2) if spec.name in ('xgb_depth6', 'ridge', 'mean_baseline')]
+    specs.append(ModelSpec('broken', broken))
+    leaderboard = ModelComparison(specs, cpu_budget=2, latency_repeats=2).run(X_train, y_train, X_test, y_test)
+
+    assert [e['rank'] for e in leaderboard] == [1, 2, 3, 4]
+    assert leaderboard[-1]['name'] == 'broken' and leaderboard[-1]['status'] == 'failed'
+    done = leaderboard[:-1]
+    assert [e['rmse'] for e in done] == sorted(e['rmse'] for e in done)
+    for entry in done:
+        assert entry['fit_seconds'] > 0 and entry['size_bytes'] > 0
+        assert entry['predict_latency']['p50_ms'] > 0
+
+    json_path, csv_path = save_leaderboard(leaderboard, str(tmp_path))
+    assert json_path.endswith('.json') and csv_path.endswith('.csv')
+
+
+def test_concurrent_training_respects_cpu_budget(matrices):
+    X_train, X_test, y_train, y_test = matrices
+    tracker = _Tracker(parties=2)
+
+    specs = [ModelSpec(f'm{i}', lambda n: _TrackedRidge(tracker, threads=n), threads=2) for i in range(4)]
+    leaderboard = ModelComparison(specs, cpu_budget=4, latency_repeats=1).run(X_train, y_train, X_test, y_test)
+
+    # Dwa modele po 2 wątki naraz - nigdy więcej niż budżet, a pula OpenMP ograniczona do przydziału
+    assert all(entry['status'] == 'done' for entry in leaderboard)
+    assert tracker.peak == 4
+    assert tracker.openmp_threads and set(tracker.openmp_threads) == {2}
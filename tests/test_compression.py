@@ -0,0 +1,54 @@
+import numpy as np
+import xgboost as xgb
+
+from src.cleaners import SpotifyDataCleaner
+from src.compression import ModelCompressor
+from src.predictors import SpotifyPredictor
+from src.preprocessors import SpotifyPipelinePreprocessor
+from src.serializers import ModelSerializer
+from src.synthetic import make_synthetic_tracks
+
+
+def test_truncate_matches_iteration_range(sample_clean_data):
+    X = sample_clean_data.drop(columns=['popularity', 'track_genre']).to_numpy(dtype=float)
+    y = sample_clean_data['popularity'].to_numpy()
+    model = xgb.XGBRegressor(n_estimators=20, max_depth=2, random_state=42).fit(X, y)
+
+    truncated = ModelCompressor.truncate(model, 7)
+
+    assert truncated.get_booster().num_boosted_rounds() == 7
+    np.testing.assert_allclose(truncated.predict(X), model.predict(X, iteration_range=(0, 7)), rtol=1e-6)
+
+
+def test_compress_reports_variants_and_fast_model_is_loadable(tmp_path):
+    df = SpotifyDataCleaner().clean(make_synthetic_tracks(3000, n_genres=10))
+    preprocessor = SpotifyPipelinePreprocessor(target_col='popularity', test_size=0.3, random_state=42)
+    X_train, X_test, y_train, y_test = preprocessor.process(df)
+    model = xgb.XGBRegressor(n_estimators=60, max_depth=6, random_state=42).fit(X_train, y_train)
+
+    compressor = ModelCompressor(tolerance=0.05, n_checkpoints=6, latency_repeats=2,
+                                 student_params={'n_estimators': 30, 'max_depth': 3, 'random_state': 42})
+    fast, report = compressor.compress(model, X_train, X_test, y_test)
+
+    assert set(report['variants']) == {'full', 'truncated', 'distilled'}
+    assert report['validation_curve'][-1]['n_trees'] == 60
+    selected = report['variants'][report['selected']]
+    assert selected['selection_rmse'] <= report['variants']['full']['selection_rmse'] * 1.05 \
+        or report['selected'] == 'truncated'
+
+    serializer = ModelSerializer(base_dir=str(tmp_path))
+    serializer.save(preprocessor, 'preprocessor.joblib')
+    serializer.save(fast, 'model.fast.joblib')
+    predictor = SpotifyPredictor('model.fast.joblib', 'preprocessor.joblib', base_dir=str(tmp_path))
+    features = df.drop(columns=['popularity']).iloc[:10]
+    np.testing.assert_allclose(predictor.predict_batch(features),
+                               fast.predict(preprocessor.transform_new_data(features)), rtol=1e-6)
+
+
+def test_student_params_follow_threads_and_seed():
+    compressor = ModelCompressor(n_jobs=2, seed=7, student_params={'max_depth': 3})
+
+    assert compressor.student_params['n_jobs'] == 2 and compressor.student_params['random_state'] == 7
+    assert compressor.student_params['max_depth'] == 3
+    assert 'n_jobs' not in ModelCompressor.DEFAULT_STUDENT
+    assert ModelCompressor(distill=False).student_params is None
@@ -0,0 +1,72 @@
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from src.eda import DEFAULT_CACHE_DIR, EDAStatsEngine, StreamingHistogram
+from src.synthetic import make_synthetic_tracks
+
+
+def test_streaming_histogram_matches_numpy_across_chunks():
+    rng = np.random.default_rng(0)
+    # Kolejne porcje wychodzą poza zakres pierwszej, więc histogram musi się rozszerzać
+    chunks = [rng.normal(0, 1, 5000), rng.normal(10, 3, 5000), rng.normal(-20, 2, 5000)]
+    values = np.concatenate(chunks)
+
+    hist = StreamingHistogram(n_bins=1024)
+    for chunk in chunks:
+        hist.update(chunk)
+
+    assert hist.count == len(values)
+    assert np.isclose(hist.mean, values.mean())
+    assert np.isclose(hist.std, values.std(ddof=1))
+    assert hist.min == values.min() and hist.max == values.max()
+    span = values.max() - values.min()
+    assert np.allclose(hist.quantile([0.1, 0.5, 0.9]), np.quantile(values, [0.1, 0.5, 0.9]), atol=span / 256)
+
+
+def test_engine_chunked_statistics_match_full_frame():
+    df = make_synthetic_tracks(20_000).drop(columns=['track_id', 'artists', 'album_name', 'track_name'])
+    engine = EDAStatsEngine(cache_dir=None, chunk_size=3_000, sample_size=500)
+
+    stats = engine.compute(df)
+
+    exact = df.select_dtypes(include=[np.number]).corr(method='spearman')
+    assert (stats.spearman - exact).abs().max().max() < 0.02
+    assert stats.n_rows == len(df)
+    assert len(stats.sample) == 500
+
+    expected_means = df.groupby('track_genre')['popularity'].mean()
+    means = stats.group_means('track_genre')
+    assert np.allclose(means[expected_means.index], expected_means)
+
+
+def test_rank_correlation_does_not_depend_on_chunk_order():
+    rng = np.random.default_rng(0)
+    x = rng.normal(size=30_000)
+    df = pd.DataFrame({'x': x, 'noisy': x + rng.normal(size=x.size), 'popularity': np.exp(x) + rng.normal(size=x.size)})
+    # Plik posortowany po kolumnie: pierwsza porcja zawiera tylko najmniejsze wartości
+    df = df.sort_values('x', ignore_index=True)
+    engine = EDAStatsEngine(cache_dir=None, chunk_size=3_000, rank_sample_size=10_000, sample_size=500)
+
+    stats = engine.compute(df)
+
+    assert (stats.spearman - df.corr(method='spearman')).abs().max().max() < 0.05
+
+
+def test_engine_caches_by_fingerprint(tmp_path, sample_clean_data):
+    path = tmp_path / 'clean.parquet'
+    sample_clean_data.to_parquet(path)
+
+    first = EDAStatsEngine(cache_dir=str(tmp_path / 'cache')).compute(str(path))
+    cached_files = list((tmp_path / 'cache').iterdir())
+    second = EDAStatsEngine(cache_dir=str(tmp_path / 'cache')).compute(str(path))
+
+    assert len(cached_files) == 1
+    assert second.fingerprint == first.fingerprint
+    assert second.numeric['popularity'].count == len(sample_clean_data)
+
+    # Zmiana danych zmienia odcisk
+    pd.concat([sample_clean_data, sample_clean_data]).to_parquet(path)
+    assert EDAStatsEngine(cache_dir=None).fingerprint(str(path)) != first.fingerprint
+    assert Path(DEFAULT_CACHE_DIR).is_absolute()
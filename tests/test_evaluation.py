@@ -0,0 +1,59 @@
+import json
+import os
+
+import numpy as np
+from sklearn.metrics import mean_squared_error, mean_absolute_error, r2_score
+
+from src.evaluation import ModelEvaluator
+
+
+def test_metrics_match_sklearn():
+    rng = np.random.default_rng(0)
+    y_true = rng.uniform(0, 100, 1000)
+    y_pred = y_true + rng.normal(0, 10, 1000)
+
+    metrics = ModelEvaluator(plot_mode='none').evaluate(y_true, y_pred)
+
+    assert np.isclose(metrics['rmse'], np.sqrt(mean_squared_error(y_true, y_pred)))
+    assert np.isclose(metrics['mae'], mean_absolute_error(y_true, y_pred))
+    assert np.isclose(metrics['r2'], r2_score(y_true, y_pred))
+    assert metrics['abs_error_quantiles']['p50'] <= metrics['abs_error_quantiles']['p99']
+
+
+def test_per_group_metrics():
+    y_true = np.array([10.0, 20.0, 30.0, 40.0])
+    y_pred = np.array([12.0, 18.0, 30.0, 30.0])
+    groups = ['pop', 'pop', 'rock', 'rock']
+
+    metrics = ModelEvaluator(plot_mode='none').evaluate(y_true, y_pred, groups=groups)
+
+    assert metrics['per_group']['pop'] == {'n': 2, 'rmse': 2.0, 'mae': 2.0}
+    assert metrics['per_group']['rock']['mae'] == 5.0
+    assert np.isclose(metrics['per_group']['rock']['rmse'], np.sqrt(50))
+
+
+def test_background_mode_writes_plots_and_report(tmp_path):
+    evaluator = ModelEvaluator(plot_mode='background', plot_dir=str(tmp_path / 'plots'), max_scatter_points=100)
+    y_true = np.linspace(0, 100, 500)
+    report_path = str(tmp_path / 'model.metrics.json')
+
+    evaluator.evaluate(y_true, y_true + 1, model_name="Test Model", report_path=report_path)
+    paths = evaluator.wait()
+
+    assert sorted(os.path.basename(p) for p in paths) == ['test_model_diagnostics.png', 'test_model_report.html']
+    assert all(os.path.getsize(p) > 0 for p in paths)
+    with open(report_path) as f:
+        assert json.load(f)['name'] == "Test Model"
+
+
+def test_report_escapes_model_name(tmp_path):
+    evaluator = ModelEvaluator(plot_mode='background', plot_dir=str(tmp_path), max_scatter_points=100)
+    y_true = np.linspace(0, 100, 200)
+
+    evaluator.evaluate(y_true, y_true + np.random.default_rng(0).normal(0, 1, 200), model_name='<script>alert(1)</script> & v2')
+    html_path = next(p for p in evaluator.wait() if p.endswith('.html'))
+
+    with open(html_path) as f:
+        report = f.read()
+    assert '<script>' not in report
+    assert '<h1>&lt;script&gt;alert(1)&lt;/script&gt; &amp; v2</h1>' in report
@@ -0,0 +1,55 @@
+import numpy as np
+import pandas as pd
+import pytest
+import xgboost as xgb
+
+from src.cleaners import SpotifyDataCleaner
+from src.explainers import PredictionExplainer
+from src.preprocessors import SpotifyPipelinePreprocessor
+from src.synthetic import make_synthetic_tracks
+
+
+@pytest.fixture
+def fitted():
+    df = SpotifyDataCleaner().clean(make_synthetic_tracks(2000, n_genres=12))
+    preprocessor = SpotifyPipelinePreprocessor(target_col='popularity', test_size=0.2, random_state=42)
+    X_train, _, y_train, _ = preprocessor.process(df)
+    model = xgb.XGBRegressor(n_estimators=20, max_depth=4, random_state=42).fit(X_train, y_train)
+    return model, preprocessor, df.drop(columns=['popularity'])
+
+
+def test_contributions_fold_one_hot_and_sum_to_prediction(fitted):
+    model, preprocessor, features = fitted
+    explainer = PredictionExplainer(model, preprocessor)
+
+    # Wszystkie kolumny One-Hot gatunku zwinięte do jednego pola
+    assert explainer.field_names.count('track_genre') == 1
+    assert not any(name.startswith('track_genre_') for name in explainer.field_names)
+
+    X = preprocessor.transform_new_data(features.iloc[:100])
+    contribs = explainer.contributions(X)
+    assert contribs.shape == (100, len(explainer.field_names) + 1)
+    np.testing.assert_allclose(contribs.sum(axis=1), model.predict(X), atol=1e-3)
+
+    # Macierz spoza preprocessora (np. bez jednej kolumny) to błąd, a nie ciche złe atrybucje
+    with pytest.raises(ValueError, match='encoded features'):
+        explainer.contributions(X[:, :-1])
+
+
+def test_explain_returns_top_k_sorted_by_magnitude(fitted, tmp_path):
+    model, preprocessor, features = fitted
+    explainer = PredictionExplainer(model, preprocessor)
+
+    result = explainer.explain(features.iloc[:50], top_k=3)
+    assert list(result.columns) == ['prediction', 'base_value', 'feature_1', 'contribution_1',
+                                    'feature_2', 'contribution_2', 'feature_3', 'contribution_3']
+    magnitudes = result[['contribution_1', 'contribution_2', 'contribution_3']].abs().to_numpy()
+    assert (np.diff(magnitudes, axis=1) <= 1e-9).all()
+
+    # Zadanie wsadowe na pliku parquet daje ten sam wynik co wywołanie w pamięci
+    input_path = tmp_path / 'songs.parquet'
+    features.iloc[:50].to_parquet(input_path)
+    n_rows = explainer.explain_parquet(str(input_path), str(tmp_path / 'out.parquet'), top_k=3, batch_size=20)
+    written = pd.read_parquet(tmp_path / 'out.parquet')
+    assert n_rows == 50
+    np.testing.assert_allclose(written['prediction'], result['prediction'], rtol=1e-6)
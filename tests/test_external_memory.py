@@ -0,0 +1,56 @@
+import numpy as np
+import pyarrow.parquet as pq
+import xgboost as xgb
+
+from src.external_memory import ExternalMemoryTrainer, ParquetChunkIter, open_dataset
+from src.feature_store import FeatureStore
+from src.preprocessors import SpotifyPipelinePreprocessor
+from src.synthetic import make_synthetic_tracks, write_synthetic_parquet
+
+
+def test_chunk_iterator_splits_holdout_deterministically(tmp_path):
+    path = write_synthetic_parquet(tmp_path / 'clean.parquet', 3000, chunk_size=1000, n_genres=5)
+    preprocessor = SpotifyPipelinePreprocessor(target_col='popularity', test_size=0.2, random_state=42)
+    preprocessor.process(pq.read_table(path).to_pandas())
+    dataset = open_dataset(str(path))
+
+    def collect(use_holdout):
+        iterator = ParquetChunkIter(dataset, preprocessor, cache_prefix='', batch_rows=400, holdout=0.2,
+                                    use_holdout=use_holdout)
+        return [np.concatenate(parts) for parts in zip(*iterator.chunks_with_labels())]
+
+    X_train, y_train = collect(False)
+    X_holdout, y_holdout = collect(True)
+    assert len(y_train) + len(y_holdout) == dataset.count_rows()
+    assert 0.1 < len(y_holdout) / dataset.count_rows() < 0.3
+    assert X_train.shape[1] == X_holdout.shape[1]
+    np.testing.assert_array_equal(collect(True)[1], y_holdout)
+
+
+def test_external_memory_training_reports_throughput_and_memory(tmp_path):
+    path = str(write_synthetic_parquet(tmp_path / 'clean.parquet', 4000, chunk_size=1500, n_genres=5))
+    trainer = ExternalMemoryTrainer(batch_rows=700, sample_rows=1500, cache_dir=str(tmp_path))
+    preprocessor = trainer.fit_preprocessor(path, SpotifyPipelinePreprocessor(target_col='popularity'))
+
+    model = trainer.train(xgb.XGBRegressor(n_estimators=20, max_depth=4), path, preprocessor)
+
+    report = trainer.report
+    assert report['rows'] + report['holdout']['rows'] == open_dataset(path).count_rows()
+    assert report['rows_per_s'] > 0 and report['peak_rss_mb'] > 0 and report['cache_mb'] > 0
+    assert report['holdout']['rmse'] < 20
+    assert model.get_booster().num_boosted_rounds() == 20
+    assert [p.name for p in tmp_path.iterdir()] == ['clean.parquet']
+
+
+def test_training_from_feature_store_uses_only_feature_columns(tmp_path):
+    store = FeatureStore(str(tmp_path / 'store'))
+    store.ingest(make_synthetic_tracks(3000, n_genres=5))
+    trainer = ExternalMemoryTrainer(batch_rows=500, sample_rows=1000, cache_dir=str(tmp_path))
+
+    preprocessor = trainer.fit_preprocessor(store.cleaned_dir, SpotifyPipelinePreprocessor(target_col='popularity'))
+    model = trainer.train(xgb.XGBRegressor(n_estimators=5, max_depth=3), store.cleaned_dir, preprocessor)
+
+    assert not {'track_id', 'ingest_date'} & set(preprocessor.pipeline.feature_names_in_)
+    # 14 cech numerycznych + One-Hot 5 gatunków
+    assert len(preprocessor.pipeline.get_feature_names_out()) == model.n_features_in_ == 19
+    assert trainer.report['rows'] > 0
@@ -0,0 +1,64 @@
+import numpy as np
+import pytest
+
+from src.cleaners import SpotifyDataCleaner
+from src.feature_store import FeatureStore
+from src.preprocessors import SpotifyPipelinePreprocessor
+from src.synthetic import make_synthetic_tracks
+
+
+@pytest.fixture
+def fitted_preprocessor():
+    raw = make_synthetic_tracks(2000, n_genres=6)
+    preprocessor = SpotifyPipelinePreprocessor(target_col='popularity', test_size=0.2, random_state=42)
+    preprocessor.process(SpotifyDataCleaner().clean(raw))
+    return raw, preprocessor
+
+
+def test_ingest_processes_only_new_tracks(tmp_path, fitted_preprocessor):
+    raw, preprocessor = fitted_preprocessor
+    store = FeatureStore(str(tmp_path))
+
+    first = store.ingest(raw.iloc[:1000], ingest_date='2026-01-01')
+    assert store.encode(preprocessor, 'v1') == first
+
+    second = store.ingest(raw, ingest_date='2026-01-02')
+    assert first + second == len(SpotifyDataCleaner().clean(raw))
+    assert store.encode(preprocessor, 'v1') == second
+
+    # Ponowny ingest tych samych danych niczego nie dopisuje
+    assert store.ingest(raw, ingest_date='2026-01-03') == 0
+    assert store.encode(preprocessor, 'v1') == 0
+
+
+def test_read_features_matches_direct_transform_with_pruning(tmp_path, fitted_preprocessor):
+    raw, preprocessor = fitted_preprocessor
+    store = FeatureStore(str(tmp_path))
+    store.ingest(raw.iloc[:1000], ingest_date='2026-01-01')
+    store.ingest(raw, ingest_date='2026-01-02')
+    store.encode(preprocessor, 'v1')
+
+    X, y, track_ids = store.read_features('v1', genres=['pop', 'rock'], since='2026-01-02')
+    clean = SpotifyDataCleaner(keep_track_id=True).clean(raw).loc[track_ids]
+
+    assert len(X) > 0 and set(clean['track_genre']) <= {'pop', 'rock'}
+    np.testing.assert_array_equal(X, preprocessor.transform_new_data(clean.drop(columns=['popularity'])))
+    np.testing.assert_array_equal(y, clean['popularity'].to_numpy())
+
+    X_scoring, y_scoring, _ = store.read_features('v1', with_target=False, features=['energy', 'tempo'])
+    assert X_scoring.shape[1] == 2 and y_scoring is None
+
+    cleaned = store.read_cleaned(genres=['pop'], columns=['energy'])
+    assert list(cleaned.columns) == ['energy'] and cleaned.index.name == 'track_id'
+
+
+def test_encode_rejects_different_preprocessor_for_same_version(tmp_path, fitted_preprocessor):
+    raw, preprocessor = fitted_preprocessor
+    store = FeatureStore(str(tmp_path))
+    store.ingest(raw)
+    store.encode(preprocessor, 'v1')
+
+    other = SpotifyPipelinePreprocessor(target_col='popularity')
+    other.process(SpotifyDataCleaner().clean(make_synthetic_tracks(500, n_genres=3)))
+    with pytest.raises(ValueError, match="different preprocessor"):
+        store.encode(other, 'v1')
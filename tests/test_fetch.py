@@ -0,0 +1,136 @@
+import hashlib
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pandas as pd
+import pytest
+
+from src.fetch import DatasetMirror, resolve_url
+from src.loaders import HuggingFaceCSVDataLoader
+from src.synthetic import make_synthetic_tracks
+
+
+class _RangeServer:
+    """
+    Lokalny serwer HTTP z obsługą Range, licznikiem zapytań i opcjonalnym zrywaniem połączeń.
+    Ścieżki `/resolve/...` przekierowują (302) jak Hugging Face, z nagłówkami X-Linked-* tylko w przekierowaniu.
+    """
+
+    def __init__(self, body: bytes, fail_first: int = 0, linked_etag: str = ''):
+        self.body = body
+        self.requests = []
+        self.fail_first = fail_first
+        self.linked_etag = linked_etag
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_HEAD(self):
+                if self.path.startswith('/resolve/'):
+                    self.send_response(302)
+                    self.send_header('Location', '/cdn/' + self.path.removeprefix('/resolve/'))
+                    self.send_header('X-Linked-Etag', f'"{server.linked_etag}"')
+                    self.send_header('X-Linked-Size', str(len(server.body)))
+                    self.end_headers()
+                    return
+                self.send_response(200)
+                self.send_header('Content-Length', str(len(server.body)))
+                self.send_header('Accept-Ranges', 'bytes')
+                self.end_headers()
+
+            def do_GET(self):
+                server.requests.append(self.headers.get('Range'))
+                start, end = 0, len(server.body) - 1
+                if self.headers.get('Range'):
+                    start, end = (int(v) for v in self.headers['Range'].removeprefix('bytes=').split('-'))
+                payload = server.body[start:end + 1]
+                self.send_response(206 if self.headers.get('Range') else 200)
+                self.send_header('Content-Length', str(len(payload)))
+                self.end_headers()
+                if server.fail_first > 0:
+                    # Zerwane połączenie w połowie fragmentu
+                    server.fail_first -= 1
+                    self.wfile.write(payload[:len(payload) // 2])
+                    return
+                self.wfile.write(payload)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.url = f'http://127.0.0.1:{self.httpd.server_port}/dataset.csv'
+        self.resolve_url = f'http://127.0.0.1:{self.httpd.server_port}/resolve/dataset.csv'
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+@pytest.fixture
+def csv_body():
+    return make_synthetic_tracks(300).to_csv(index=False).encode()
+
+
+def test_resolve_url_maps_hf_uri():
+    url = resolve_url('hf://datasets/owner/name/dir/dataset.csv')
+    assert url.endswith('/datasets/owner/name/resolve/main/dir/dataset.csv')
+    assert resolve_url('http://example.com/a.csv') == 'http://example.com/a.csv'
+
+
+def test_parallel_download_with_retry_then_offline_reuse(csv_body, tmp_path):
+    server = _RangeServer(csv_body, fail_first=2)
+    sha256 = hashlib.sha256(csv_body).hexdigest()
+    mirror = DatasetMirror(str(tmp_path / 'mirror'), chunk_size=4096, max_workers=4, retries=3)
+    try:
+        path = mirror.fetch(server.url, sha256=sha256)
+    finally:
+        server.close()
+
+    assert path.read_bytes() == csv_body and path.name == sha256
+    assert len([r for r in server.requests if r]) > len(csv_body) // 4096
+    assert not (tmp_path / 'mirror' / 'partial').exists() or not any((tmp_path / 'mirror' / 'partial').iterdir())
+
+    # Serwer jest wyłączony - drugie uruchomienie korzysta wyłącznie z lustra
+    loader = HuggingFaceCSVDataLoader(server.url, mirror_dir=str(tmp_path / 'mirror'))
+    pd.testing.assert_frame_equal(loader.load(), pd.read_csv(path))
+
+
+def test_resume_skips_completed_chunks_and_checksum_is_enforced(csv_body, tmp_path):
+    server = _RangeServer(csv_body)
+    mirror = DatasetMirror(str(tmp_path / 'mirror'), chunk_size=4096, max_workers=2, retries=0)
+    try:
+        with pytest.raises(ValueError, match='Checksum mismatch'):
+            mirror.fetch(server.url, sha256='0' * 64)
+
+        # Symulacja przerwanego pobierania: pierwszy fragment pełny, drugi w połowie
+        partial = next((tmp_path / 'mirror' / 'partial').iterdir())
+        (partial / 'chunk_00000').write_bytes(csv_body[:4096])
+        (partial / 'chunk_00001').write_bytes(csv_body[4096:6000])
+        server.requests.clear()
+
+        path = mirror.fetch(server.url)
+    finally:
+        server.close()
+
+    assert path.read_bytes() == csv_body
+    assert 'bytes=0-4095' not in server.requests
+    assert 'bytes=6000-8191' in server.requests
+
+
+def test_checksum_comes_from_linked_headers_of_the_redirect(csv_body, tmp_path):
+    sha256 = hashlib.sha256(csv_body).hexdigest()
+    server = _RangeServer(csv_body, linked_etag='0' * 64)
+    try:
+        with pytest.raises(ValueError, match='Checksum mismatch'):
+            DatasetMirror(str(tmp_path / 'bad'), chunk_size=4096).fetch(server.resolve_url)
+
+        server.linked_etag = sha256
+        mirror = DatasetMirror(str(tmp_path / 'mirror'), chunk_size=4096)
+        path = mirror.fetch(server.resolve_url)
+    finally:
+        server.close()
+
+    assert path.read_bytes() == csv_body and path.name == sha256
+    assert mirror._read_index()[server.resolve_url]['etag'] == sha256
+    # Rozmiar z X-Linked-Size pozwala pobierać fragmentami mimo przekierowania
+    assert len([r for r in server.requests if r]) > 1
@@ -0,0 +1,45 @@
+import pandas as pd
+import pytest
+
+from src.benchmarks import compare_csv_loaders
+from src.loaders import LocalCSVDataLoader
+from src.synthetic import write_synthetic_csv
+
+
+def test_parallel_loader_matches_pandas(tmp_path):
+    path = write_synthetic_csv(tmp_path / 'tracks.csv', 3000, n_genres=8)
+
+    expected = pd.read_csv(path, float_precision='round_trip')
+    # Mały blok wymusza podział pliku na wiele fragmentów parsowanych równolegle
+    df = LocalCSVDataLoader(path, engine='pyarrow', block_size=16 * 1024).load()
+
+    assert isinstance(df['track_genre'].dtype, pd.CategoricalDtype)
+    pd.testing.assert_frame_equal(df.astype({'track_genre': expected['track_genre'].dtype}), expected)
+
+
+def test_parallel_loader_keeps_missing_strings_and_unnamed_index(tmp_path, sample_raw_data):
+    raw = sample_raw_data.copy()
+    raw.loc[1, 'artists'] = None
+    raw.to_csv(tmp_path / 'raw.csv')
+
+    df = LocalCSVDataLoader(tmp_path / 'raw.csv', engine='pyarrow').load()
+
+    assert list(df.columns) == ['Unnamed: 0'] + list(sample_raw_data.columns)
+    assert df['artists'].isna().sum() == 1
+    assert df['explicit'].dtype == bool
+
+
+def test_unknown_engine_is_rejected(tmp_path):
+    with pytest.raises(ValueError, match="Unsupported engine"):
+        LocalCSVDataLoader(tmp_path / 'x.csv', engine='polars')
+
+
+def test_compare_csv_loaders_reports_throughput(tmp_path):
+    path = write_synthetic_csv(tmp_path / 'tracks.csv', 2000, n_genres=8)
+
+    results = compare_csv_loaders(str(path), repeats=1)
+
+    for engine in ('pandas', 'pyarrow'):
+        assert results['loaders'][engine]['rows'] == 2000
+        assert results['loaders'][engine]['mb_per_s'] > 0
+    assert results['speedup'] > 0
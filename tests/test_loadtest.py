@@ -0,0 +1,67 @@
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.loadtest import HttpTarget, InProcessTarget, LoadTester, check_slo, find_capacity, parse_batch_mix, parse_slo
+from src.serving import serve_predictions
+
+
+class _SleepyPredictor:
+    """Predykcja trwa `delay` sekund; utwory bez kolumny tempo dają błąd jak w prawdziwym preprocessorze."""
+
+    def __init__(self, delay: float = 0.001, fail: bool = False):
+        self.delay = delay
+        self.fail = fail
+
+    def predict_batch(self, df: pd.DataFrame) -> np.ndarray:
+        if self.fail or 'tempo' not in df.columns:
+            raise ValueError("columns are missing: {'tempo'}")
+        time.sleep(self.delay)
+        return df['tempo'].to_numpy(dtype=float)
+
+
+def test_parsers_accept_mix_and_latency_objectives():
+    assert parse_batch_mix('1:0.7,10:0.2,100') == {1: 0.7, 10: 0.2, 100: 1.0}
+    assert parse_slo('p99<20ms') == ('p99_ms', 20.0)
+    assert parse_slo(' max < 250 ') == ('max_ms', 250.0)
+    with pytest.raises(ValueError):
+        parse_slo('p99>20ms')
+    with pytest.raises(ValueError):
+        parse_batch_mix('0:1')
+
+
+def test_closed_loop_report_covers_batch_mix_and_slo_verdict():
+    tester = LoadTester(InProcessTarget(_SleepyPredictor()), concurrency=2, duration=0.5, warmup=0.1,
+                        batch_mix={1: 0.5, 20: 0.5}, sample_interval=0.1, pool_size=100)
+
+    report = tester.run()
+
+    assert report['mode'] == 'closed' and report['errors'] == 0 and report['requests'] > 20
+    assert set(report['latency_by_batch']) == {'1', '20'}
+    assert sum(bucket['count'] for bucket in report['histogram']) == report['requests']
+    assert report['throughput']['predictions_per_s'] > report['throughput']['requests_per_s']
+    assert report['timeline'] and report['resources']['rss_max_mb'] > 0
+    assert check_slo(report, ['p99<1000ms'])['passed']
+    assert not check_slo(report, ['p50<0.001ms'])['passed']
+
+
+def test_http_endpoint_open_loop_counts_errors_and_finds_capacity():
+    server = serve_predictions(_SleepyPredictor(), port=0)
+    broken = serve_predictions(_SleepyPredictor(fail=True), port=0)
+    try:
+        tester = LoadTester(HttpTarget(f'http://127.0.0.1:{server.server_port}/predict'), concurrency=2,
+                            duration=0.5, warmup=0.1, pool_size=100)
+        result = find_capacity(tester, [40, 20], ['p99<1000ms'])
+        assert [step['rate'] for step in result['steps']] == [20, 40]
+        assert result['capacity']['rate'] == 40
+        assert 5 < result['steps'][0]['requests'] < 20
+
+        failing = LoadTester(HttpTarget(f'http://127.0.0.1:{broken.server_port}/predict'), concurrency=1,
+                             rate=20, duration=0.3, warmup=0.0, pool_size=100).run()
+        assert failing['errors'] == failing['requests'] > 0
+        assert not check_slo(failing)['passed']
+    finally:
+        server.shutdown()
+        broken.shutdown()
@@ -0,0 +1,66 @@
+import json
+
+import xgboost as xgb
+
+from src.cleaners import SpotifyDataCleaner
+from src.manifest import RunManifest, compare_manifests, dataset_fingerprint
+from src.pipeline import PipelineRunner
+from src.preprocessors import SpotifyPipelinePreprocessor
+from src.synthetic import make_synthetic_tracks
+
+
+def _training_run(tmp_path, name, deterministic, threads=None):
+    manifest = RunManifest(name, deterministic=deterministic, threads=threads)
+    cleaner = SpotifyDataCleaner()
+    preprocessor = SpotifyPipelinePreprocessor(target_col='popularity', random_state=manifest.seed)
+
+    pipeline = PipelineRunner(name, report_dir=str(tmp_path / 'reports'))
+    pipeline.add_stage('clean', lambda: cleaner.clean(make_synthetic_tracks(1500, n_genres=6)))
+    pipeline.add_stage('fingerprint', manifest.record_dataset, deps=['clean'])
+    pipeline.add_stage('preprocess', preprocessor.process, deps=['clean'])
+    pipeline.add_stage('train', lambda data: xgb.XGBRegressor(
+        n_estimators=20, max_depth=4, subsample=0.8, n_jobs=manifest.n_jobs,
+        random_state=manifest.seed).fit(data[0], data[2]), deps=['preprocess'])
+    results = pipeline.run()
+
+    model, data = results['train'], results['preprocess']
+    manifest.record_cleaner(cleaner)
+    manifest.record_preprocessor(preprocessor)
+    manifest.record_model(model)
+    manifest.record_pipeline(pipeline.report)
+    manifest.record_metrics({'rmse': 1.0, 'mae': 0.5, 'r2': 0.1}, model.predict(data[1]))
+    return manifest.save(str(tmp_path / 'runs'))
+
+
+def test_manifest_records_every_section(tmp_path):
+    with open(_training_run(tmp_path, 'training_a', deterministic=True, threads=2)) as f:
+        manifest = json.load(f)
+
+    assert manifest['deterministic'] and manifest['threads']['model_n_jobs'] == 2
+    assert manifest['dataset']['rows'] > 0 and len(manifest['dataset']['sha256']) == 64
+    assert manifest['cleaner']['keep_track_id'] is False
+    assert manifest['preprocessor']['test_size'] == 0.2
+    assert 'track_genre' in manifest['preprocessor']['transformers']['cat']
+    assert manifest['model']['params']['max_depth'] == 4
+    assert manifest['timings']['stages']['train']['status'] == 'done'
+    assert manifest['libraries']['xgboost'] == xgb.__version__
+
+
+def test_deterministic_runs_with_different_threads_are_comparable(tmp_path):
+    baseline = _training_run(tmp_path, 'training_1', deterministic=True, threads=1)
+    candidate = _training_run(tmp_path, 'training_2', deterministic=True, threads=2)
+
+    with open(baseline) as a, open(candidate) as b:
+        result = compare_manifests(json.load(a), json.load(b))
+
+    assert result['same_dataset'] and result['same_predictions']
+    assert result['changed_params'] == []
+    assert set(result['stage_speedups']) >= {'clean', 'preprocess', 'train'}
+
+
+def test_dataset_fingerprint_detects_content_changes(sample_clean_data):
+    changed = sample_clean_data.copy()
+    changed.loc[changed.index[0], 'tempo'] += 0.001
+
+    assert dataset_fingerprint(sample_clean_data) == dataset_fingerprint(sample_clean_data.copy())
+    assert dataset_fingerprint(changed)['sha256'] != dataset_fingerprint(sample_clean_data)['sha256']
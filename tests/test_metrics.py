@@ -0,0 +1,69 @@
+import json
+import logging
+
+import pytest
+
+from src.cleaners import SpotifyDataCleaner
+from src.metrics import MetricsRegistry, events_logger, metrics
+
+
+def test_timer_records_histogram_as_context_manager_and_decorator():
+    registry = MetricsRegistry()
+
+    with registry.timer('op_seconds', stage='a') as timer:
+        pass
+
+    @registry.timer('op_seconds', stage='b')
+    def work():
+        return 42
+
+    assert work() == 42
+    assert timer.elapsed >= 0
+
+    snapshot = registry.snapshot()['histograms']['op_seconds']
+    assert {tuple(s['labels'].items()): s['count'] for s in snapshot} == {(('stage', 'a'),): 1, (('stage', 'b'),): 1}
+
+
+def test_timer_marks_failed_calls():
+    registry = MetricsRegistry()
+
+    with pytest.raises(ValueError):
+        with registry.timer('op_seconds'):
+            raise ValueError("boom")
+
+    labels = registry.snapshot()['histograms']['op_seconds'][0]['labels']
+    assert labels == {'status': 'error'}
+
+
+def test_prometheus_export_format():
+    registry = MetricsRegistry()
+    registry.describe('rows_total', 'Liczba wierszy.')
+    registry.inc('rows_total', 10, stage='load')
+    registry.observe('latency_seconds', 0.003)
+    registry.observe('latency_seconds', 2.0)
+
+    text = registry.to_prometheus()
+
+    assert '# HELP rows_total Liczba wierszy.' in text
+    assert '# TYPE rows_total counter' in text
+    assert 'rows_total{stage="load"} 10' in text
+    assert 'latency_seconds_bucket{le="0.005"} 1' in text
+    assert 'latency_seconds_bucket{le="+Inf"} 2' in text
+    assert 'latency_seconds_count 2' in text
+
+
+def test_json_log_and_cleaner_instrumentation(tmp_path, sample_raw_data):
+    log_path = tmp_path / 'metrics.jsonl'
+    handler = metrics.enable_json_log(str(log_path))
+    try:
+        SpotifyDataCleaner().clean(sample_raw_data)
+    finally:
+        events_logger.removeHandler(handler)
+        events_logger.setLevel(logging.NOTSET)
+        handler.close()
+
+    events = [json.loads(line) for line in log_path.read_text().splitlines()]
+    steps = {e['labels']['step'] for e in events if e['metric'] == 'spotify_clean_step_seconds'}
+
+    assert 'remove_duplicates' in steps
+    assert any(e['metric'] == 'spotify_clean_rows_removed_total' and e['value'] == 1 for e in events)
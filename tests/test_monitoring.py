@@ -0,0 +1,89 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import xgboost as xgb
+
+from src.cleaners import SpotifyDataCleaner
+from src.monitoring import DriftMonitor, psi
+from src.predictors import SpotifyPredictor
+from src.preprocessors import SpotifyPipelinePreprocessor
+from src.serializers import ModelSerializer
+from src.synthetic import make_synthetic_tracks
+
+
+def _fit(n_rows=5000):
+    df = SpotifyDataCleaner().clean(make_synthetic_tracks(n_rows, n_genres=12))
+    preprocessor = SpotifyPipelinePreprocessor(target_col='popularity', test_size=0.2, random_state=42)
+    data = preprocessor.process(df)
+    return preprocessor, data, df.drop(columns=['popularity'])
+
+
+def test_psi_is_zero_for_identical_distributions():
+    p = np.array([0.2, 0.3, 0.5])
+    assert psi(p, p) == 0.0
+    assert psi(p, np.array([0.5, 0.3, 0.2])) > 0.2
+
+
+def test_monitor_flags_shifted_and_unknown_values_only():
+    preprocessor, _, features = _fit()
+    monitor = DriftMonitor(preprocessor.reference_profile, sample_size=None)
+
+    report = monitor.observe(features.iloc[:2000])
+    assert not any(stats['drift'] for stats in report.values())
+
+    shifted = features.iloc[:2000].astype({'track_genre': object})
+    shifted['tempo'] = shifted['tempo'] * 1.5
+    shifted.loc[shifted.index[:500], 'track_genre'] = 'unseen-genre'
+    shifted.loc[shifted.index[:10], 'loudness'] = np.nan
+
+    report = monitor.observe(shifted)
+    assert report['tempo']['drift'] and report['tempo']['out_of_range'] > 0
+    assert report['track_genre']['unknown'] == 500 and report['track_genre']['drift']
+    assert report['loudness']['missing'] == 10 and not report['loudness']['drift']
+
+    # Szkice sumują obie partie
+    assert monitor.summary()['track_genre']['rows'] == 4000
+
+
+def test_sampled_psi_counts_rare_unknown_genres_on_the_sample():
+    """Domyślna próbka (2048 wierszy): rzadkie nieznane gatunki nie mogą dać fałszywego alarmu PSI."""
+    preprocessor, _, _ = _fit()
+    features = SpotifyDataCleaner().clean(make_synthetic_tracks(20_000, seed=7, n_genres=12)).drop(
+        columns=['popularity']).astype({'track_genre': object})
+    features.loc[features.index[::100], 'track_genre'] = 'unseen-genre'
+    monitor = DriftMonitor(preprocessor.reference_profile)
+
+    report = monitor.observe(features)
+
+    assert report['track_genre']['unknown'] == len(features.index[::100])
+    assert not report['track_genre']['drift'] and report['track_genre']['psi'] < 0.1
+    assert not monitor.summary()['track_genre']['drift']
+
+
+def test_shared_monitor_keeps_exact_counts_across_threads():
+    preprocessor, _, features = _fit()
+    monitor = DriftMonitor(preprocessor.reference_profile, sample_size=200, min_rows=50)
+    batches = [features.iloc[i:i + 300] for i in range(0, 3000, 300)] * 8
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        list(executor.map(monitor.observe, batches))
+
+    summary = monitor.summary()
+    assert summary['tempo']['rows'] == summary['track_genre']['rows'] == 300 * len(batches)
+    # Każda partia dokłada do rozkładu dokładnie `sample_size` wierszy próbki
+    assert monitor._numeric['tempo'].counts.sum() == 200 * len(batches)
+    assert set(monitor.last_report) == set(summary)
+
+
+def test_predictor_runs_drift_monitor_on_batches(tmp_path):
+    preprocessor, data, features = _fit(2000)
+    model = xgb.XGBRegressor(n_estimators=5, max_depth=3).fit(data[0], data[2])
+    serializer = ModelSerializer(base_dir=str(tmp_path))
+    serializer.save(model, 'model.joblib')
+    serializer.save(preprocessor, 'preprocessor.joblib')
+
+    predictor = SpotifyPredictor('model.joblib', 'preprocessor.joblib', base_dir=str(tmp_path), monitor_drift=True)
+    predictor.predict_batch(features.iloc[:500])
+
+    assert set(predictor.last_drift_report) == set(features.columns) - {'track_id', 'artists', 'album_name',
+                                                                        'track_name'}
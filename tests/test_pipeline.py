@@ -0,0 +1,90 @@
+import json
+import os
+import threading
+
+import pytest
+
+from src.pipeline import PipelineRunner
+
+
+def test_pipeline_passes_results_between_stages(tmp_path):
+    pipeline = PipelineRunner('test', report_dir=str(tmp_path))
+    pipeline.add_stage('a', lambda: 2)
+    pipeline.add_stage('b', lambda a: a * 10, deps=['a'])
+    pipeline.add_stage('c', lambda a, b: a + b, deps=['a', 'b'])
+
+    results = pipeline.run()
+
+    assert results == {'a': 2, 'b': 20, 'c': 22}
+
+
+def test_pipeline_runs_independent_stages_concurrently(tmp_path):
+    # Oba etapy czekają na siebie nawzajem - zakończą się tylko przy równoległym wykonaniu
+    barrier = threading.Barrier(2, timeout=5)
+    pipeline = PipelineRunner('test', max_workers=2, report_dir=str(tmp_path))
+    pipeline.add_stage('source', lambda: 1)
+    pipeline.add_stage('left', lambda _: barrier.wait(), deps=['source'])
+    pipeline.add_stage('right', lambda _: barrier.wait(), deps=['source'])
+
+    pipeline.run()
+
+    assert pipeline.report['stages']['left']['status'] == 'done'
+    assert pipeline.report['stages']['right']['status'] == 'done'
+
+
+def test_pipeline_skips_up_to_date_stages(tmp_path):
+    output = tmp_path / 'data.txt'
+    output.write_text('cached')
+    calls = []
+
+    pipeline = PipelineRunner('test', report_dir=str(tmp_path))
+    pipeline.add_stage('load', lambda: calls.append('load'))
+    pipeline.add_stage('clean', lambda _: calls.append('clean'), deps=['load'],
+                       outputs=[str(output)], restore=output.read_text)
+    pipeline.add_stage('use', lambda text: text.upper(), deps=['clean'])
+
+    results = pipeline.run()
+
+    assert calls == []
+    assert results['use'] == 'CACHED'
+    assert pipeline.report['stages']['clean']['status'] == 'skipped'
+
+
+def test_pipeline_writes_report_and_cancels_after_failure(tmp_path):
+    def fail(_):
+        raise RuntimeError("boom")
+
+    pipeline = PipelineRunner('test', report_dir=str(tmp_path))
+    pipeline.add_stage('a', lambda: 1)
+    pipeline.add_stage('b', fail, deps=['a'])
+    pipeline.add_stage('c', lambda b: b, deps=['b'])
+
+    with pytest.raises(RuntimeError):
+        pipeline.run()
+
+    reports = [f for f in os.listdir(tmp_path) if f.endswith('.json')]
+    assert len(reports) == 1
+    with open(tmp_path / reports[0]) as f:
+        report = json.load(f)
+
+    assert report['stages']['a']['status'] == 'done'
+    assert report['stages']['b']['status'] == 'failed'
+    assert report['stages']['c']['status'] == 'cancelled'
+    assert 'peak_rss_mb' in report['stages']['a']
+
+
+def test_failed_inline_stage_cancels_other_inline_stages(tmp_path):
+    def fail():
+        raise RuntimeError("boom")
+
+    pipeline = PipelineRunner('test', report_dir=str(tmp_path))
+    pipeline.add_stage('a', fail, main_thread=True)
+    pipeline.add_stage('b', lambda: 1, main_thread=True)
+
+    with pytest.raises(RuntimeError):
+        pipeline.run()
+
+    with open(tmp_path / next(f for f in os.listdir(tmp_path) if f.endswith('.json'))) as f:
+        stages = json.load(f)['stages']
+    assert stages['a']['status'] == 'failed'
+    assert stages['b'] == {'status': 'cancelled'}
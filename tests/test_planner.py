@@ -0,0 +1,38 @@
+import numpy as np
+import pytest
+import xgboost as xgb
+
+from src.cleaners import SpotifyDataCleaner
+from src.planner import TrainingPlan, TrainingPlanner, fit_learning_curve, predict_rmse, rows_for_rmse
+from src.preprocessors import SpotifyPipelinePreprocessor
+from src.synthetic import make_synthetic_tracks
+
+
+def test_learning_curve_fit_recovers_power_law():
+    n_rows = np.array([1_000, 2_000, 5_000, 10_000, 20_000])
+    rmse = 9.0 + 40.0 * n_rows ** -0.5
+
+    curve = fit_learning_curve(n_rows, rmse)
+
+    np.testing.assert_allclose(predict_rmse(curve, 80_000), 9.0 + 40.0 * 80_000 ** -0.5, rtol=1e-3)
+    assert rows_for_rmse(curve, predict_rmse(curve, 7_000)) == pytest.approx(7_000, rel=1e-6)
+    assert rows_for_rmse(curve, curve['a']) == float('inf')
+
+
+def test_planner_recommends_budget_and_plan_round_trips(tmp_path):
+    df = SpotifyDataCleaner().clean(make_synthetic_tracks(4000, n_genres=6))
+    preprocessor = SpotifyPipelinePreprocessor(target_col='popularity', test_size=0.2, random_state=42)
+    X_train, _, y_train, _ = preprocessor.process(df)
+    planner = TrainingPlanner(lambda n: xgb.XGBRegressor(n_estimators=60, max_depth=4, learning_rate=0.2, n_jobs=n),
+                              fractions=[0.1, 0.3, 0.6], tolerance=0.05, n_checkpoints=10)
+
+    plan = planner.plan(X_train, y_train)
+
+    assert [run['fraction'] for run in plan.grid] == [0.1, 0.3, 0.6]
+    assert 0.1 <= plan.data_fraction <= 1.0
+    assert 1 <= plan.n_estimators <= 60
+    X_sample, y_sample = plan.subsample(X_train, y_train)
+    assert len(X_sample) == len(y_sample) == round(len(X_train) * plan.data_fraction)
+
+    loaded = TrainingPlan.load(plan.save(str(tmp_path / 'plan.json')))
+    assert loaded.to_dict() == plan.to_dict()
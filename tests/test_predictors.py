@@ -0,0 +1,120 @@
+import threading
+
+import numpy as np
+import pandas as pd
+import pytest
+import xgboost as xgb
+
+from src.cleaners import SpotifyDataCleaner
+from src.metrics import metrics
+from src.predictors import SpotifyPredictor
+from src.preprocessors import SpotifyPipelinePreprocessor
+from src.serializers import ModelSerializer
+from src.synthetic import make_synthetic_tracks, sample_songs
+
+_RELEASE = threading.Event()
+_ENTERED = threading.Event()
+
+
+class _GatedModel:
+    """Model, którego predykcja czeka na sygnał - symuluje partię w trakcie przetwarzania."""
+
+    def __init__(self, offset: float):
+        self.offset = offset
+
+    def predict(self, X):
+        _ENTERED.set()
+        _RELEASE.wait(timeout=10)
+        return np.full(len(X), self.offset)
+
+
+@pytest.fixture
+def artifacts(tmp_path):
+    df = SpotifyDataCleaner().clean(make_synthetic_tracks(800, n_genres=6))
+    preprocessor = SpotifyPipelinePreprocessor(target_col='popularity', test_size=0.2, random_state=42)
+    X_train, _, y_train, _ = preprocessor.process(df)
+    models = [xgb.XGBRegressor(n_estimators=n, max_depth=3, random_state=42).fit(X_train, y_train) for n in (5, 20)]
+    return ModelSerializer(base_dir=str(tmp_path)), preprocessor, models
+
+
+def _save_pair(serializer, version, model, preprocessor):
+    serializer.save(preprocessor, f'spotify-preprocessor_{version}.joblib')
+    serializer.save(model, f'spotify-xgb-model_{version}.joblib')
+
+
+def test_predictor_swaps_to_new_verified_pair(artifacts):
+    serializer, preprocessor, (old_model, new_model) = artifacts
+    _save_pair(serializer, 'v1', old_model, preprocessor)
+    predictor = SpotifyPredictor('spotify-xgb-model_v1.joblib', 'spotify-preprocessor_v1.joblib',
+                                 base_dir=serializer.base_dir)
+    songs = pd.DataFrame(sample_songs(50, n_genres=6))
+
+    # Model bez preprocessora w tej samej wersji to para niekompletna
+    serializer.save(new_model, 'spotify-xgb-model_v2.joblib')
+    assert not predictor.check_for_update()
+
+    serializer.save(preprocessor, 'spotify-preprocessor_v2.joblib')
+    serializer.save(new_model, 'spotify-xgb-model_v2.joblib')
+    assert predictor.check_for_update()
+
+    assert predictor.version == 'v2'
+    np.testing.assert_allclose(predictor.predict_batch(songs),
+                               new_model.predict(preprocessor.transform_new_data(songs)))
+    info = {g['labels']['version']: g['value'] for g in metrics.snapshot()['gauges']['spotify_model_info']}
+    assert info['v1'] == 0 and info['v2'] == 1
+    assert not predictor.check_for_update()
+
+
+def test_predictor_rejects_corrupted_artifact(artifacts):
+    serializer, preprocessor, (old_model, new_model) = artifacts
+    _save_pair(serializer, 'v1', old_model, preprocessor)
+    predictor = SpotifyPredictor('spotify-xgb-model_v1.joblib', 'spotify-preprocessor_v1.joblib',
+                                 base_dir=serializer.base_dir)
+
+    _save_pair(serializer, 'v2', new_model, preprocessor)
+    with open(f'{serializer.base_dir}/spotify-xgb-model_v2.joblib', 'r+b') as f:
+        f.seek(100)
+        f.write(b'corrupted')
+
+    assert not predictor.check_for_update()
+    assert predictor.version == 'v1'
+
+
+def test_predictor_stays_on_its_model_variant(artifacts):
+    serializer, preprocessor, (old_model, new_model) = artifacts
+    _save_pair(serializer, 'v1', new_model, preprocessor)
+    serializer.save(old_model, 'spotify-xgb-model_v1.fast.joblib')
+    predictor = SpotifyPredictor('spotify-xgb-model_v1.fast.joblib', 'spotify-preprocessor_v1.joblib',
+                                 base_dir=serializer.base_dir)
+
+    # Pełny model tej samej i nowszej wersji nie zastępuje wariantu .fast
+    _save_pair(serializer, 'v2', new_model, preprocessor)
+    assert not predictor.check_for_update()
+    assert predictor.version == 'v1.fast'
+
+    serializer.save(new_model, 'spotify-xgb-model_v2.fast.joblib')
+    assert predictor.check_for_update()
+    assert predictor.version == 'v2.fast'
+
+
+def test_in_flight_batch_finishes_on_old_model(artifacts):
+    serializer, preprocessor, (_, new_model) = artifacts
+    _save_pair(serializer, 'v1', _GatedModel(offset=-1.0), preprocessor)
+    predictor = SpotifyPredictor('spotify-xgb-model_v1.joblib', 'spotify-preprocessor_v1.joblib',
+                                 base_dir=serializer.base_dir)
+    songs = sample_songs(10, n_genres=6)
+
+    _ENTERED.clear()
+    _RELEASE.clear()
+    result = {}
+    worker = threading.Thread(target=lambda: result.update(old=predictor.predict_batch(songs)))
+    worker.start()
+    assert _ENTERED.wait(timeout=10)
+
+    _save_pair(serializer, 'v2', new_model, preprocessor)
+    assert predictor.check_for_update()
+    _RELEASE.set()
+    worker.join()
+
+    assert (result['old'] == -1.0).all()
+    assert (predictor.predict_batch(songs) != -1.0).all()
@@ -51,4 +51,19 @@ def test_transform_new_data(sample_clean_data):
     assert X_new.shape[0] == 1
 
     # Sprawdzamy czy liczba kolumn zgadza się z liczbą cech po transformacji
-    assert X_new.shape[1] == len(preprocessor.get_feature_names())
\ No newline at end of file
+    assert X_new.shape[1] == len(preprocessor.get_feature_names())
+
+
+def test_get_categories_decodes_one_hot_genres(sample_clean_data):
+    preprocessor = SpotifyPipelinePreprocessor(target_col='popularity', test_size=0.2)
+    preprocessor.process(sample_clean_data)
+
+    features = sample_clean_data.drop(columns=['popularity'])
+    X = preprocessor.transform_new_data(features)
+
+    genres = preprocessor.get_categories(X)
+    known = {name[len('track_genre_'):] for name in preprocessor.get_feature_names() if name.startswith('track_genre_')}
+
+    # Gatunki nieznane z treningu (handle_unknown='ignore') zwracane są jako None
+    expected = [g if g in known else None for g in features['track_genre'].astype(str)]
+    assert list(genres) == expected
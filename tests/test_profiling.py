@@ -0,0 +1,48 @@
+import json
+import os
+import pstats
+import time
+
+from src.pipeline import PipelineRunner
+from src.profiling import StageProfiler
+
+
+def _busy(n: int = 200_000):
+    return sum(i * i for i in range(n))
+
+
+def test_cprofile_mode_writes_stats_and_summary(tmp_path):
+    profiler = StageProfiler(str(tmp_path), mode='cprofile', top_n=5)
+
+    pipeline = PipelineRunner('test', report_dir=str(tmp_path), profiler=profiler)
+    pipeline.add_stage('work', lambda: _busy())
+    pipeline.add_stage('alloc', lambda _: [bytearray(1024) for _ in range(1000)], deps=['work'])
+    pipeline.run()
+    profiler.write_summary()
+
+    # Plik .prof musi być czytelny dla narzędzi opartych o pstats (snakeviz, flameprof)
+    stats = pstats.Stats(str(tmp_path / 'work.prof'))
+    assert any(func == '_busy' for (_, _, func) in stats.stats)
+
+    with open(tmp_path / 'summary.json') as f:
+        summary = json.load(f)
+    assert set(summary) == {'work', 'alloc'}
+    assert len(summary['work']['hot_functions']) <= 5
+    assert summary['alloc']['allocations'][0]['size_kb'] > 0
+    assert pipeline.report['stages']['work']['thread'] == 'MainThread'
+
+
+def test_sampling_mode_writes_folded_stacks(tmp_path):
+    profiler = StageProfiler(str(tmp_path), mode='sampling', sample_interval=0.001)
+
+    with profiler.profile('sleepy'):
+        deadline = time.perf_counter() + 0.2
+        while time.perf_counter() < deadline:
+            _busy(1000)
+
+    lines = (tmp_path / 'sleepy.folded').read_text().splitlines()
+    assert lines
+    stack, count = lines[0].rsplit(' ', 1)
+    assert int(count) > 0
+    assert 'test_sampling_mode_writes_folded_stacks' in stack
+    assert os.path.exists(tmp_path / 'sleepy.alloc.txt')
@@ -21,4 +21,15 @@ def test_serializer_saves_and_loads(tmp_path):
 
     # Sprawdzanie, czy dane są takie same po odczycie
     assert loaded_data == dummy_data
-    assert loaded_data['model_name'] == "test_xgboost"
\ No newline at end of file
+    assert loaded_data['model_name'] == "test_xgboost"
+
+
+def test_serializer_writes_verifiable_checksum(tmp_path):
+    serializer = ModelSerializer(base_dir=str(tmp_path))
+    serializer.save({"weights": [1, 2, 3]}, "model.joblib")
+
+    assert serializer.verify("model.joblib")
+
+    with open(tmp_path / "model.joblib", "ab") as f:
+        f.write(b"truncated write")
+    assert not serializer.verify("model.joblib")
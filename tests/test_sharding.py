@@ -0,0 +1,65 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.cleaners import SpotifyDataCleaner
+from src.predictors import SpotifyPredictor
+from src.preprocessors import SpotifyPipelinePreprocessor
+from src.serializers import ModelSerializer
+from src.sharding import GenreShardedRegressor
+from src.synthetic import make_synthetic_tracks, sample_songs
+
+SMALL = {'n_estimators': 10, 'max_depth': 3, 'learning_rate': 0.3, 'objective': 'reg:squarederror'}
+
+
+@pytest.fixture
+def data():
+    df = SpotifyDataCleaner().clean(make_synthetic_tracks(3000, n_genres=6))
+    preprocessor = SpotifyPipelinePreprocessor(target_col='popularity', test_size=0.2, random_state=42)
+    X_train, X_test, y_train, y_test = preprocessor.process(df)
+    return preprocessor, X_train, X_test, y_train, y_test
+
+
+def test_rows_routed_to_their_genre_model(data):
+    """Każdy wiersz partii dostaje predykcję modelu swojego gatunku, kolejność wierszy jest zachowana."""
+    preprocessor, X_train, X_test, y_train, _ = data
+    model = GenreShardedRegressor.from_preprocessor(preprocessor, shard_by='genre', min_rows=100,
+                                                    shard_params=SMALL).fit(X_train, y_train)
+
+    shard = model.route(X_test)
+    expected = np.array([model.models[s].predict(row[None, :])[0] for s, row in zip(shard, X_test)])
+
+    assert len(model.models) == 7  # 6 gatunków + model globalny
+    np.testing.assert_allclose(model.predict(X_test), expected, rtol=1e-5)
+
+
+def test_rare_and_unknown_genres_use_global_model(data):
+    preprocessor, X_train, X_test, y_train, _ = data
+    genres = preprocessor.get_categories(X_train)
+    rare = pd.Series(genres).value_counts().index[-1]
+    min_rows = int((genres == rare).sum()) + 1
+    model = GenreShardedRegressor.from_preprocessor(preprocessor, shard_by='cluster', n_clusters=2,
+                                                    min_rows=min_rows, shard_params=SMALL).fit(X_train, y_train)
+
+    unknown = X_test[:1].copy()
+    unknown[:, model.genre_columns] = 0
+    is_rare = preprocessor.get_categories(X_test) == rare
+
+    assert model.route(unknown)[0] == model.global_shard
+    assert np.all(model.route(X_test)[is_rare] == model.global_shard)
+    assert model.shards[-1]['genres'] == 'global' and model.shards[-1]['rows'] == len(X_train)
+
+
+def test_predictor_serves_sharded_model(data, tmp_path):
+    preprocessor, X_train, _, y_train, _ = data
+    serializer = ModelSerializer(base_dir=str(tmp_path))
+    model = GenreShardedRegressor.from_preprocessor(preprocessor, min_rows=100, shard_params=SMALL)
+    serializer.save(model.fit(X_train, y_train), 'spotify-xgb-model_v1.sharded.joblib')
+    serializer.save(preprocessor, 'spotify-preprocessor_v1.joblib')
+
+    predictor = SpotifyPredictor('spotify-xgb-model_v1.sharded.joblib', 'spotify-preprocessor_v1.joblib',
+                                 base_dir=str(tmp_path))
+    songs = sample_songs(50, n_genres=6)
+
+    np.testing.assert_allclose(predictor.predict_batch(songs),
+                               model.predict(preprocessor.transform_new_data(pd.DataFrame(songs))))
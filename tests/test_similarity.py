@@ -0,0 +1,76 @@
+import numpy as np
+import pytest
+import xgboost as xgb
+
+from src.cleaners import SpotifyDataCleaner
+from src.predictors import SpotifyPredictor
+from src.preprocessors import SpotifyPipelinePreprocessor
+from src.serializers import ModelSerializer
+from src.similarity import SimilarTracksIndex, brute_force_neighbours, training_metadata
+from src.synthetic import make_synthetic_tracks, sample_songs
+
+
+@pytest.fixture
+def catalog():
+    raw = make_synthetic_tracks(2000, n_genres=8)
+    clean = SpotifyDataCleaner().clean(raw)
+    preprocessor = SpotifyPipelinePreprocessor(target_col='popularity', test_size=0.2, random_state=42)
+    X_train, X_test, y_train, _ = preprocessor.process(clean)
+    return raw, clean, preprocessor, X_train, X_test, y_train
+
+
+@pytest.mark.parametrize('method', SimilarTracksIndex.METHODS)
+def test_index_matches_brute_force(catalog, method):
+    """KD-tree i IVF przeszukujący wszystkie listy zwracają dokładnych sąsiadów."""
+    _, _, preprocessor, X_train, X_test, y_train = catalog
+    index = SimilarTracksIndex(method=method, n_lists=10, n_probe=10).build(preprocessor, X_train, y_train)
+
+    distances, indices = index.query(X_test[:50], k=5)
+
+    np.testing.assert_array_equal(indices, brute_force_neighbours(index, X_train, X_test[:50], k=5))
+    assert np.all(np.diff(distances, axis=1) >= 0)
+    numeric = preprocessor.pipeline.output_indices_['num']
+    assert index.dimensions == numeric.stop - numeric.start
+
+
+def test_ivf_probes_more_lists_when_probed_ones_are_too_small(catalog):
+    _, _, preprocessor, X_train, X_test, y_train = catalog
+    index = SimilarTracksIndex(method='ivf', n_probe=1).build(preprocessor, X_train, y_train)
+
+    distances, indices = index.query(X_test[:20], k=60)
+
+    assert np.isfinite(distances).all()
+    assert all(len(set(row)) == 60 for row in indices)
+    assert (np.diff(distances, axis=1) >= 0).all()
+
+
+def test_neighbours_carry_training_metadata(catalog):
+    """Metadane z training_metadata() odpowiadają wierszom X_train (ta sama popularność)."""
+    raw, clean, preprocessor, X_train, X_test, y_train = catalog
+    metadata = training_metadata(raw, clean, preprocessor)
+    index = SimilarTracksIndex().build(preprocessor, X_train, y_train, metadata)
+
+    result = index.neighbours(X_test[:3], k=4)
+
+    assert len(result) == 12
+    assert list(result['rank'].unique()) == [1, 2, 3, 4]
+    assert result['track_id'].notna().all()
+    known = raw.drop_duplicates('track_id').set_index('track_id')['popularity']
+    np.testing.assert_array_equal(result['popularity'].to_numpy(), known.loc[result['track_id']].to_numpy())
+
+
+def test_predictor_similar_tracks(catalog, tmp_path):
+    raw, clean, preprocessor, X_train, _, y_train = catalog
+    serializer = ModelSerializer(base_dir=str(tmp_path))
+    serializer.save(xgb.XGBRegressor(n_estimators=5, max_depth=3).fit(X_train, y_train), 'spotify-xgb-model_v1.joblib')
+    serializer.save(preprocessor, 'spotify-preprocessor_v1.joblib')
+    serializer.save(SimilarTracksIndex().build(preprocessor, X_train, y_train,
+                                               training_metadata(raw, clean, preprocessor)),
+                    'spotify-similar-tracks_v1.joblib')
+
+    predictor = SpotifyPredictor('spotify-xgb-model_v1.joblib', 'spotify-preprocessor_v1.joblib',
+                                 base_dir=str(tmp_path))
+    result = predictor.similar_tracks(sample_songs(5), k=3)
+
+    assert len(result) == 15
+    assert {'distance', 'track_genre', 'popularity'} <= set(result.columns)
@@ -0,0 +1,90 @@
+import io
+import json
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from src.metrics import metrics
+from src.streaming import ERROR_FIELD, PREDICTION_FIELD, StreamScorer
+from src.synthetic import sample_songs
+
+
+class _TempoPredictor:
+    """Predykcja = tempo; brak kolumny tempo daje błąd jak w prawdziwym preprocessorze."""
+
+    def __init__(self):
+        self.batches = []
+
+    def predict_batch(self, df: pd.DataFrame) -> np.ndarray:
+        if 'tempo' not in df.columns or df['tempo'].isna().any():
+            raise ValueError("columns are missing: {'tempo'}")
+        self.batches.append(len(df))
+        return df['tempo'].to_numpy(dtype=float)
+
+
+def test_jsonl_stream_keeps_order_and_reports_bad_lines():
+    songs = pd.DataFrame(sample_songs(25)).to_dict(orient='records')
+    lines = [json.dumps(s, default=float) for s in songs[:10]] + ['{broken', json.dumps({'track_id': 'no_tempo'})]
+    lines += [json.dumps(s, default=float) for s in songs[10:]]
+    predictor = _TempoPredictor()
+    sink = io.BytesIO()
+    metrics.reset()
+
+    written = StreamScorer(predictor, batch_size=8, id_column='track_id').score(
+        io.BytesIO(('\n'.join(lines) + '\n').encode()), sink, fmt='jsonl')
+
+    output = [json.loads(line) for line in sink.getvalue().decode().splitlines()]
+    assert written == len(output) == 27
+    assert output[10]['line'] == 11 and 'error' in output[10]
+    assert output[11]['line'] == 12 and 'tempo' in output[11]['error']
+    valid = output[:10] + output[12:]
+    assert [r['track_id'] for r in valid] == [s['track_id'] for s in songs]
+    np.testing.assert_allclose([r[PREDICTION_FIELD] for r in valid], [s['tempo'] for s in songs])
+    assert max(predictor.batches) <= 8
+    counted = {g['labels']['status']: g['value'] for g in metrics.snapshot()['counters']['spotify_stream_records_total']}
+    assert counted == {'ok': 25, 'error': 2}
+
+
+def test_arrow_stream_appends_prediction_column_and_isolates_bad_rows():
+    songs = pd.DataFrame(sample_songs(50))
+    songs.loc[[7, 33], 'tempo'] = np.nan
+    table = pa.Table.from_pandas(songs, preserve_index=False)
+    source = io.BytesIO()
+    with pa.ipc.new_stream(source, table.schema) as writer:
+        writer.write_table(table, max_chunksize=30)
+    sink = io.BytesIO()
+
+    StreamScorer(_TempoPredictor(), batch_size=20).score(io.BytesIO(source.getvalue()), sink, fmt='arrow')
+
+    result = pa.ipc.open_stream(io.BytesIO(sink.getvalue())).read_all()
+    assert result.schema.names == table.schema.names + [PREDICTION_FIELD, ERROR_FIELD]
+    np.testing.assert_allclose(result.column(PREDICTION_FIELD).to_numpy(zero_copy_only=False),
+                               table.column('tempo').to_numpy(zero_copy_only=False))
+    errors = result.column(ERROR_FIELD).to_pylist()
+    assert [i for i, error in enumerate(errors) if error] == [7, 33]
+
+
+def test_partial_batch_is_flushed_while_input_stays_open():
+    """Rzadki strumień: rekord trafia na wyjście po max_wait, bez czekania na pełną partię lub koniec wejścia."""
+    read_fd, write_fd = os.pipe()
+    source, upstream = os.fdopen(read_fd, 'rb'), os.fdopen(write_fd, 'wb')
+    sink = io.BytesIO()
+    scorer = StreamScorer(_TempoPredictor(), batch_size=1000, max_wait=0.01)
+    worker = threading.Thread(target=scorer.score, args=(source, sink, 'jsonl'))
+    worker.start()
+
+    upstream.write((json.dumps(pd.DataFrame(sample_songs(1)).iloc[0].to_dict(), default=float) + '\n').encode())
+    upstream.flush()
+    for _ in range(200):
+        if sink.getvalue():
+            break
+        threading.Event().wait(0.01)
+    flushed_before_eof = bool(sink.getvalue())
+
+    upstream.close()
+    worker.join(timeout=5)
+    assert flushed_before_eof
+    assert not worker.is_alive()
@@ -0,0 +1,48 @@
+import subprocess
+import sys
+
+import numpy as np
+import pytest
+import xgboost as xgb
+
+from src.cleaners import SpotifyDataCleaner
+from src.preprocessors import SpotifyPipelinePreprocessor
+from src.synthetic import make_synthetic_tracks
+from src.tree_engine import NumpyTreeEngine
+
+
+@pytest.fixture
+def fitted():
+    df = SpotifyDataCleaner().clean(make_synthetic_tracks(3000, n_genres=12, missing_frac=0.01))
+    preprocessor = SpotifyPipelinePreprocessor(target_col='popularity', test_size=0.2, random_state=42)
+    X_train, _, y_train, _ = preprocessor.process(df)
+    model = xgb.XGBRegressor(n_estimators=40, max_depth=6, random_state=42).fit(X_train, y_train)
+    return model, preprocessor, df.drop(columns=['popularity'])
+
+
+def test_engine_matches_xgboost_after_save_and_load(fitted, tmp_path):
+    model, preprocessor, features = fitted
+    features = features.astype({'track_genre': object})
+    features.loc[features.index[:5], 'track_genre'] = 'unknown-genre'
+
+    path = NumpyTreeEngine.from_model(model, preprocessor).save(str(tmp_path / 'model.npz'))
+    engine = NumpyTreeEngine.load(path)
+    engine.batch_size = 256
+
+    X = preprocessor.transform_new_data(features)
+    np.testing.assert_allclose(engine.transform(features), X, atol=1e-9)
+    np.testing.assert_allclose(engine.predict(features), model.predict(X), atol=1e-3)
+
+    # Brakujące wartości idą domyślną gałęzią drzewa, tak jak w XGBoost
+    X[::3, 2] = np.nan
+    np.testing.assert_allclose(engine.predict_matrix(X), model.predict(X), atol=1e-3)
+
+    songs = features.iloc[:3].to_dict(orient='records')
+    expected = model.predict(preprocessor.transform_new_data(features.iloc[:3]))
+    np.testing.assert_allclose(engine.predict(songs), expected, atol=1e-3)
+
+
+def test_engine_module_does_not_import_xgboost_or_sklearn():
+    code = "import sys, src.tree_engine; print('xgboost' in sys.modules or 'sklearn' in sys.modules)"
+    out = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True)
+    assert out.stdout.strip() == 'False'
@@ -1,47 +1,121 @@
+import argparse
 import logging
+import os
+from typing import Optional
+import pandas as pd
 import xgboost as xgb
-from src.loaders import DataLoaderFactory
+from src.loaders import DATA_SOURCE, DataLoaderFactory
 from src.cleaners import SpotifyDataCleaner
 from src.preprocessors import SpotifyPipelinePreprocessor
 from src.tuner import ModelTuner
 from src.evaluation import ModelEvaluator
+from src.pipeline import PipelineRunner
+from src.manifest import RunManifest
+from src.planner import TrainingPlan
+from src.metrics import metrics
+from src.profiling import StageProfiler, PROFILE_MODES
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
 
-def run_tuning():
-    # Wczytanie i czyszczenie danych
-    data_source = "hf://datasets/maharshipandya/spotify-tracks-dataset/dataset.csv"
-    loader = DataLoaderFactory.get_loader(data_source)
+def train_final_model(best_params: dict, X_train, y_train, n_jobs: int = -1, seed: int = 42) -> xgb.XGBRegressor:
+    # Sprawdzenie na zbiorze testowym
+    print("Trenowanie modelu z najlepszymi parametrami...")
+    final_model = xgb.XGBRegressor(
+        **best_params,
+        objective='reg:squarederror',
+        n_jobs=n_jobs,
+        random_state=seed
+    )
+    final_model.fit(X_train, y_train)
+    return final_model
+
+
+def run_tuning(version: str = 'v1', force: bool = False, profiler: Optional[StageProfiler] = None,
+               manifest: Optional[RunManifest] = None, plan_file: Optional[str] = None):
+    manifest = manifest or RunManifest(f'tuning_{version}')
+    # Plan treningu (main.py --plan): tuning na próbce danych i z ograniczoną liczbą drzew
+    plan = TrainingPlan.load(plan_file) if plan_file else None
+    if plan is not None:
+        manifest.record('plan', {k: v for k, v in plan.to_dict().items() if k != 'grid'})
+
+    # Wczytanie i czyszczenie danych (korzysta z parquet zapisanego przez main.py, jeśli jest aktualny)
+    clean_path = f'data/clean_data_{version}.parquet'
+    restore_clean = (lambda: pd.read_parquet(clean_path)) if os.path.exists(clean_path) else None
+
+    pipeline = PipelineRunner(f'tuning_{version}', force=force, profiler=profiler)
+    pipeline.add_stage('load', lambda: DataLoaderFactory.get_loader(DATA_SOURCE).load())
     cleaner = SpotifyDataCleaner()
-    df_clean = cleaner.clean(loader.load())
+    pipeline.add_stage('clean', lambda df: cleaner.clean(df), deps=['load'],
+                       outputs=[clean_path] if restore_clean else [], restore=restore_clean)
 
     # Preprocessing
-    preprocessor = SpotifyPipelinePreprocessor(target_col='popularity', test_size=0.2)
-    X_train, X_test, y_train, y_test = preprocessor.process(df_clean)
+    preprocessor = SpotifyPipelinePreprocessor(target_col='popularity', test_size=0.2, random_state=manifest.seed)
+    pipeline.add_stage('preprocess', preprocessor.process, deps=['clean'])
+    pipeline.add_stage('sample', lambda data: plan.subsample(data[0], data[2], seed=manifest.seed) if plan is not None
+                       else (data[0], data[2]), deps=['preprocess'])
+    pipeline.add_stage('fingerprint', lambda df: manifest.record_dataset(df, source=DATA_SOURCE), deps=['clean'])
 
     # Uruchomienie Tunera
-    tuner = ModelTuner(n_iter=20, cv=3)  # Sprawdzi 20 losowych kombinacji
-    best_params = tuner.tune(X_train, y_train)
+    tuner = ModelTuner(n_iter=20, cv=3, n_jobs=manifest.n_jobs, random_state=manifest.seed,
+                       max_estimators=plan.n_estimators if plan is not None else None)  # Sprawdzi 20 losowych kombinacji
+    pipeline.add_stage('tune', lambda sample: tuner.tune(*sample), deps=['sample'])
 
+    pipeline.add_stage('final_train',
+                       lambda params, sample: train_final_model(params, *sample, manifest.n_jobs, manifest.seed),
+                       deps=['tune', 'sample'])
 
-    print("Optymalne parametry dla modelu XGBoost:")
-    print(best_params)
+    evaluator = ModelEvaluator(plot_mode='background')
 
-    # Sprawdzenie na zbiorze testowym
-    print("Trenowanie modelu z najlepszymi parametrami...")
-    final_model = xgb.XGBRegressor(
-        **best_params,
-        objective='reg:squarederror',
-        n_jobs=-1,
-        random_state=42
-    )
-    final_model.fit(X_train, y_train)
+    def evaluate(model, data):
+        predictions = model.predict(data[1])
+        results = evaluator.evaluate(data[3], predictions, model_name="Tuned XGBoost",
+                                     groups=preprocessor.get_categories(data[1]))
+        manifest.record_metrics(results, predictions)
+        return results
 
-    evaluator = ModelEvaluator()
-    y_pred = final_model.predict(X_test)
-    evaluator.evaluate(y_test, y_pred, model_name="Tuned XGBoost")
+    pipeline.add_stage('evaluate', evaluate, deps=['final_train', 'preprocess'])
+
+    results = pipeline.run()
+    evaluator.wait()
+
+    manifest.record_cleaner(cleaner)
+    manifest.record_preprocessor(preprocessor)
+    manifest.record('tuner', {'n_iter': tuner.n_iter, 'cv': tuner.cv, 'best_params': results['tune']})
+    manifest.record_model(results['final_train'])
+    manifest.record_pipeline(pipeline.report)
+    manifest.save()
+
+    print("Optymalne parametry dla modelu XGBoost:")
+    print(results['tune'])
+    return results['tune']
 
 
 if __name__ == "__main__":
-    run_tuning()
+    parser = argparse.ArgumentParser(description="Spotify Popularity Hyperparameter Tuning")
+    parser.add_argument('--version', type=str, default='v1', help='Wersja danych (domyślnie: v1)')
+    parser.add_argument('--force', action='store_true', help='Uruchom wszystkie etapy, nawet jeśli są aktualne')
+    parser.add_argument('--profile', choices=PROFILE_MODES, default=None,
+                        help='Profilowanie etapów: cprofile lub sampling (+ migawki tracemalloc)')
+    parser.add_argument('--profile-dir', type=str, default='reports/profile', help='Katalog na wyniki profilowania')
+    parser.add_argument('--plan-file', type=str, default=None,
+                        help='Plan treningu z main.py --plan (tuning na próbce danych, limit liczby drzew)')
+    parser.add_argument('--deterministic', action='store_true',
+                        help='Tryb deterministyczny: stałe ziarna i liczba wątków (wyniki niezależne od liczby rdzeni)')
+    parser.add_argument('--threads', type=int, default=None,
+                        help='Liczba wątków w trybie deterministycznym (domyślnie 4)')
+    parser.add_argument('--metrics-dir', type=str, default='reports', help='Katalog na metryki (JSON log i plik Prometheus)')
+    args = parser.parse_args()
+
+    metrics.enable_json_log(os.path.join(args.metrics_dir, f'metrics_tuning_{args.version}.jsonl'))
+
+    profiler = StageProfiler(args.profile_dir, mode=args.profile) if args.profile else None
+    manifest = RunManifest(f'tuning_{args.version}', deterministic=args.deterministic, threads=args.threads)
+    try:
+        run_tuning(version=args.version, force=args.force, profiler=profiler, manifest=manifest,
+                   plan_file=args.plan_file)
+        if profiler is not None:
+            profiler.write_summary()
+    finally:
+        # Metryki zapisywane także po błędzie - ułatwiają diagnozę nieudanego uruchomienia
+        metrics.write_prometheus(os.path.join(args.metrics_dir, f'metrics_tuning_{args.version}.prom'))